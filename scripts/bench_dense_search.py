@@ -0,0 +1,138 @@
+"""DenseRetriever 검색 경로(top-k 선택, 배치 검색) 벤치마크.
+
+합성 정규화 벡터 코퍼스(기본 1만/10만/100만 x 384차원)에서 다음을 비교한다.
+
+- 단일 질의: 전체 argsort 후 k개 선택 vs argpartition 후 k개만 정렬 (`top_k_indices`),
+  점수 계산을 포함한 시간과 선택만의 시간(sel)을 함께 측정
+- 질의 배치: 질의마다 행렬-벡터 곱 + top-k 반복 vs 행렬-행렬 곱 한 번 + 배치 top-k (`search_batch` 경로)
+
+임베딩 시간은 제외하고 점수 계산과 선택만 측정한다.
+
+    python scripts/bench_dense_search.py --sizes 10000 100000 1000000 --batch-size 32
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = ROOT_DIR / "src"
+for path in (SRC_DIR, SRC_DIR / "week3", SRC_DIR / "week4"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from dense_retriever import top_k_indices  # noqa: E402
+
+BLOCK_ROWS = 65_536  # 합성 데이터 생성 단위 (임시 메모리 상한)
+
+
+def synthetic_corpus(num_vectors: int, dim: int, seed: int) -> np.ndarray:
+    vectors = np.empty((num_vectors, dim), dtype="float32")
+    rng = np.random.default_rng(seed)
+    for lo in range(0, num_vectors, BLOCK_ROWS):
+        hi = min(lo + BLOCK_ROWS, num_vectors)
+        block = rng.standard_normal((hi - lo, dim), dtype=np.float32)
+        vectors[lo:hi] = block / (np.linalg.norm(block, axis=1, keepdims=True) + 1e-10)
+    return vectors
+
+
+def time_ms(fn: Callable[[], object], repeat: int) -> List[float]:
+    fn()  # 워밍업
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def bench_size(vectors: np.ndarray, queries: np.ndarray, k: int, repeat: int) -> Dict[str, float]:
+    query = queries[0]
+    sims = vectors @ query
+
+    def select_argsort() -> np.ndarray:
+        return np.argsort(sims)[::-1][:k]
+
+    def select_argpartition() -> np.ndarray:
+        return top_k_indices(sims, k)
+
+    def single_argsort() -> np.ndarray:
+        return np.argsort(vectors @ query)[::-1][:k]
+
+    def single_argpartition() -> np.ndarray:
+        return top_k_indices(vectors @ query, k)
+
+    def batch_loop() -> List[np.ndarray]:
+        return [top_k_indices(vectors @ q, k) for q in queries]
+
+    def batch_matmul() -> np.ndarray:
+        return top_k_indices(queries @ vectors.T, k)
+
+    assert (batch_matmul() == np.array(batch_loop())).all()
+    stats: Dict[str, float] = {}
+    for name, fn in [
+        ("select_argsort", select_argsort),
+        ("select_argpartition", select_argpartition),
+        ("single_argsort", single_argsort),
+        ("single_argpartition", single_argpartition),
+        ("batch_loop", batch_loop),
+        ("batch_matmul", batch_matmul),
+    ]:
+        stats[f"{name}_p50_ms"] = float(np.percentile(time_ms(fn, repeat), 50))
+    stats["batch_loop_qps"] = len(queries) / (stats["batch_loop_p50_ms"] / 1000)
+    stats["batch_matmul_qps"] = len(queries) / (stats["batch_matmul_p50_ms"] / 1000)
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed + 1)
+    queries = rng.standard_normal((args.batch_size, args.dim), dtype=np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    print(f"dim={args.dim}, k={args.k}, batch={args.batch_size}, repeat={args.repeat} (p50, ms)")
+    header = (
+        f"{'vectors':>10}{'sel sort':>10}{'sel part':>10}{'argsort':>10}{'argpart':>10}"
+        f"{'loop':>10}{'matmul':>10}{'loop QPS':>11}{'matmul QPS':>12}"
+    )
+    print(header)
+    print("-" * len(header))
+
+    results = []
+    for size in args.sizes:
+        vectors = synthetic_corpus(size, args.dim, args.seed)
+        stats = bench_size(vectors, queries, args.k, args.repeat)
+        del vectors
+        results.append({"vectors": size, **stats})
+        print(
+            f"{size:>10,}{stats['select_argsort_p50_ms']:>10.2f}{stats['select_argpartition_p50_ms']:>10.2f}"
+            f"{stats['single_argsort_p50_ms']:>10.2f}{stats['single_argpartition_p50_ms']:>10.2f}"
+            f"{stats['batch_loop_p50_ms']:>10.1f}{stats['batch_matmul_p50_ms']:>10.1f}"
+            f"{stats['batch_loop_qps']:>11.0f}{stats['batch_matmul_qps']:>12.0f}"
+        )
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"dim": args.dim, "k": args.k, "batch_size": args.batch_size, "results": results}
+        args.output.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        print(f"결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""질의 임베딩 마이크로 배칭 부하 벤치마크 (Gemini 키 불필요).
+
+합성 정규화 벡터 코퍼스 위의 `DenseRetriever`에 목표 QPS의 개방형(open-loop) 포아송 도착으로 단일 질의 검색
+(`invoke`: 질의 임베딩 + 행렬 곱 top-k)을 보내고, 마이크로 배칭을 끈 경우(요청마다 배치 크기 1)와
+켠 경우(`MicroBatchingRetriever`: window_ms 창 안의 질의를 배치 인코딩 1회 + 행렬 곱 1회로 처리)의
+QPS별 p50/p99 지연 곡선을 비교한다. 지연은 예정 도착 시각부터 결과를 받을 때까지이며 스레드 풀 대기 시간을 포함한다.
+
+임베딩 모델은 기본적으로 실제 모델(all-MiniLM-L6-v2)을 쓴다. sentence-transformers가 없거나 모델 추론과
+분리해 보고 싶으면 --stand-in-embedder로 호출당 고정 비용(--call-ms) + 질의당 비용(--per-query-ms)만큼
+시간을 소비하는 대체 임베더를 쓴다.
+
+--api-index-dir를 주면 같은 QPS 목록으로 Week6 API 경로(POST /query, 답변 캐시 켬, 로컬 대체 LLM)도
+프로세스 안에서 측정한다. 답변 캐시 조회용 질의 임베딩까지 포함한 요청당 인코더 호출 수를 함께 기록하므로,
+배칭을 켰을 때 인코딩이 요청마다 따로 일어나는지(배치 밖 경로) 확인할 수 있다. 이 모드는 실제 임베딩 모델을 쓴다.
+
+    python scripts/bench_micro_batching.py --output outputs/bench/micro_batching.json
+    python scripts/bench_micro_batching.py --stand-in-embedder --qps 50 100 200 400 --duration 5
+    python scripts/bench_micro_batching.py --api-index-dir data/processed/index/<slug>/fixed --qps 20 50 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = ROOT_DIR / "src"
+for path in (SRC_DIR, SRC_DIR / "week3", SRC_DIR / "week4"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from langchain.schema import Document  # noqa: E402
+from langchain_community.embeddings import HuggingFaceEmbeddings  # noqa: E402
+from langchain_core.retrievers import BaseRetriever  # noqa: E402
+
+from week4.rag_chain import EMBEDDING_MODEL, get_embeddings  # noqa: E402
+from dense_retriever import DenseRetriever  # noqa: E402
+from micro_batching import MicroBatchingRetriever  # noqa: E402
+
+BLOCK_ROWS = 65_536  # 합성 데이터 생성 단위 (임시 메모리 상한)
+
+
+class StandInEmbeddings(HuggingFaceEmbeddings):
+    """모델 없이 호출당 고정 비용 + 질의당 비용만큼 시간을 소비하고 질의 해시로 정해지는 단위 벡터를 돌려주는 임베더."""
+
+    call_ms: float = 4.0
+    per_query_ms: float = 0.3
+    dim: int = 384
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dim).astype("float32")
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # time.sleep은 GIL을 놓으므로 torch 추론처럼 다른 요청 스레드가 함께 진행된다
+        time.sleep((self.call_ms + self.per_query_ms * len(texts)) / 1000)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def synthetic_corpus(num_vectors: int, dim: int, seed: int) -> np.ndarray:
+    vectors = np.empty((num_vectors, dim), dtype="float32")
+    rng = np.random.default_rng(seed)
+    for lo in range(0, num_vectors, BLOCK_ROWS):
+        hi = min(lo + BLOCK_ROWS, num_vectors)
+        block = rng.standard_normal((hi - lo, dim), dtype=np.float32)
+        vectors[lo:hi] = block / (np.linalg.norm(block, axis=1, keepdims=True) + 1e-10)
+    return vectors
+
+
+def run_load(retriever: BaseRetriever, qps: float, duration: float, clients: int, seed: int) -> Dict[str, float]:
+    """목표 QPS의 포아송 도착으로 duration초 동안 질의를 보내고 지연 분포를 반환한다."""
+
+    rng = np.random.default_rng(seed)
+    arrivals = np.cumsum(rng.exponential(1 / qps, size=int(qps * duration * 1.5) + 1))
+    arrivals = arrivals[arrivals < duration]
+    latencies: List[float] = []
+    lock = threading.Lock()
+
+    def request(idx: int, scheduled: float) -> None:
+        # 매번 다른 질의 문자열 (질의 임베딩 캐시 효과를 배제)
+        retriever.invoke(f"벤치마크 질의 {seed}-{idx}: 연회비와 포인트 적립 조건")
+        elapsed = time.perf_counter() - scheduled
+        with lock:
+            latencies.append(elapsed * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        for idx, offset in enumerate(arrivals):
+            delay = start + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(request, idx, start + offset)
+    wall = time.perf_counter() - start
+    samples = np.array(latencies)
+    return {
+        "requests": len(samples),
+        "achieved_qps": len(samples) / wall,
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p99_ms": float(np.percentile(samples, 99)),
+        "mean_ms": float(samples.mean()),
+    }
+
+
+async def run_api_load(app: Any, qps: float, duration: float, seed: int) -> Dict[str, float]:
+    """API 앱에 목표 QPS의 포아송 도착으로 서로 다른 질문의 POST /query를 보내고 지연 분포를 반환한다."""
+
+    import httpx
+
+    rng = np.random.default_rng(seed)
+    arrivals = np.cumsum(rng.exponential(1 / qps, size=int(qps * duration * 1.5) + 1))
+    arrivals = arrivals[arrivals < duration]
+    latencies: List[float] = []
+    failures = 0
+    loop = asyncio.get_running_loop()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+
+        async def request(idx: int, scheduled: float) -> None:
+            nonlocal failures
+            # 매번 다른 질문 (답변 캐시 조회는 하지만 적중하지 않도록)
+            response = await client.post("/query", json={"question": f"API 벤치마크 질의 {seed}-{idx}: 연회비 조건"})
+            if response.status_code != 200:
+                failures += 1
+                return
+            latencies.append((loop.time() - scheduled) * 1000)
+
+        start = loop.time()
+        tasks = []
+        for idx, offset in enumerate(arrivals):
+            delay = start + offset - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(request(idx, start + offset)))
+        await asyncio.gather(*tasks)
+        wall = loop.time() - start
+    samples = np.array(latencies) if latencies else np.zeros(1)
+    return {
+        "requests": len(latencies),
+        "failures": failures,
+        "achieved_qps": len(latencies) / wall,
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p99_ms": float(np.percentile(samples, 99)),
+        "mean_ms": float(samples.mean()),
+    }
+
+
+def bench_api(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Week6 API /query 경로(답변 캐시 켬)를 배칭 끔/켬으로 측정한다."""
+
+    from week6.api_server import create_app
+
+    # 인코더 호출 수: 레지스트리의 공유 SentenceTransformer.encode 호출을 센다
+    model = get_embeddings(EMBEDDING_MODEL).client
+    encode = model.encode
+    calls = [0]
+
+    def counting_encode(*a: Any, **kw: Any) -> Any:
+        calls[0] += 1
+        return encode(*a, **kw)
+
+    model.encode = counting_encode
+
+    print(f"\nAPI /query (답변 캐시 켬, LLM 첫 토큰 {args.api_llm_ms}ms): {args.api_index_dir}")
+    header = f"{'batching':>9}{'target QPS':>12}{'achieved':>10}{'p50 ms':>10}{'p99 ms':>10}{'mean batch':>12}{'enc/req':>9}"
+    print(header)
+    print("-" * len(header))
+    results: List[Dict[str, Any]] = []
+    for batching in (False, True):
+        for qps in args.qps:
+            app = create_app(
+                args.api_index_dir,
+                llm_backend="local",
+                local_llm_options={
+                    "first_token_ms": args.api_llm_ms,
+                    "latency_distribution": "fixed",
+                    "tokens_per_second": None,
+                    "output_tokens": 16,
+                },
+                answer_cache_size=1024,
+                coalesce_requests=False,
+                micro_batching=batching,
+                micro_batch_window_ms=args.window_ms,
+                micro_batch_max_size=args.max_batch,
+                max_concurrent_requests=args.clients,
+                max_queued_requests=args.clients * 16,
+                queue_timeout=None,
+                request_timeout=None,
+            )
+            stats_before = calls[0]
+            stats = asyncio.run(run_api_load(app, qps, args.duration, args.seed))
+            encodes_per_request = (calls[0] - stats_before) / max(stats["requests"], 1)
+            server_stats = next(route for route in app.routes if getattr(route, "path", None) == "/stats").endpoint()
+            mean_batch = (server_stats["micro_batching"] or {}).get("mean_batch_size", 1.0)
+            for handler in app.router.on_shutdown:
+                handler()
+            results.append(
+                {
+                    "path": "api",
+                    "batching": batching,
+                    "target_qps": qps,
+                    "mean_batch_size": mean_batch,
+                    "encoder_calls_per_request": encodes_per_request,
+                    **stats,
+                }
+            )
+            print(
+                f"{'on' if batching else 'off':>9}{qps:>12.0f}{stats['achieved_qps']:>10.1f}"
+                f"{stats['p50_ms']:>10.2f}{stats['p99_ms']:>10.2f}{mean_batch:>12.2f}{encodes_per_request:>9.2f}"
+            )
+    model.encode = encode
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--qps", type=float, nargs="+", default=[10, 25, 50, 100, 200, 400])
+    parser.add_argument("--duration", type=float, default=10.0, help="QPS마다 부하를 거는 시간(초)")
+    parser.add_argument("--clients", type=int, default=64, help="요청 스레드 수 (FastAPI 스레드 풀 크기에 해당)")
+    parser.add_argument("--vectors", type=int, default=100_000, help="합성 코퍼스 크기")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--window-ms", type=float, default=5.0, help="마이크로 배칭 창")
+    parser.add_argument("--max-batch", type=int, default=32, help="마이크로 배치 최대 크기")
+    parser.add_argument("--stand-in-embedder", action="store_true", help="실제 모델 대신 시간만 소비하는 대체 임베더 사용")
+    parser.add_argument("--call-ms", type=float, default=4.0, help="대체 임베더의 호출당 고정 비용(ms)")
+    parser.add_argument("--per-query-ms", type=float, default=0.3, help="대체 임베더의 질의당 비용(ms)")
+    parser.add_argument("--api-index-dir", type=Path, default=None, help="Week6 API 경로도 측정할 인덱스 디렉터리")
+    parser.add_argument("--api-llm-ms", type=float, default=50.0, help="API 측정 시 로컬 대체 LLM의 첫 토큰 지연(ms)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    if args.stand_in_embedder:
+        embedder: HuggingFaceEmbeddings = StandInEmbeddings.construct(call_ms=args.call_ms, per_query_ms=args.per_query_ms)
+        dim = embedder.dim
+    else:
+        embedder = get_embeddings(EMBEDDING_MODEL)
+        dim = len(embedder.embed_query("차원 확인"))
+
+    vectors = synthetic_corpus(args.vectors, dim, args.seed)
+    documents = [Document(page_content="", metadata={"doc_id": str(i)}) for i in range(len(vectors))]
+    dense = DenseRetriever(documents=documents, vectors=vectors, embedder=embedder, k=args.k)
+    dense.invoke("워밍업")
+
+    print(
+        f"embedder={'stand-in' if args.stand_in_embedder else EMBEDDING_MODEL}, vectors={args.vectors:,}, dim={dim}, "
+        f"k={args.k}, window={args.window_ms}ms, max_batch={args.max_batch}, clients={args.clients}"
+    )
+    header = f"{'batching':>9}{'target QPS':>12}{'achieved':>10}{'p50 ms':>10}{'p99 ms':>10}{'mean batch':>12}"
+    print(header)
+    print("-" * len(header))
+
+    results: List[Dict[str, Any]] = []
+    for batching in (False, True):
+        for qps in args.qps:
+            retriever: BaseRetriever = dense
+            if batching:
+                retriever = MicroBatchingRetriever(base=dense, k=args.k, window_ms=args.window_ms, max_batch=args.max_batch)
+            stats = run_load(retriever, qps, args.duration, args.clients, args.seed)
+            mean_batch = 1.0
+            if batching:
+                mean_batch = retriever.batcher.stats()["mean_batch_size"]
+                retriever.batcher.close()
+            results.append({"path": "retriever", "batching": batching, "target_qps": qps, "mean_batch_size": mean_batch, **stats})
+            print(
+                f"{'on' if batching else 'off':>9}{qps:>12.0f}{stats['achieved_qps']:>10.1f}"
+                f"{stats['p50_ms']:>10.2f}{stats['p99_ms']:>10.2f}{mean_batch:>12.2f}"
+            )
+
+    if args.api_index_dir is not None:
+        results.extend(bench_api(args))
+
+    payload = {
+        "config": {
+            "embedder": "stand-in" if args.stand_in_embedder else EMBEDDING_MODEL,
+            "call_ms": args.call_ms if args.stand_in_embedder else None,
+            "per_query_ms": args.per_query_ms if args.stand_in_embedder else None,
+            "vectors": args.vectors,
+            "dim": dim,
+            "k": args.k,
+            "window_ms": args.window_ms,
+            "max_batch": args.max_batch,
+            "clients": args.clients,
+            "api_index_dir": str(args.api_index_dir) if args.api_index_dir is not None else None,
+            "api_llm_ms": args.api_llm_ms if args.api_index_dir is not None else None,
+            "duration": args.duration,
+            "seed": args.seed,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""오프라인 검색 마이크로 벤치마크 (Gemini 키/임베딩 모델 불필요).
+
+합성 정규화 벡터 코퍼스(기본 1천/1만/10만/100만 x 384차원)에서 k별로 다음 경로의 질의당 지연 시간을 잰다.
+
+- dense: `DenseRetriever` 유사도 검색 (행렬-벡터 곱 + argpartition top-k)
+- mmr: `DenseRetriever` MMR 검색 (--mmr-fetch-k개 후보, 0이면 전체 문서 후보)
+- faiss: `faiss.IndexFlatIP` 정확 검색 (faiss가 없으면 건너뜀)
+
+질의 임베딩 시간은 제외한다 (질의 벡터를 직접 넣어 점수 계산과 선택만 측정).
+결과는 경로 x 코퍼스 크기 x k마다 p50/p95 지연(ms), QPS(1 / 평균 지연), 최대 추가 메모리(MB)로
+JSON에 기록해 실행끼리 비교할 수 있게 한다. 메모리는 시간 측정과 별도로 질의 하나를 tracemalloc 아래에서
+실행해 잰 numpy/Python 할당 최대치이며(faiss 내부 C++ 할당은 제외), 프로세스 최대 RSS도 함께 남긴다.
+
+    python scripts/bench_retrieval.py --output outputs/bench/retrieval.json
+    python scripts/bench_retrieval.py --sizes 1000 10000 --ks 1 5 --queries 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = ROOT_DIR / "src"
+for path in (SRC_DIR, SRC_DIR / "week3", SRC_DIR / "week4"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from langchain.schema import Document  # noqa: E402
+from langchain_community.embeddings import HuggingFaceEmbeddings  # noqa: E402
+
+from dense_retriever import DenseRetriever  # noqa: E402
+
+BLOCK_ROWS = 65_536  # 합성 데이터 생성 단위 (임시 메모리 상한)
+
+
+def synthetic_corpus(num_vectors: int, dim: int, seed: int) -> np.ndarray:
+    vectors = np.empty((num_vectors, dim), dtype="float32")
+    rng = np.random.default_rng(seed)
+    for lo in range(0, num_vectors, BLOCK_ROWS):
+        hi = min(lo + BLOCK_ROWS, num_vectors)
+        block = rng.standard_normal((hi - lo, dim), dtype=np.float32)
+        vectors[lo:hi] = block / (np.linalg.norm(block, axis=1, keepdims=True) + 1e-10)
+    return vectors
+
+
+def latency_stats(fn: Callable[[np.ndarray], object], queries: np.ndarray) -> Dict[str, float]:
+    fn(queries[0])  # 워밍업
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples_ms = np.array(samples)
+    return {
+        "p50_ms": float(np.percentile(samples_ms, 50)),
+        "p95_ms": float(np.percentile(samples_ms, 95)),
+        "qps": float(1000 / samples_ms.mean()),
+    }
+
+
+def peak_alloc_mb(fn: Callable[[np.ndarray], object], query: np.ndarray) -> float:
+    tracemalloc.start()
+    try:
+        fn(query)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 2**20
+
+
+def max_rss_mb() -> float:
+    # Linux는 KB, macOS는 바이트 단위
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == "darwin" else rss / 2**10
+
+
+def build_searchers(
+    vectors: np.ndarray,
+    mmr_fetch_k: Optional[int],
+    use_faiss: bool,
+) -> Dict[str, Callable[[np.ndarray, int], object]]:
+    # 문서 본문은 검색 경로에서 쓰이지 않으므로 빈 Document를 공유하고, 임베딩 모델은 로드하지 않는다
+    documents = [Document(page_content="")] * len(vectors)
+    embedder = HuggingFaceEmbeddings.construct()
+    dense = DenseRetriever(documents=documents, vectors=vectors, embedder=embedder)
+    mmr = DenseRetriever(documents=documents, vectors=vectors, embedder=embedder, use_mmr=True, mmr_fetch_k=mmr_fetch_k)
+    searchers: Dict[str, Callable[[np.ndarray, int], object]] = {
+        "dense": lambda query, k: dense._search_query_mat(query[None, :], k),
+        "mmr": lambda query, k: mmr._search_query_mat(query[None, :], k),
+    }
+    if use_faiss:
+        import faiss
+
+        index = faiss.IndexFlatIP(vectors.shape[1])
+        index.add(vectors)
+        searchers["faiss"] = lambda query, k: index.search(query[None, :], k)
+    return searchers
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--ks", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=50, help="경로/크기/k마다 측정할 질의 수")
+    parser.add_argument("--mmr-queries", type=int, default=10, help="MMR 측정 질의 수 (전체 후보 MMR은 느림)")
+    parser.add_argument("--mmr-fetch-k", type=int, default=0, help="MMR 후보 수 (0이면 전체 문서)")
+    parser.add_argument("--no-faiss", action="store_true", help="faiss 경로를 측정하지 않음")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    use_faiss = not args.no_faiss
+    if use_faiss:
+        try:
+            import faiss  # noqa: F401
+        except ImportError:
+            print("⚠️  faiss가 설치되어 있지 않아 faiss 경로를 건너뜁니다.")
+            use_faiss = False
+
+    rng = np.random.default_rng(args.seed + 1)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    mmr_fetch_k = args.mmr_fetch_k or None
+
+    print(f"dim={args.dim}, queries={args.queries} (MMR {args.mmr_queries}), mmr_fetch_k={mmr_fetch_k or '전체'}")
+    header = f"{'method':>8}{'vectors':>11}{'k':>5}{'p50 ms':>10}{'p95 ms':>10}{'QPS':>10}{'peak MB':>10}"
+    print(header)
+    print("-" * len(header))
+
+    results: List[Dict] = []
+    for size in args.sizes:
+        vectors = synthetic_corpus(size, args.dim, args.seed)
+        searchers = build_searchers(vectors, mmr_fetch_k, use_faiss)
+        for method, search in searchers.items():
+            method_queries = queries[: args.mmr_queries] if method == "mmr" else queries
+            for k in args.ks:
+                def run(query: np.ndarray, search=search, k=k) -> object:
+                    return search(query, k)
+
+                stats = latency_stats(run, method_queries)
+                stats["peak_alloc_mb"] = peak_alloc_mb(run, method_queries[0])
+                results.append({"method": method, "vectors": size, "k": k, **stats})
+                print(
+                    f"{method:>8}{size:>11,}{k:>5}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+                    f"{stats['qps']:>10.0f}{stats['peak_alloc_mb']:>10.1f}"
+                )
+        del searchers, vectors
+
+    payload = {
+        "config": {
+            "dim": args.dim,
+            "queries": args.queries,
+            "mmr_queries": args.mmr_queries,
+            "mmr_fetch_k": mmr_fetch_k,
+            "seed": args.seed,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "max_rss_mb": max_rss_mb(),
+        "results": results,
+    }
+    print(f"프로세스 최대 RSS: {payload['max_rss_mb']:.0f}MB")
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        print(f"결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""샤드 분산 검색(scatter-gather) 지연 시간 벤치마크.
+
+합성 정규화 벡터 코퍼스(기본 200만 x 384차원)를 샤드 개수별로 디스크에 기록한 뒤,
+샤드 수만큼의 워커 프로세스로 단일 질의/배치 질의 지연 시간을 측정한다.
+샤드 설정마다 코퍼스를 다시 쓰고 측정 후 삭제하므로 디스크는 코퍼스 크기의 약 1배만 사용한다.
+
+    python scripts/bench_sharded_search.py --num-vectors 2000000 --shards 1 2 4 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+WEEK3_DIR = ROOT_DIR / "src" / "week3"
+if str(WEEK3_DIR) not in sys.path:
+    sys.path.insert(0, str(WEEK3_DIR))
+
+from vector_shards import SHARDS_DIRNAME, ShardedSearcher, write_shards_manifest  # noqa: E402
+
+BLOCK_ROWS = 65_536  # 합성 데이터 생성 단위 (블록별 시드로 샤드 분할과 무관하게 같은 코퍼스를 만든다)
+
+
+def synthetic_rows(start: int, stop: int, dim: int, seed: int) -> np.ndarray:
+    """전역 행 [start, stop)의 정규화 합성 벡터를 생성한다."""
+
+    parts: List[np.ndarray] = []
+    block = start // BLOCK_ROWS
+    while block * BLOCK_ROWS < stop:
+        rng = np.random.default_rng(seed + block)
+        rows = rng.standard_normal((BLOCK_ROWS, dim), dtype=np.float32)
+        lo = max(start - block * BLOCK_ROWS, 0)
+        hi = min(stop - block * BLOCK_ROWS, BLOCK_ROWS)
+        parts.append(rows[lo:hi])
+        block += 1
+    vectors = np.concatenate(parts)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-10
+    return vectors
+
+
+def write_synthetic_shards(index_dir: Path, num_vectors: int, dim: int, num_shards: int, seed: int) -> None:
+    shard_dir = index_dir / SHARDS_DIRNAME
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    bounds = np.linspace(0, num_vectors, num_shards + 1, dtype=int)
+    shards = []
+    for shard_idx, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:])):
+        name = f"shard_{shard_idx:03d}.npy"
+        out = np.lib.format.open_memmap(shard_dir / name, mode="w+", dtype="float32", shape=(stop - start, dim))
+        for lo in range(start, stop, BLOCK_ROWS):
+            hi = min(lo + BLOCK_ROWS, stop)
+            out[lo - start : hi - start] = synthetic_rows(lo, hi, dim, seed)
+        out.flush()
+        del out
+        shards.append({"file": name, "offset": int(start), "count": int(stop - start)})
+    write_shards_manifest(shard_dir, dim, shards)
+
+
+def percentile_ms(samples: List[float], q: float) -> float:
+    return float(np.percentile(samples, q) * 1000)
+
+
+def bench_config(index_dir: Path, workers: int, queries: np.ndarray, k: int, batch_size: int) -> Dict[str, float]:
+    with ShardedSearcher(index_dir, workers=workers) as searcher:
+        searcher.search(queries[:batch_size], k)  # 워커 기동 + 메모리 맵/페이지 캐시 워밍업
+
+        single: List[float] = []
+        for query in queries:
+            start = time.perf_counter()
+            searcher.search(query[None, :], k)
+            single.append(time.perf_counter() - start)
+
+        batched: List[float] = []
+        for lo in range(0, len(queries), batch_size):
+            start = time.perf_counter()
+            searcher.search(queries[lo : lo + batch_size], k)
+            batched.append(time.perf_counter() - start)
+
+    return {
+        "single_p50_ms": percentile_ms(single, 50),
+        "single_p95_ms": percentile_ms(single, 95),
+        "batch_p50_ms": percentile_ms(batched, 50),
+        "batch_qps": len(queries) / sum(batched),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-vectors", type=int, default=2_000_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", type=Path, default=None, help="샤드 임시 저장 경로 (기본: 시스템 임시 폴더)")
+    parser.add_argument("--output", type=Path, default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed + 10_000_000)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    corpus_gb = args.num_vectors * args.dim * 4 / 1e9
+    print(f"합성 코퍼스: {args.num_vectors:,} x {args.dim} (float32, {corpus_gb:.2f} GB), k={args.k}")
+    header = f"{'shards':>6}{'workers':>9}{'p50(ms)':>10}{'p95(ms)':>10}{'batch p50':>11}{'batch QPS':>11}"
+    print(header)
+    print("-" * len(header))
+
+    results = []
+    for num_shards in args.shards:
+        index_dir = Path(tempfile.mkdtemp(prefix=f"shards{num_shards}_", dir=args.work_dir))
+        try:
+            write_synthetic_shards(index_dir, args.num_vectors, args.dim, num_shards, args.seed)
+            stats = bench_config(index_dir, num_shards, queries, args.k, args.batch_size)
+        finally:
+            shutil.rmtree(index_dir, ignore_errors=True)
+
+        results.append({"shards": num_shards, "workers": num_shards, **stats})
+        print(
+            f"{num_shards:>6}{num_shards:>9}"
+            f"{stats['single_p50_ms']:>10.1f}{stats['single_p95_ms']:>10.1f}"
+            f"{stats['batch_p50_ms']:>11.1f}{stats['batch_qps']:>11.1f}"
+        )
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"num_vectors": args.num_vectors, "dim": args.dim, "k": args.k, "results": results}
+        args.output.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        print(f"결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
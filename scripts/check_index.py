@@ -0,0 +1,60 @@
+"""인덱스 매니페스트 점검.
+
+--index-root 아래의 논리 인덱스(current.json 또는 index.faiss 보유 폴더)마다 현재 버전의 manifest.json을
+검증한다. 기본은 인덱스를 열 때와 같은 가벼운 검증(파일 존재·크기, 임베딩 모델)이고, --verify를 주면 모든
+파일을 끝까지 읽어 배포 시 기록된 SHA-256 체크섬까지 비교한다 (배포 직후나 디스크 손상이 의심될 때).
+
+    python scripts/check_index.py --index-root data/processed/index
+    python scripts/check_index.py --index-root data/processed/index/BLISS_5_2504/semantic --verify
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = ROOT_DIR / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from week4.rag_chain import EMBEDDING_MODEL, discover_index_dirs, resolve_index_dir, verify_manifest  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index-root", type=Path, default=ROOT_DIR / "data/processed/index")
+    parser.add_argument("--verify", action="store_true", help="SHA-256 체크섬까지 비교 (모든 파일을 끝까지 읽음)")
+    parser.add_argument("--model", default=EMBEDDING_MODEL, help="기대하는 임베딩 모델 (빈 문자열이면 확인 안 함)")
+    args = parser.parse_args()
+
+    index_dirs = discover_index_dirs(args.index_root, recursive=True)
+    if not index_dirs:
+        print(f"⚠️ 인덱스를 찾지 못했습니다: {args.index_root}")
+        sys.exit(1)
+
+    failures = 0
+    for index_dir in index_dirs:
+        start = time.perf_counter()
+        try:
+            resolved = resolve_index_dir(index_dir)
+            manifest = verify_manifest(resolved, expected_model=args.model or None, check_checksums=args.verify)
+        except (FileNotFoundError, ValueError) as exc:
+            failures += 1
+            print(f"⚠️ {index_dir}: {exc}")
+            continue
+        elapsed = (time.perf_counter() - start) * 1000
+        if manifest is None:
+            print(f"ℹ️ {index_dir}: 매니페스트 없음 (버전 관리 이전 인덱스)")
+        else:
+            print(f"✅ {index_dir}: 버전 {manifest.get('version')}, 파일 {len(manifest.get('files', {}))}개 ({elapsed:.1f}ms)")
+
+    mode = "체크섬 포함" if args.verify else "크기·모델"
+    print(f"\n{len(index_dirs)}개 인덱스 점검 ({mode}): 실패 {failures}개")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""기존 인덱스에 대한 float16/int8 양자화의 메모리 절감과 Recall@k 손실 측정.
+
+각 인덱스(<slug>/<strategy>)의 metadata.json 벡터를 양자화하고, 같은 문서의 다른 전략
+청크 벡터를 질의로 사용해 float32 정확 검색 top-k와 비교한다.
+
+- approx: 양자화 근사 점수만으로 고른 top-k
+- rescored: 근사 점수 상위 k * rescore_factor개를 float32로 재점수한 top-k (DenseRetriever 경로)
+
+인덱스 로드 시 metadata.json 파싱에 드는 메모리(tracemalloc 최대치)도 함께 잰다. 양자화 인덱스는 벡터 없이
+doc_id/본문만 기록하므로 벡터는 재점수용 vectors.npy에서 읽는다.
+
+    python scripts/eval_quantization.py --index-root data/processed/index -k 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+WEEK3_DIR = ROOT_DIR / "src" / "week3"
+if str(WEEK3_DIR) not in sys.path:
+    sys.path.insert(0, str(WEEK3_DIR))
+
+from index_store import discover_index_dirs, resolve_index_dir  # noqa: E402
+from vector_quantization import QuantizedVectors, load_float32_vectors  # noqa: E402
+
+
+def load_vectors(index_dir: Path) -> np.ndarray:
+    resolved = resolve_index_dir(index_dir)
+    metadata = json.loads((resolved / "metadata.json").read_text(encoding="utf-8"))
+    if metadata and "vector" not in metadata[0]:
+        # 양자화 인덱스: 정규화된 float32 벡터 파일 사용
+        return np.array(load_float32_vectors(resolved), dtype="float32")
+    vectors = np.array([item["vector"] for item in metadata], dtype="float32")
+    return vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-10)
+
+
+def metadata_load_peak(index_dir: Path) -> Dict[str, int]:
+    """metadata.json 크기와 json.loads 중 파이썬 힙 최대 사용량(바이트)."""
+
+    path = resolve_index_dir(index_dir) / "metadata.json"
+    tracemalloc.start()
+    json.loads(path.read_text(encoding="utf-8"))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"metadata_bytes": path.stat().st_size, "metadata_load_peak_bytes": peak}
+
+
+def topk(sims: np.ndarray, k: int) -> np.ndarray:
+    return np.argsort(-sims, axis=1)[:, :k]
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = [len(set(f.tolist()) & set(t.tolist())) / len(t) for f, t in zip(found, truth)]
+    return float(np.mean(hits))
+
+
+def evaluate_index(vectors: np.ndarray, queries: np.ndarray, k: int, rescore_factor: int) -> Dict[str, Dict]:
+    k = min(k, len(vectors))
+    truth = topk(queries @ vectors.T, k)
+    report: Dict[str, Dict] = {}
+    for precision in ("float16", "int8"):
+        quantized = QuantizedVectors.from_vectors(vectors, precision)
+        approx_sims = np.stack([quantized.score(query) for query in queries])
+        approx = topk(approx_sims, k)
+
+        pool = min(len(vectors), k * rescore_factor)
+        rescored = []
+        for query, sims in zip(queries, approx_sims):
+            candidates = np.argsort(-sims)[:pool]
+            exact = vectors[candidates] @ query
+            rescored.append(candidates[np.argsort(-exact)[:k]])
+
+        report[precision] = {
+            "bytes": quantized.nbytes,
+            "reduction": 1 - quantized.nbytes / vectors.nbytes,
+            "recall_approx": recall(approx, truth),
+            "recall_rescored": recall(np.array(rescored), truth),
+        }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index-root", type=Path, default=ROOT_DIR / "data" / "processed" / "index")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    parser.add_argument("--output", type=Path, default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    index_dirs = discover_index_dirs(args.index_root, recursive=True)
+    by_source: Dict[Path, List[Path]] = {}
+    for index_dir in index_dirs:
+        by_source.setdefault(index_dir.parent, []).append(index_dir)
+
+    header = (
+        f"{'index':<32}{'n':>5}{'fp32 KB':>9}"
+        f"{'fp16 R@k':>10}{'(+rs)':>7}{'int8 KB':>9}{'int8 R@k':>10}{'(+rs)':>7}{'meta KB':>9}{'load KB':>9}"
+    )
+    print(f"k={args.k}, rescore_factor={args.rescore_factor}")
+    print(header)
+    print("-" * len(header))
+
+    results = []
+    for source_dir, strategy_dirs in sorted(by_source.items()):
+        loaded = {index_dir: load_vectors(index_dir) for index_dir in strategy_dirs}
+        for index_dir, vectors in loaded.items():
+            others = [vecs for other, vecs in loaded.items() if other != index_dir]
+            queries = np.concatenate(others) if others else vectors
+            report = evaluate_index(vectors, queries, args.k, args.rescore_factor)
+            load = metadata_load_peak(index_dir)
+            name = f"{source_dir.name}/{index_dir.name}"
+            results.append({"index": name, "count": len(vectors), "float32_bytes": vectors.nbytes, **load, **report})
+            fp16, int8 = report["float16"], report["int8"]
+            print(
+                f"{name:<32}{len(vectors):>5}{vectors.nbytes / 1024:>9.1f}"
+                f"{fp16['recall_approx']:>10.3f}{fp16['recall_rescored']:>7.3f}"
+                f"{int8['bytes'] / 1024:>9.1f}{int8['recall_approx']:>10.3f}{int8['recall_rescored']:>7.3f}"
+                f"{load['metadata_bytes'] / 1024:>9.1f}{load['metadata_load_peak_bytes'] / 1024:>9.1f}"
+            )
+
+    if results:
+        print("-" * len(header))
+        for precision in ("float16", "int8"):
+            reduction = np.mean([item[precision]["reduction"] for item in results])
+            approx = np.mean([item[precision]["recall_approx"] for item in results])
+            rescored = np.mean([item[precision]["recall_rescored"] for item in results])
+            print(
+                f"{precision}: 메모리 -{reduction:.1%}, "
+                f"Recall@{args.k} 근사 {approx:.3f} / 재점수 {rescored:.3f} (float32 대비)"
+            )
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""크로스 인코더 재순위화의 추가 지연 시간과 프롬프트 토큰 절감량 측정.
+
+각 질문에 대해 다음 두 경로를 비교한다.
+
+- dense: DenseRetriever top-k(--retrieval-k)를 그대로 프롬프트에 넣는 기존 경로
+- rerank: 후보 --candidate-k개를 검색해 크로스 인코더로 한 번에 점수화한 뒤 상위 --rerank-k개만 사용
+
+지연 시간은 캐시가 빈 상태(cold)와 같은 질문을 다시 보낸 상태(warm, 점수 캐시 적중)를 따로 잰다.
+토큰 수는 크로스 인코더 토크나이저로 센 컨텍스트(청크 본문을 이어 붙인 문자열) 길이다.
+
+    python scripts/eval_rerank.py --index-dir data/processed/index/BLISS_5_2504/semantic
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = ROOT_DIR / "src"
+for path in (SRC_DIR, SRC_DIR / "week3", SRC_DIR / "week4"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from week4.rag_chain import (  # noqa: E402
+    EMBEDDING_MODEL,
+    get_embeddings,
+    load_dimension_reducer,
+    load_documents_and_vectors,
+    resolve_index_dir,
+)
+from dense_retriever import DenseRetriever  # noqa: E402
+from reranker import DEFAULT_RERANK_MODEL, CrossEncoderReranker, RerankRetriever  # noqa: E402
+
+DEFAULT_QUESTIONS = [
+    "BLISS.5 카드의 연회비는 얼마인가?",
+    "바우처는 언제까지 사용할 수 있나?",
+    "무민카드의 주요 혜택은 무엇인가?",
+    "그랜드코리아레저의 코로나 대응 전략은 무엇인가?",
+    "해외 이용 시 수수료는 어떻게 되나?",
+]
+
+
+def count_tokens(reranker: CrossEncoderReranker, texts: List[str]) -> int:
+    context = "\n\n".join(texts)
+    return len(reranker.model.tokenizer(context, add_special_tokens=False)["input_ids"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index-dir", type=Path, default=ROOT_DIR / "data/processed/index/BLISS_5_2504/semantic")
+    parser.add_argument("--questions", type=Path, default=None, help="질문 문자열 JSON 배열 파일")
+    parser.add_argument("--retrieval-k", type=int, default=5)
+    parser.add_argument("--candidate-k", type=int, default=20)
+    parser.add_argument("--rerank-k", type=int, default=3)
+    parser.add_argument("--model", default=DEFAULT_RERANK_MODEL)
+    parser.add_argument("--output", type=Path, default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    questions = DEFAULT_QUESTIONS
+    if args.questions:
+        questions = json.loads(args.questions.read_text(encoding="utf-8"))
+
+    documents, vectors = load_documents_and_vectors(args.index_dir, expected_model=EMBEDDING_MODEL)
+    dense = DenseRetriever(
+        documents=documents,
+        vectors=vectors,
+        embedder=get_embeddings(EMBEDDING_MODEL),
+        k=args.retrieval_k,
+        reducer=load_dimension_reducer(resolve_index_dir(args.index_dir)),
+    )
+    reranker = CrossEncoderReranker(args.model)
+    rerank = RerankRetriever(base=dense, reranker=reranker, k=args.rerank_k, candidate_k=args.candidate_k)
+    dense.search_batch(questions[:1])  # 모델 워밍업
+    reranker.score_batch(["워밍업"], [documents[:1]])
+
+    rows = []
+    for question in questions:
+        start = time.perf_counter()
+        dense_docs = dense.search_batch([question])[0]
+        dense_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        rerank_docs = rerank.search_batch([question])[0]
+        cold_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        rerank.search_batch([question])
+        warm_ms = (time.perf_counter() - start) * 1000
+
+        rows.append(
+            {
+                "question": question,
+                "dense_ms": dense_ms,
+                "rerank_cold_ms": cold_ms,
+                "rerank_warm_ms": warm_ms,
+                "dense_tokens": count_tokens(reranker, [doc.page_content for doc in dense_docs]),
+                "rerank_tokens": count_tokens(reranker, [doc.page_content for doc in rerank_docs]),
+            }
+        )
+
+    header = f"{'dense(ms)':>10}{'+rerank cold':>14}{'+rerank warm':>14}{'tokens':>9}{'→ rerank':>10}  question"
+    print(f"index={args.index_dir}, k={args.retrieval_k} → 후보 {args.candidate_k}개 재순위화 후 {args.rerank_k}개")
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(
+            f"{row['dense_ms']:>10.1f}{row['rerank_cold_ms'] - row['dense_ms']:>14.1f}"
+            f"{row['rerank_warm_ms'] - row['dense_ms']:>14.1f}"
+            f"{row['dense_tokens']:>9}{row['rerank_tokens']:>10}  {row['question']}"
+        )
+
+    added_cold = np.array([row["rerank_cold_ms"] - row["dense_ms"] for row in rows])
+    added_warm = np.array([row["rerank_warm_ms"] - row["dense_ms"] for row in rows])
+    dense_tokens = sum(row["dense_tokens"] for row in rows)
+    rerank_tokens = sum(row["rerank_tokens"] for row in rows)
+    print("-" * len(header))
+    print(
+        f"추가 지연 p50: cold {np.percentile(added_cold, 50):.1f}ms / warm {np.percentile(added_warm, 50):.1f}ms, "
+        f"프롬프트 컨텍스트 토큰 {dense_tokens} → {rerank_tokens} "
+        f"({1 - rerank_tokens / max(dense_tokens, 1):.1%} 절감)"
+    )
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(rows, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
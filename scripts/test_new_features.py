@@ -180,7 +180,8 @@ def test_langgraph_conditional():
     
     try:
         from src.week5.langgraph_rag import build_rag_graph, run_rag
-        from src.week4.rag_chain import DenseRetriever, load_documents_and_vectors
+        from dense_retriever import DenseRetriever
+        from src.week4.rag_chain import load_documents_and_vectors
         from langchain_community.embeddings import HuggingFaceEmbeddings
         from langchain_google_genai import ChatGoogleGenerativeAI
     except ImportError as e:
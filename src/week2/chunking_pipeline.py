@@ -6,7 +6,9 @@
 from __future__ import annotations
 
 import re
+import sys
 from dataclasses import dataclass
+from pathlib import Path
 from typing import Callable, Dict, Iterable, List
 
 try:
@@ -125,6 +127,17 @@ def paragraph_chunking(text: str, max_chars: int = 800) -> List[Chunk]:
     return chunks
 
 
+def _shared_sentence_model(model_name: str) -> "SentenceTransformer":
+    """Week3 모델 레지스트리에서 모델을 받아 여러 PDF/전략 청킹과 Week3 임베딩이 같은 인스턴스를 쓰게 한다."""
+
+    week3_dir = Path(__file__).resolve().parent.parent / "week3"
+    if str(week3_dir) not in sys.path:
+        sys.path.insert(0, str(week3_dir))
+    from model_registry import get_sentence_transformer
+
+    return get_sentence_transformer(model_name)
+
+
 def semantic_chunking(
     text: str,
     model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
@@ -140,7 +153,7 @@ def semantic_chunking(
     if not sentences:
         return []
 
-    model = SentenceTransformer(model_name)
+    model = _shared_sentence_model(model_name)
     embeddings = model.encode(sentences, convert_to_numpy=True)
 
     chunks: List[Chunk] = []
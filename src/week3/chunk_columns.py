@@ -0,0 +1,149 @@
+"""3주차 통합 인덱스용 메타데이터 컬럼.
+
+여러 PDF를 하나의 인덱스로 합칠 때 각 청크의 출처(slug), 페이지, 청킹 전략을
+작은 정수 컬럼으로 저장하고, 검색 시 필터를 불리언 마스크로 적용한다.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+COLUMNS_FILENAME = "columns.npz"
+FILTER_KEYS = ("source", "page", "strategy")
+
+
+class ChunkColumns:
+    """청크별 출처/페이지/전략 코드를 담는 컬럼 저장소.
+
+    source/strategy는 코드북(문자열 목록)의 인덱스, page는 1부터 시작하는 페이지 번호
+    (알 수 없으면 -1)이다. 코드별 마스크는 생성 시점에 미리 계산해 둔다.
+    """
+
+    def __init__(
+        self,
+        source: np.ndarray,
+        page: np.ndarray,
+        strategy: np.ndarray,
+        source_names: List[str],
+        strategy_names: List[str],
+    ) -> None:
+        self.source = np.asarray(source, dtype=np.int16)
+        self.page = np.asarray(page, dtype=np.int16)
+        self.strategy = np.asarray(strategy, dtype=np.int8)
+        self.source_names = list(source_names)
+        self.strategy_names = list(strategy_names)
+        if not (len(self.source) == len(self.page) == len(self.strategy)):
+            raise ValueError("source/page/strategy 컬럼 길이가 서로 다릅니다.")
+        self._masks: Dict[str, List[np.ndarray]] = {
+            "source": [self.source == code for code in range(len(self.source_names))],
+            "strategy": [self.strategy == code for code in range(len(self.strategy_names))],
+        }
+
+    def __len__(self) -> int:
+        return len(self.source)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Mapping[str, Any]]) -> "ChunkColumns":
+        """{"source", "page", "strategy"} 딕셔너리 목록으로부터 컬럼을 만든다."""
+
+        source_names: List[str] = []
+        strategy_names: List[str] = []
+        sources: List[int] = []
+        pages: List[int] = []
+        strategies: List[int] = []
+        for record in records:
+            sources.append(_encode(source_names, str(record["source"])))
+            strategies.append(_encode(strategy_names, str(record["strategy"])))
+            page = record.get("page")
+            pages.append(int(page) if page is not None else -1)
+        return cls(
+            source=np.array(sources),
+            page=np.array(pages),
+            strategy=np.array(strategies),
+            source_names=source_names,
+            strategy_names=strategy_names,
+        )
+
+    def record(self, idx: int) -> Dict[str, Any]:
+        """idx번째 청크의 컬럼 값을 사람이 읽을 수 있는 형태로 반환한다."""
+
+        page = int(self.page[idx])
+        return {
+            "source": self.source_names[int(self.source[idx])],
+            "page": page if page >= 0 else None,
+            "strategy": self.strategy_names[int(self.strategy[idx])],
+        }
+
+    def build_mask(self, metadata_filter: Optional[Mapping[str, Any]]) -> Optional[np.ndarray]:
+        """필터 조건을 만족하는 청크의 불리언 마스크를 반환한다. 조건이 없으면 None.
+
+        각 키의 값은 단일 값 또는 값의 목록이며, 키끼리는 AND, 목록 안에서는 OR로 결합한다.
+        예: {"source": ["BLISS_5_2504", "221123"], "strategy": "recursive", "page": [1, 2]}
+        """
+
+        if not metadata_filter:
+            return None
+
+        unknown = set(metadata_filter) - set(FILTER_KEYS)
+        if unknown:
+            raise ValueError(f"지원하지 않는 필터 키입니다: {sorted(unknown)}")
+
+        mask = np.ones(len(self), dtype=bool)
+        for key in ("source", "strategy"):
+            if key not in metadata_filter:
+                continue
+            names = self.source_names if key == "source" else self.strategy_names
+            key_mask = np.zeros(len(self), dtype=bool)
+            for value in _as_list(metadata_filter[key]):
+                if value in names:
+                    key_mask |= self._masks[key][names.index(value)]
+            mask &= key_mask
+        if "page" in metadata_filter:
+            pages = np.array([int(p) for p in _as_list(metadata_filter["page"])], dtype=np.int16)
+            mask &= np.isin(self.page, pages)
+        return mask
+
+    def save(self, output_dir: Path) -> Path:
+        path = output_dir / COLUMNS_FILENAME
+        np.savez(
+            path,
+            source=self.source,
+            page=self.page,
+            strategy=self.strategy,
+            source_names=np.array(self.source_names, dtype=str),
+            strategy_names=np.array(self.strategy_names, dtype=str),
+        )
+        return path
+
+
+def load_chunk_columns(index_dir: Path) -> Optional[ChunkColumns]:
+    """인덱스 폴더에 columns.npz가 있으면 읽어 반환한다. 없으면 None."""
+
+    path = index_dir / COLUMNS_FILENAME
+    if not path.exists():
+        return None
+    with np.load(path) as data:
+        return ChunkColumns(
+            source=data["source"],
+            page=data["page"],
+            strategy=data["strategy"],
+            source_names=[str(name) for name in data["source_names"]],
+            strategy_names=[str(name) for name in data["strategy_names"]],
+        )
+
+
+def _encode(codebook: List[str], value: str) -> int:
+    if value not in codebook:
+        codebook.append(value)
+    return codebook.index(value)
+
+
+def _as_list(value: Any) -> Sequence[Any]:
+    if isinstance(value, (str, bytes, int)):
+        return [value]
+    if isinstance(value, Iterable):
+        return list(value)
+    return [value]
@@ -0,0 +1,130 @@
+"""3주차 임베딩 차원 축소(PCA / 랜덤 프로젝션).
+
+인덱스 빌드 시 청크 벡터로 투영 행렬을 학습해 인덱스 옆(`reducer.npz`)에 저장하고,
+검색 시에는 같은 행렬로 질의 벡터를 투영한다. 투영 후에는 다시 L2 정규화한다.
+
+PCA는 평균을 빼지 않은(비중심화) SVD로 학습한다. 질의-청크 내적 q·x에서 x가
+상위 주성분 공간에 거의 놓이면 (Pq)·(Px) ≈ q·x 이므로, 중심화 PCA보다 코사인 순위가
+잘 보존된다. 청크 수가 목표 차원보다 적으면 청크가 펼치는 공간 전체를 쓰므로 손실이 없다.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+REDUCTION_METHODS = ("pca", "random_projection")
+REDUCER_FILENAME = "reducer.npz"
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / (np.linalg.norm(vectors, axis=-1, keepdims=True) + 1e-10)
+
+
+class DimensionReducer:
+    """(output_dim, input_dim) 투영 행렬로 벡터를 축소하는 변환기."""
+
+    def __init__(self, components: np.ndarray, method: str, variance_retained: Optional[float] = None) -> None:
+        if method not in REDUCTION_METHODS:
+            raise ValueError(f"지원하지 않는 차원 축소 방식입니다: {method}")
+        self.components = np.asarray(components, dtype="float32")
+        self.method = method
+        self.variance_retained = variance_retained
+
+    @property
+    def input_dim(self) -> int:
+        return int(self.components.shape[1])
+
+    @property
+    def output_dim(self) -> int:
+        return int(self.components.shape[0])
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray, method: str, target_dim: int, seed: int = 0) -> "DimensionReducer":
+        """정규화된 청크 벡터로 투영 행렬을 학습한다.
+
+        variance_retained는 투영 후 남는 제곱 노름의 비율 ||XP^T||² / ||X||² 이다.
+        """
+
+        vectors = _normalize(np.asarray(vectors, dtype="float32"))
+        if target_dim < 1:
+            raise ValueError("target_dim은 1 이상이어야 합니다.")
+        if method == "pca":
+            _, singular_values, vt = np.linalg.svd(vectors, full_matrices=False)
+            dim = min(target_dim, len(singular_values))
+            energy = singular_values.astype("float64") ** 2
+            retained = float(energy[:dim].sum() / (energy.sum() + 1e-12))
+            return cls(vt[:dim], method, retained)
+        if method == "random_projection":
+            # 가우시안 행렬을 QR로 직교화해 PCA와 같은 의미의 보존 분산(부분공간 투영 비율)을 구한다
+            rng = np.random.default_rng(seed)
+            gaussian = rng.standard_normal((vectors.shape[1], target_dim))
+            matrix = np.linalg.qr(gaussian)[0].T.astype("float32")
+            projected = vectors @ matrix.T
+            retained = float((projected**2).sum() / ((vectors**2).sum() + 1e-12))
+            return cls(matrix, method, retained)
+        raise ValueError(f"지원하지 않는 차원 축소 방식입니다: {method}")
+
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        """(n, input_dim) 또는 (input_dim,) 벡터를 투영하고 L2 정규화한다."""
+
+        vectors = np.asarray(vectors, dtype="float32")
+        if vectors.shape[-1] != self.input_dim:
+            raise ValueError(f"입력 차원({vectors.shape[-1]})이 축소기 입력 차원({self.input_dim})과 다릅니다.")
+        return _normalize(vectors @ self.components.T).astype("float32")
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "method": self.method,
+            "input_dim": self.input_dim,
+            "dim": self.output_dim,
+            "variance_retained": self.variance_retained,
+        }
+
+    def save(self, output_dir: Path) -> Path:
+        path = output_dir / REDUCER_FILENAME
+        arrays = {"components": self.components, "method": np.array(self.method)}
+        if self.variance_retained is not None:
+            arrays["variance_retained"] = np.array(self.variance_retained)
+        np.savez(path, **arrays)
+        return path
+
+
+def load_dimension_reducer(index_dir: Path) -> Optional[DimensionReducer]:
+    path = index_dir / REDUCER_FILENAME
+    if not path.exists():
+        return None
+    with np.load(path) as data:
+        retained = float(data["variance_retained"]) if "variance_retained" in data.files else None
+        return DimensionReducer(data["components"], str(data["method"]), retained)
+
+
+def neighbor_recall(
+    vectors: np.ndarray,
+    reduced: np.ndarray,
+    k: int = 5,
+    max_queries: int = 256,
+    seed: int = 0,
+) -> float:
+    """청크 벡터를 질의로 삼아(자기 자신 제외) 원본 대비 축소 공간의 top-k 이웃 재현율을 구한다."""
+
+    vectors = _normalize(np.asarray(vectors, dtype="float32"))
+    reduced = np.asarray(reduced, dtype="float32")
+    count = len(vectors)
+    k = min(k, count - 1)
+    if k < 1:
+        return 1.0
+
+    rng = np.random.default_rng(seed)
+    queries = rng.choice(count, size=min(max_queries, count), replace=False)
+    hits = []
+    for row in queries:
+        exact = vectors @ vectors[row]
+        approx = reduced @ reduced[row]
+        exact[row] = approx[row] = -np.inf
+        truth = set(np.argpartition(-exact, k - 1)[:k].tolist())
+        found = set(np.argpartition(-approx, k - 1)[:k].tolist())
+        hits.append(len(truth & found) / k)
+    return float(np.mean(hits))
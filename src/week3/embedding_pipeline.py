@@ -6,10 +6,7 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Iterable, List
 
-try:
-    from sentence_transformers import SentenceTransformer
-except ImportError as exc:  # pragma: no cover
-    raise ImportError("sentence-transformers 패키지가 필요합니다.") from exc
+from model_registry import get_sentence_transformer
 
 
 @dataclass
@@ -20,10 +17,10 @@ class EmbeddingResult:
 
 
 class EmbeddingPipeline:
-    """SentenceTransformer를 이용해 문서 임베딩을 생성하는 파이프라인."""
+    """SentenceTransformer를 이용해 문서 임베딩을 생성하는 파이프라인 (모델은 프로세스 전역 레지스트리에서 공유)."""
 
     def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2") -> None:
-        self.model = SentenceTransformer(model_name)
+        self.model = get_sentence_transformer(model_name)
 
     def encode_documents(self, documents: Iterable[str], prefix: str = "doc") -> List[EmbeddingResult]:
         texts = list(documents)
@@ -0,0 +1,211 @@
+"""3주차 인덱스 버전 관리 유틸리티.
+
+인덱스 빌드 결과를 `<index_dir>/versions/<version>/`에 통째로 기록한 뒤
+`current.json` 포인터를 원자적으로 교체해 배포한다. 읽는 쪽(Week4~6)은 포인터가
+가리키는 버전 폴더만 사용하므로, 빌드 도중의 반쯤 쓰인 파일을 볼 일이 없다.
+
+    data/processed/index/<slug>/<strategy>/
+    ├── current.json            # {"version": "20260101-120000-123456"}
+    └── versions/
+        ├── 20260101-120000-123456/
+        │   ├── index.faiss
+        │   ├── metadata.json
+        │   ├── chunks_with_ids.json
+        │   └── manifest.json   # 모델/차원/메트릭/개수/체크섬/빌드 시각
+        └── ...
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+MANIFEST_FILENAME = "manifest.json"
+POINTER_FILENAME = "current.json"
+VERSIONS_DIRNAME = "versions"
+MANIFEST_FORMAT = 1
+
+
+def new_version_id() -> str:
+    """빌드 시각(마이크로초 포함)으로 정렬 가능한 버전 ID를 만든다."""
+
+    return datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_manifest(version_dir: Path, fields: Dict[str, Any]) -> Dict[str, Any]:
+    """버전 폴더 안의 모든 파일 체크섬을 포함한 manifest.json을 기록한다."""
+
+    files = {
+        path.relative_to(version_dir).as_posix(): {"sha256": file_sha256(path), "bytes": path.stat().st_size}
+        for path in sorted(version_dir.rglob("*"))
+        if path.is_file() and path.name != MANIFEST_FILENAME
+    }
+    manifest = {
+        "format": MANIFEST_FORMAT,
+        "version": version_dir.name,
+        "created_at": datetime.now().isoformat(),
+        **fields,
+        "files": files,
+    }
+    _atomic_write_json(version_dir / MANIFEST_FILENAME, manifest)
+    return manifest
+
+
+def read_manifest(index_dir: Path) -> Optional[Dict[str, Any]]:
+    path = index_dir / MANIFEST_FILENAME
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def verify_manifest(
+    index_dir: Path,
+    expected_model: Optional[str] = None,
+    check_checksums: bool = False,
+) -> Optional[Dict[str, Any]]:
+    """manifest.json을 검증하고 반환한다. 매니페스트가 없는 기존 인덱스는 None.
+
+    기록된 파일이 없거나 크기가 다르거나, 기대한 임베딩 모델과 다르면 ValueError.
+    check_checksums=True이면 모든 파일을 끝까지 읽어 SHA-256까지 비교하므로 인덱스를 열 때마다가 아니라
+    명시적인 점검(scripts/check_index.py --verify)에서만 쓴다. 체크섬은 배포(publish_index) 시 기록된다.
+    """
+
+    manifest = read_manifest(index_dir)
+    if manifest is None:
+        return None
+
+    for name, info in manifest.get("files", {}).items():
+        path = index_dir / name
+        if not path.exists():
+            raise ValueError(f"매니페스트에 기록된 파일이 없습니다: {path}")
+        if path.stat().st_size != info.get("bytes"):
+            raise ValueError(f"파일 크기가 매니페스트와 다릅니다: {path}")
+        if check_checksums and file_sha256(path) != info.get("sha256"):
+            raise ValueError(f"체크섬이 매니페스트와 다릅니다: {path}")
+
+    model_name = manifest.get("model_name")
+    if expected_model and model_name and model_name != expected_model:
+        raise ValueError(
+            f"인덱스 임베딩 모델({model_name})과 검색 모델({expected_model})이 다릅니다: {index_dir}"
+        )
+    return manifest
+
+
+def read_current_version(index_dir: Path) -> Optional[str]:
+    pointer_path = index_dir / POINTER_FILENAME
+    if not pointer_path.exists():
+        return None
+    try:
+        return json.loads(pointer_path.read_text(encoding="utf-8")).get("version")
+    except json.JSONDecodeError:
+        return None
+
+
+def resolve_index_dir(index_dir: Path) -> Path:
+    """current.json이 있으면 현재 버전 폴더를, 없으면(기존 평면 구조) index_dir 자체를 반환한다."""
+
+    version = read_current_version(index_dir)
+    if version is None:
+        return index_dir
+    version_dir = index_dir / VERSIONS_DIRNAME / version
+    if not version_dir.is_dir():
+        raise FileNotFoundError(f"current.json이 가리키는 버전 폴더가 없습니다: {version_dir}")
+    return version_dir
+
+
+def discover_index_dirs(root: Path, recursive: bool) -> List[Path]:
+    """root 아래의 논리 인덱스 폴더(current.json 또는 index.faiss 보유)를 찾는다.
+
+    versions/ 아래의 개별 버전 폴더는 상위 인덱스 폴더 하나로 취급한다.
+    """
+
+    def is_index_dir(path: Path) -> bool:
+        return (path / POINTER_FILENAME).exists() or (path / "index.faiss").exists()
+
+    candidates = set()
+    if is_index_dir(root):
+        candidates.add(root.resolve())
+        if not recursive:
+            return sorted(candidates)
+
+    if recursive:
+        for pattern in (f"**/{POINTER_FILENAME}", "**/index.faiss"):
+            for path in root.glob(pattern):
+                if VERSIONS_DIRNAME in path.relative_to(root).parts:
+                    continue
+                candidates.add(path.parent.resolve())
+    return sorted(candidates)
+
+
+@contextmanager
+def publish_index(
+    index_dir: Path,
+    manifest_fields: Dict[str, Any],
+    keep_versions: int = 3,
+) -> Iterator[Path]:
+    """새 버전을 임시 폴더에 쓰게 한 뒤 매니페스트 기록 → 폴더 rename → 포인터 교체 순으로 배포한다.
+
+    with 블록 안에서 예외가 나면 임시 폴더를 지우고 현재 버전은 그대로 둔다.
+    """
+
+    versions_dir = index_dir / VERSIONS_DIRNAME
+    versions_dir.mkdir(parents=True, exist_ok=True)
+    version = new_version_id()
+    staging_dir = versions_dir / f".staging-{version}"
+    staging_dir.mkdir()
+
+    try:
+        yield staging_dir
+        # 매니페스트에는 임시 폴더 이름이 아니라 배포될 버전 ID를 기록한다
+        write_manifest(staging_dir, {**manifest_fields, "version": version})
+        version_dir = versions_dir / version
+        os.replace(staging_dir, version_dir)
+    except BaseException:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+    # 포인터 교체는 os.replace 한 번이므로 읽는 쪽은 이전/새 버전 중 하나만 보게 된다
+    _atomic_write_json(index_dir / POINTER_FILENAME, {"version": version, "updated_at": datetime.now().isoformat()})
+    prune_versions(index_dir, keep_versions)
+
+
+def prune_versions(index_dir: Path, keep_versions: int) -> List[Path]:
+    """현재 버전을 제외하고 오래된 버전 폴더를 keep_versions개만 남기고 삭제한다."""
+
+    versions_dir = index_dir / VERSIONS_DIRNAME
+    if keep_versions <= 0 or not versions_dir.is_dir():
+        return []
+    current = read_current_version(index_dir)
+    versions = sorted(
+        (path for path in versions_dir.iterdir() if path.is_dir() and not path.name.startswith(".")),
+        key=lambda path: path.name,
+        reverse=True,
+    )
+    removed: List[Path] = []
+    for path in versions[keep_versions:]:
+        if path.name == current:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        removed.append(path)
+    return removed
+
+
+def _atomic_write_json(path: Path, payload: Dict[str, Any]) -> None:
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    tmp_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp_path, path)
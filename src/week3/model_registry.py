@@ -0,0 +1,256 @@
+"""프로세스 전역 모델 레지스트리.
+
+임베딩 모델(SentenceTransformer)과 크로스 인코더를 (종류, 모델 이름, 옵션)마다 프로세스에서 한 번만
+로드하고, 로드 직후 짧은 워밍업 배치를 돌린 뒤 같은 인스턴스를 모든 호출 측에 돌려준다.
+(Week2 의미 청킹, Week3 EmbeddingPipeline, Week4~6 검색기/재순위화기가 같은 모델을 공유)
+
+여러 모델을 쓸 때는 max_bytes(파라미터 + 버퍼 바이트 추정치 합계) 상한을 둘 수 있다. 새 모델을 로드해
+상한을 넘으면 가장 오래 쓰이지 않은 모델부터 레지스트리에서 내린다. 단, 레지스트리 밖(체인, 재순위화기,
+HuggingFaceEmbeddings 래퍼를 받아 간 객체)에서 아직 참조 중인 모델은 내려도 메모리가 해제되지 않고 다음
+요청 때 두 번째 사본을 로드하게 되므로 내리지 않고 경고만 한다 (약한 참조로 해제 여부를 확인).
+
+모델 로드와 워밍업은 모델 키별 잠금 안에서만 실행하므로, 느린 로드 중에도 다른 모델의 캐시 적중은 막히지 않는다.
+"""
+
+from __future__ import annotations
+
+import gc
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+ModelKey = Tuple[str, str, Tuple[Tuple[str, Any], ...]]
+
+
+def estimate_model_bytes(model: Any) -> int:
+    """torch 모듈이면 파라미터와 버퍼의 바이트 수 합계, 아니면 0."""
+
+    module = getattr(model, "model", model)  # CrossEncoder는 .model에 transformers 모듈을 둔다
+    try:
+        tensors = list(module.parameters()) + list(module.buffers())
+    except AttributeError:
+        return 0
+    return int(sum(tensor.numel() * tensor.element_size() for tensor in tensors))
+
+
+class _Entry:
+    def __init__(self, model: Any, nbytes: int, load_ms: float, warmup_ms: float) -> None:
+        self.model = model
+        self.nbytes = nbytes
+        self.load_ms = load_ms
+        self.warmup_ms = warmup_ms
+        self.hits = 0
+        self.wrapper: Any = None  # LangChain HuggingFaceEmbeddings 래퍼 (임베딩 모델만)
+
+
+class ModelRegistry:
+    """(종류, 모델 이름, 옵션) 키별로 모델을 한 번만 로드해 공유하는 LRU 레지스트리."""
+
+    def __init__(self, max_bytes: Optional[int] = None, warmup: bool = True) -> None:
+        self.max_bytes = max_bytes
+        self.warmup = warmup
+        self.loads = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[ModelKey, _Entry]" = OrderedDict()
+        self._lock = threading.RLock()
+        # 같은 모델을 여러 스레드가 동시에 처음 요청해도 한 번만 로드하도록 키별 잠금을 둔다
+        self._load_locks: Dict[ModelKey, threading.Lock] = {}
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(entry.nbytes for entry in self._entries.values())
+
+    def _hit(self, key: ModelKey) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            entry.hits += 1
+        return entry
+
+    def _get(self, key: ModelKey, load: Callable[[], Any], warmup: Callable[[Any], Any]) -> _Entry:
+        with self._lock:
+            entry = self._hit(key)
+            if entry is not None:
+                return entry
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # 전역 잠금 밖에서 로드한다 (같은 키를 기다리는 스레드만 막힘)
+        with load_lock:
+            with self._lock:
+                entry = self._hit(key)  # 기다리는 동안 다른 스레드가 로드했을 수 있다
+                if entry is not None:
+                    return entry
+            start = time.perf_counter()
+            model = load()
+            load_ms = (time.perf_counter() - start) * 1000
+            warmup_ms = 0.0
+            if self.warmup:
+                # 첫 실제 요청이 토크나이저/커널 초기화 비용을 떠안지 않도록 미리 한 번 실행한다
+                start = time.perf_counter()
+                warmup(model)
+                warmup_ms = (time.perf_counter() - start) * 1000
+            entry = _Entry(model, estimate_model_bytes(model), load_ms, warmup_ms)
+            with self._lock:
+                self._entries[key] = entry
+                self.loads += 1
+                self._enforce_budget(keep=key)
+            return entry
+
+    def _release(self, key: ModelKey) -> bool:
+        """레지스트리에서 모델을 내리고 메모리가 실제로 해제됐는지 확인한다.
+
+        레지스트리 밖에서 아직 참조 중이면 내려도 해제되지 않으므로 원래 자리(LRU 앞쪽)에 되돌리고 False를 반환한다.
+        """
+
+        entry = self._entries.pop(key)
+        try:
+            alive = weakref.ref(entry.model)
+        except TypeError:  # 약한 참조를 지원하지 않는 객체는 해제된 것으로 본다
+            alive = None
+        nbytes, restore = entry.nbytes, entry
+        entry.model = entry.wrapper = None
+        gc.collect()
+        model = alive() if alive is not None else None
+        if model is not None:
+            restore.model = model
+            self._entries[key] = restore
+            self._entries.move_to_end(key, last=False)
+            return False
+        self.evictions += 1
+        print(f"ℹ️  모델 레지스트리에서 {key[1]}({key[0]}, {nbytes / 2**20:.0f}MB)를 내렸습니다.")
+        return True
+
+    def _enforce_budget(self, keep: ModelKey) -> None:
+        if self.max_bytes is None or self.total_bytes <= self.max_bytes:
+            return
+        for victim in [key for key in self._entries if key != keep]:
+            if self.total_bytes <= self.max_bytes:
+                return
+            self._release(victim)
+        if self.total_bytes > self.max_bytes:
+            in_use = ", ".join(key[1] for key in self._entries)
+            print(
+                f"⚠️  모델 메모리 상한({self.max_bytes / 2**20:.0f}MB)을 넘지만 모두 사용 중이라 내리지 않습니다 "
+                f"({self.total_bytes / 2**20:.0f}MB: {in_use})."
+            )
+
+    def sentence_transformer(self, model_name: str, device: Optional[str] = None) -> Any:
+        """SentenceTransformer 인스턴스를 반환한다 (처음 요청 시 로드 + 워밍업)."""
+
+        def load() -> Any:
+            try:
+                from sentence_transformers import SentenceTransformer
+            except ImportError as exc:  # pragma: no cover
+                raise ImportError("sentence-transformers 패키지가 필요합니다.") from exc
+            return SentenceTransformer(model_name, device=device)
+
+        key: ModelKey = ("sentence_transformer", model_name, (("device", device),))
+        return self._get(key, load, lambda model: model.encode(["워밍업 문장"], convert_to_numpy=True)).model
+
+    def embeddings(self, model_name: str, device: Optional[str] = None) -> Any:
+        """sentence_transformer()와 같은 모델을 감싼 LangChain HuggingFaceEmbeddings를 반환한다.
+
+        HuggingFaceEmbeddings(model_name=...)는 생성할 때마다 모델을 새로 읽으므로,
+        생성자를 거치지 않고(construct) 공유 모델을 client로 넣는다.
+        """
+
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+
+        model = self.sentence_transformer(model_name, device=device)
+        with self._lock:
+            entry = self._entries.get(("sentence_transformer", model_name, (("device", device),)))
+            if entry is None or entry.model is not model:
+                # 그 사이 다른 스레드가 내린 경우: 래퍼만 만들어 돌려준다
+                return HuggingFaceEmbeddings.construct(model_name=model_name, client=model)
+            if entry.wrapper is None:
+                entry.wrapper = HuggingFaceEmbeddings.construct(model_name=model_name, client=model)
+            return entry.wrapper
+
+    def cross_encoder(self, model_name: str, max_length: int = 512) -> Any:
+        """sentence-transformers CrossEncoder 인스턴스를 반환한다."""
+
+        def load() -> Any:
+            try:
+                from sentence_transformers import CrossEncoder
+            except ImportError as exc:  # pragma: no cover
+                raise ImportError("재순위화에는 sentence-transformers 패키지가 필요합니다.") from exc
+            return CrossEncoder(model_name, max_length=max_length)
+
+        key: ModelKey = ("cross_encoder", model_name, (("max_length", max_length),))
+        return self._get(key, load, lambda model: model.predict([("워밍업", "워밍업 문장")])).model
+
+    def evict(self, model_name: str, kind: Optional[str] = None) -> bool:
+        """모델을 레지스트리에서 내린다 (kind가 None이면 이름이 같은 모든 종류).
+
+        레지스트리 밖에서 아직 참조 중인 모델은 내리지 않고 경고한다. 하나라도 내렸으면 True.
+        """
+
+        with self._lock:
+            victims = [key for key in self._entries if key[1] == model_name and kind in (None, key[0])]
+            released = False
+            for key in victims:
+                if self._release(key):
+                    released = True
+                else:
+                    print(f"⚠️  {key[1]}({key[0]})는 아직 사용 중이라 내리지 않았습니다 (내려도 메모리가 해제되지 않음).")
+        return released
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        gc.collect()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "total_mb": self.total_bytes / 2**20,
+                "max_mb": self.max_bytes / 2**20 if self.max_bytes is not None else None,
+                "models": [
+                    {
+                        "kind": key[0],
+                        "model_name": key[1],
+                        "mb": entry.nbytes / 2**20,
+                        "hits": entry.hits,
+                        "load_ms": entry.load_ms,
+                        "warmup_ms": entry.warmup_ms,
+                    }
+                    for key, entry in self._entries.items()
+                ],
+            }
+
+
+_DEFAULT_REGISTRY = ModelRegistry()
+
+
+def default_model_registry() -> ModelRegistry:
+    return _DEFAULT_REGISTRY
+
+
+def configure_model_registry(max_memory_mb: Optional[float] = None, warmup: bool = True) -> ModelRegistry:
+    """프로세스 전역 레지스트리의 메모리 상한(MB, None이면 무제한)과 워밍업 여부를 설정한다."""
+
+    registry = default_model_registry()
+    with registry._lock:
+        registry.max_bytes = int(max_memory_mb * 2**20) if max_memory_mb is not None else None
+        registry.warmup = warmup
+        if registry._entries:
+            newest = next(reversed(registry._entries))
+            registry._enforce_budget(keep=newest)
+    return registry
+
+
+def get_sentence_transformer(model_name: str, device: Optional[str] = None) -> Any:
+    return default_model_registry().sentence_transformer(model_name, device=device)
+
+
+def get_embeddings(model_name: str, device: Optional[str] = None) -> Any:
+    return default_model_registry().embeddings(model_name, device=device)
+
+
+def get_cross_encoder(model_name: str, max_length: int = 512) -> Any:
+    return default_model_registry().cross_encoder(model_name, max_length=max_length)
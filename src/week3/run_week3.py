@@ -3,19 +3,28 @@ from __future__ import annotations
 import json
 import re
 import sys
+from bisect import bisect_right
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
 import hydra
+import numpy as np
 from omegaconf import DictConfig, OmegaConf
 
 CURRENT_DIR = Path(__file__).resolve().parent
 if str(CURRENT_DIR) not in sys.path:
     sys.path.insert(0, str(CURRENT_DIR))
 
+from chunk_columns import ChunkColumns  # noqa: E402
+from dim_reduction import DimensionReducer, neighbor_recall  # noqa: E402
 from embedding_pipeline import EmbeddingPipeline, EmbeddingResult  # noqa: E402
+from index_store import publish_index, resolve_index_dir  # noqa: E402
+from source_text import save_source_texts  # noqa: E402
 from vector_store_builder import build_faiss_index  # noqa: E402
 
+# 통합 인덱스 작업: 전략 → [(slug, chunk, embedding), ...]
+MergedJobs = Dict[str, List[Tuple[str, Dict, EmbeddingResult]]]
+
 
 def slugify(name: str) -> str:
     slug = re.sub(r"[^0-9A-Za-z_-]+", "_", name)
@@ -46,12 +55,49 @@ def find_week2_outputs(processed_dir: Path) -> List[Path]:
     return outputs
 
 
+def load_full_text(week2_dir: Path) -> Optional[str]:
+    path = week2_dir / "full_text.txt"
+    return path.read_text(encoding="utf-8") if path.exists() else None
+
+
 def load_chunks(chunks_path: Path) -> Dict:
     if not chunks_path.exists():
         raise FileNotFoundError(f"청크 JSON 파일을 찾을 수 없습니다: {chunks_path}")
     return json.loads(chunks_path.read_text(encoding="utf-8"))
 
 
+def load_page_offsets(week2_dir: Path) -> Tuple[List[int], List[int]]:
+    """extraction.json의 텍스트 블록으로 full_text 오프셋별 페이지 경계를 계산한다.
+
+    Week2의 full_text는 텍스트 블록을 "\n"으로 이어 붙인 문자열이므로 블록 길이를
+    누적하면 각 블록의 시작 오프셋을 복원할 수 있다.
+    """
+
+    extraction_path = week2_dir / "extraction.json"
+    if not extraction_path.exists():
+        return [], []
+    extraction = json.loads(extraction_path.read_text(encoding="utf-8"))
+
+    starts: List[int] = []
+    pages: List[int] = []
+    cursor = 0
+    for block in extraction.get("text_blocks", []):
+        text = block.get("text")
+        if not text:
+            continue
+        starts.append(cursor)
+        pages.append(int(block["page"]))
+        cursor += len(text) + 1
+    return starts, pages
+
+
+def page_for_offset(starts: List[int], pages: List[int], offset: Optional[int]) -> Optional[int]:
+    if not starts or offset is None or offset < 0:
+        return None
+    position = bisect_right(starts, offset) - 1
+    return pages[max(position, 0)]
+
+
 def save_embeddings(path: Path, embeddings: List[EmbeddingResult]) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     payload = [
@@ -61,7 +107,12 @@ def save_embeddings(path: Path, embeddings: List[EmbeddingResult]) -> None:
     path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
 
 
-def save_chunk_metadata(path: Path, chunk_info: Dict, embeddings: List[EmbeddingResult]) -> None:
+def save_chunk_metadata(
+    path: Path,
+    chunk_info: Dict,
+    embeddings: List[EmbeddingResult],
+    source: Optional[str] = None,
+) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     enriched = []
     for chunk, emb in zip(chunk_info["chunks"], embeddings):
@@ -71,9 +122,84 @@ def save_chunk_metadata(path: Path, chunk_info: Dict, embeddings: List[Embedding
         "summary": chunk_info.get("summary"),
         "chunks": enriched,
     }
+    if source is not None:
+        # sources/<source>.txt가 청크 start/end 오프셋의 기준 원문이다
+        payload["source"] = source
     path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
 
 
+def fit_dimension_reducer(
+    cfg: DictConfig,
+    embeddings: List[EmbeddingResult],
+) -> Tuple[Optional[DimensionReducer], Optional[Dict]]:
+    """vector_store.reduction.method가 설정되면 투영 행렬을 학습한다.
+
+    보존 분산과 (자기 자신을 뺀) 이웃 Recall@k를 출력하고, 매니페스트에 기록할 요약과 함께 반환한다.
+    """
+
+    reduction = cfg.vector_store.get("reduction") or {}
+    method = reduction.get("method")
+    if not method:
+        return None, None
+
+    vectors = np.array([emb.vector for emb in embeddings], dtype="float32")
+    target_dim = int(reduction.get("target_dim", 128))
+    if target_dim >= vectors.shape[1]:
+        print(f"⚠️  target_dim({target_dim})이 임베딩 차원({vectors.shape[1]}) 이상이라 차원 축소를 건너뜁니다.")
+        return None, None
+
+    reducer = DimensionReducer.fit(vectors, method, target_dim, seed=int(reduction.get("seed", 0)))
+    eval_k = int(reduction.get("eval_k", 5))
+    recall = neighbor_recall(vectors, reducer.transform(vectors), k=eval_k)
+    print(
+        f"  🔻 차원 축소({method}) {reducer.input_dim} → {reducer.output_dim}: "
+        f"보존 분산 {reducer.variance_retained:.1%}, 이웃 Recall@{eval_k} {recall:.3f}"
+    )
+    return reducer, {**reducer.summary(), "recall_at_k": {"k": eval_k, "recall": recall}}
+
+
+def write_strategy_index(
+    cfg: DictConfig,
+    target_dir: Path,
+    strategy: str,
+    embeddings: List[EmbeddingResult],
+    write_extras: Callable[[Path], None],
+) -> Path:
+    """인덱스와 부가 파일(청크 메타데이터 등)을 기록하고 index.faiss 경로를 반환한다.
+
+    vector_store.versioning.enable이면 새 버전 폴더에 기록한 뒤 current.json을 교체한다.
+    """
+
+    versioning = cfg.vector_store.get("versioning") or {}
+    num_shards = int(cfg.vector_store.get("num_shards", 1))
+    precision = str(cfg.vector_store.get("precision", "float32"))
+    reducer, reduction_report = fit_dimension_reducer(cfg, embeddings)
+    sparse_cfg = cfg.vector_store.get("sparse") or {}
+    sparse = None
+    if sparse_cfg.get("enable", False):
+        sparse = {"k1": float(sparse_cfg.get("k1", 1.5)), "b": float(sparse_cfg.get("b", 0.75))}
+    build_options = {"num_shards": num_shards, "precision": precision, "reducer": reducer, "sparse": sparse}
+    if not versioning.get("enable", False):
+        write_extras(target_dir)
+        return build_faiss_index(embeddings, target_dir, **build_options)
+
+    manifest_fields = {
+        "model_name": cfg.embedding.model_name,
+        "dim": reducer.output_dim if reducer is not None else len(embeddings[0].vector),
+        "metric": "l2",
+        "count": len(embeddings),
+        "strategy": strategy,
+        "precision": precision,
+    }
+    if reduction_report is not None:
+        manifest_fields["reduction"] = reduction_report
+    keep_versions = int(versioning.get("keep_versions", 3))
+    with publish_index(target_dir, manifest_fields, keep_versions=keep_versions) as staging_dir:
+        write_extras(staging_dir)
+        build_faiss_index(embeddings, staging_dir, **build_options)
+    return resolve_index_dir(target_dir) / "index.faiss"
+
+
 def collect_strategy_jobs(chunks_dir: Path, strategies: List[str]) -> List[Tuple[Path, str]]:
     jobs: List[Tuple[Path, str]] = []
     requested = [s.lower() for s in strategies] if strategies else ["all"]
@@ -186,10 +312,19 @@ def process_single_json(cfg: DictConfig, paths: Dict[str, Optional[Path]], pipel
     target_dir = base_dir / slugify(strategy)
     target_dir.mkdir(parents=True, exist_ok=True)
 
-    if cfg.embedding.save_embeddings:
-        save_embeddings(target_dir / "embeddings.json", embeddings)
-    save_chunk_metadata(target_dir / "chunks_with_ids.json", chunk_info, embeddings)
-    index_path = build_faiss_index(embeddings, target_dir)
+    # <week2 출력>/chunks/<strategy>.json이면 같은 폴더의 full_text.txt가 오프셋 기준 원문이다
+    full_text = load_full_text(chunk_json.parent.parent)
+
+    def write_extras(output_dir: Path) -> None:
+        if cfg.embedding.save_embeddings:
+            save_embeddings(output_dir / "embeddings.json", embeddings)
+        if full_text is None:
+            save_chunk_metadata(output_dir / "chunks_with_ids.json", chunk_info, embeddings)
+        else:
+            save_chunk_metadata(output_dir / "chunks_with_ids.json", chunk_info, embeddings, source=file_slug)
+            save_source_texts(output_dir, {file_slug: full_text})
+
+    index_path = write_strategy_index(cfg, target_dir, strategy, embeddings, write_extras)
     print(f"✅ 단일 청크 처리 완료: {index_path}")
 
 
@@ -213,6 +348,9 @@ def process_week2_outputs(cfg: DictConfig, paths: Dict[str, Optional[Path]]) ->
 
     strategies = cfg.input.strategies or ["all"]
     total_jobs = 0
+    merged_cfg = cfg.vector_store.get("merged") or {}
+    merged_jobs: MergedJobs = {}
+    source_texts: Dict[str, str] = {}
 
     for output_dir in week2_outputs:
         chunks_dir = output_dir / "chunks"
@@ -228,6 +366,10 @@ def process_week2_outputs(cfg: DictConfig, paths: Dict[str, Optional[Path]]) ->
         base_output.mkdir(parents=True, exist_ok=True)
 
         print(f"\n=== Week2 결과 처리: {output_dir} → {base_output} ===")
+        page_starts, page_numbers = load_page_offsets(output_dir)
+        full_text = load_full_text(output_dir)
+        if full_text is not None:
+            source_texts[base_output.name] = full_text
 
         for chunks_path, strategy_hint in strategy_jobs:
             chunk_info = load_chunks(chunks_path)
@@ -245,19 +387,76 @@ def process_week2_outputs(cfg: DictConfig, paths: Dict[str, Optional[Path]]) ->
             target_dir = base_output / strategy_slug
             target_dir.mkdir(parents=True, exist_ok=True)
 
-            if cfg.embedding.save_embeddings:
-                save_embeddings(target_dir / "embeddings.json", embeddings)
-            save_chunk_metadata(target_dir / "chunks_with_ids.json", chunk_info, embeddings)
+            def write_extras(output_dir: Path, slug: str = base_output.name) -> None:
+                if cfg.embedding.save_embeddings:
+                    save_embeddings(output_dir / "embeddings.json", embeddings)
+                if slug not in source_texts:
+                    save_chunk_metadata(output_dir / "chunks_with_ids.json", chunk_info, embeddings)
+                    return
+                save_chunk_metadata(output_dir / "chunks_with_ids.json", chunk_info, embeddings, source=slug)
+                save_source_texts(output_dir, {slug: source_texts[slug]})
 
-            index_path = build_faiss_index(embeddings, target_dir)
+            index_path = write_strategy_index(cfg, target_dir, strategy, embeddings, write_extras)
             print(f"      → 인덱스: {index_path}")
-            print(f"      → 메타데이터: {target_dir / 'metadata.json'}")
+            print(f"      → 메타데이터: {index_path.parent / 'metadata.json'}")
             total_jobs += 1
 
+            if merged_cfg.get("enable", False):
+                chunks = [chunk for chunk in chunk_info.get("chunks", []) if chunk.get("text")]
+                for chunk, emb in zip(chunks, embeddings):
+                    page = page_for_offset(page_starts, page_numbers, chunk.get("start"))
+                    merged_jobs.setdefault(strategy_slug, []).append(
+                        (base_output.name, {**chunk, "page": page}, emb)
+                    )
+
     if total_jobs == 0:
         raise ValueError("처리된 청크가 없습니다. Week2 결과를 확인하세요.")
     print(f"\n✅ 완료: 총 {total_jobs}개 전략을 처리했습니다.")
 
+    if merged_jobs:
+        build_merged_indexes(
+            cfg, merged_jobs, vector_base / str(merged_cfg.get("dir_name", "_merged")), source_texts
+        )
+
+
+def build_merged_indexes(
+    cfg: DictConfig,
+    merged_jobs: MergedJobs,
+    merged_root: Path,
+    source_texts: Optional[Dict[str, str]] = None,
+) -> None:
+    """전략별로 모든 PDF의 청크를 하나의 인덱스로 합치고 필터용 컬럼을 저장한다."""
+
+    print(f"\n=== 통합 인덱스 생성: {merged_root} ===")
+    for strategy, items in merged_jobs.items():
+        target_dir = merged_root / strategy
+        target_dir.mkdir(parents=True, exist_ok=True)
+
+        embeddings: List[EmbeddingResult] = []
+        chunks: List[Dict] = []
+        for slug, chunk, emb in items:
+            # 문서별 doc_id(예: fixed_00001)가 겹치지 않도록 slug를 접두어로 붙인다
+            doc_id = f"{slug}/{emb.doc_id}"
+            embeddings.append(EmbeddingResult(doc_id=doc_id, text=emb.text, vector=emb.vector))
+            chunks.append({**chunk, "source": slug, "doc_id": doc_id})
+
+        columns = ChunkColumns.from_records(
+            {"source": chunk["source"], "page": chunk["page"], "strategy": strategy} for chunk in chunks
+        )
+        payload = {"strategy": strategy, "sources": columns.source_names, "chunks": chunks}
+
+        def write_extras(output_dir: Path) -> None:
+            (output_dir / "chunks_with_ids.json").write_text(
+                json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8"
+            )
+            columns.save(output_dir)
+            texts = {slug: text for slug, text in (source_texts or {}).items() if slug in columns.source_names}
+            if texts:
+                save_source_texts(output_dir, texts)
+
+        index_path = write_strategy_index(cfg, target_dir, strategy, embeddings, write_extras)
+        print(f"  - {strategy}: 청크 {len(embeddings)}개 (문서 {len(columns.source_names)}개) → {index_path}")
+
 
 @hydra.main(version_base=None, config_path="../../conf", config_name="week3")
 def main(cfg: DictConfig) -> None:
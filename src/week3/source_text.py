@@ -0,0 +1,93 @@
+"""3주차 원문 텍스트 보관과 청크 인접 색인.
+
+청크의 start/end는 Week2 full_text.txt 기준 문자 오프셋이므로, 인덱스와 같은 버전으로 원문을 함께
+저장해 둔다 (원문이 다시 추출되어도 인덱스의 오프셋과 어긋나지 않도록).
+
+    <index_dir>/sources/<slug>.txt
+
+ChunkAdjacency는 출처별로 청크를 (start, end) 순으로 정렬해 각 청크의 앞/뒤 이웃 행 번호를 미리
+계산해 둔 색인이다. 작은 청크로 검색한 뒤 이웃 청크 경계까지 창(window)을 넓히는 데 쓴다.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+import numpy as np
+
+SOURCES_DIRNAME = "sources"
+
+
+def save_source_texts(output_dir: Path, texts: Mapping[str, str]) -> Path:
+    """출처 slug별 원문을 <output_dir>/sources/<slug>.txt로 저장한다."""
+
+    sources_dir = output_dir / SOURCES_DIRNAME
+    sources_dir.mkdir(parents=True, exist_ok=True)
+    for slug, text in texts.items():
+        (sources_dir / f"{slug}.txt").write_text(text, encoding="utf-8")
+    return sources_dir
+
+
+def load_source_texts(index_dir: Path) -> Dict[str, str]:
+    sources_dir = index_dir / SOURCES_DIRNAME
+    if not sources_dir.is_dir():
+        return {}
+    return {path.stem: path.read_text(encoding="utf-8") for path in sorted(sources_dir.glob("*.txt"))}
+
+
+class ChunkAdjacency:
+    """출처별 오프셋 순서로 정렬한 청크 인접 색인.
+
+    sources[i], starts[i], ends[i]는 i번째 행(인덱스 문서 순서)의 출처와 원문 구간이며,
+    prev[i]/next[i]는 같은 출처에서 오프셋 순서상 앞/뒤 청크의 행 번호(-1이면 없음)다.
+    """
+
+    def __init__(self, sources: Iterable[Optional[str]], starts: np.ndarray, ends: np.ndarray) -> None:
+        self.sources = list(sources)
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.prev = np.full(len(self.starts), -1, dtype=np.int64)
+        self.next = np.full(len(self.starts), -1, dtype=np.int64)
+
+        valid = np.array([source is not None for source in self.sources], dtype=bool) & (self.starts >= 0)
+        codes = {source: code for code, source in enumerate(dict.fromkeys(s for s in self.sources if s is not None))}
+        source_codes = np.array([codes.get(source, -1) for source in self.sources], dtype=np.int64)
+        rows = np.flatnonzero(valid)
+        # 출처 → 시작 → 끝 순으로 정렬하면 같은 출처의 청크가 오프셋 순서로 이어진다
+        order = rows[np.lexsort((self.ends[rows], self.starts[rows], source_codes[rows]))]
+        same_source = source_codes[order[1:]] == source_codes[order[:-1]]
+        self.prev[order[1:][same_source]] = order[:-1][same_source]
+        self.next[order[:-1][same_source]] = order[1:][same_source]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def has_span(self, row: int) -> bool:
+        return self.sources[row] is not None and self.starts[row] >= 0
+
+    def expand(self, row: int, window_chars: int) -> Tuple[int, int]:
+        """row의 구간에서 시작해 앞/뒤 이웃 청크를 번갈아 붙여 window_chars 이내의 가장 넓은 구간을 반환한다.
+
+        이웃을 붙이면 window_chars를 넘는 쪽은 더 넓히지 않는다 (청크 경계에서 끊어 문장이 잘리지 않게).
+        """
+
+        start, end = int(self.starts[row]), int(self.ends[row])
+        left, right = int(self.prev[row]), int(self.next[row])
+        while left >= 0 or right >= 0:
+            grown = False
+            if left >= 0:
+                candidate = min(start, int(self.starts[left]))
+                if end - candidate <= window_chars:
+                    start, left, grown = candidate, int(self.prev[left]), True
+                else:
+                    left = -1
+            if right >= 0:
+                candidate = max(end, int(self.ends[right]))
+                if candidate - start <= window_chars:
+                    end, right, grown = candidate, int(self.next[right]), True
+                else:
+                    right = -1
+            if not grown:
+                break
+        return start, end
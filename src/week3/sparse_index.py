@@ -0,0 +1,161 @@
+"""3주차 희소(BM25) 역색인.
+
+한국어 문서를 형태소 분석기 없이 검색하기 위해 단어 토큰과 한글 음절 2-gram을 함께
+색인한다. 예: "BLISS.5 바우처를" → ["bliss.5", "bliss", "5", "바우처를", "바우", "우처", "처를"]
+("바우처"로 검색해도 2-gram "바우", "우처"가 일치한다).
+
+색인은 용어별 CSR(posting) 구조로 저장하며, 각 posting에는 BM25의 문서 쪽 항
+tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))을 미리 계산해 둔다.
+검색 시에는 질의 용어의 posting만 모아 합산하므로 전체 문서를 훑지 않는다.
+
+    <index_dir>/sparse_index.npz
+    ├── terms     # 정렬된 용어 목록 (용어 번호 = 위치)
+    ├── indptr    # (용어 수 + 1,) posting 구간
+    ├── doc_ids   # (posting 수,) int32 행 번호
+    ├── weights   # (posting 수,) float32 BM25 문서 항
+    └── idf       # (용어 수,) float32
+"""
+
+from __future__ import annotations
+
+import math
+import re
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+SPARSE_FILENAME = "sparse_index.npz"
+
+_WORD_RE = re.compile(r"[0-9a-z가-힣]+(?:[.\-_/][0-9a-z가-힣]+)*")
+_PART_RE = re.compile(r"[.\-_/]")
+_HANGUL_RE = re.compile(r"[가-힣]{3,}")
+
+
+def tokenize(text: str) -> List[str]:
+    """단어 토큰 + 구분자(. - _ /)로 나눈 조각 + 3음절 이상 한글 구간의 2-gram을 반환한다."""
+
+    terms: List[str] = []
+    for word in _WORD_RE.findall(unicodedata.normalize("NFKC", text).lower()):
+        terms.append(word)
+        parts = _PART_RE.split(word)
+        if len(parts) > 1:
+            terms.extend(parts)
+        for run in _HANGUL_RE.findall(word):
+            terms.extend(run[i : i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+class SparseIndex:
+    """용어별 CSR posting으로 저장한 BM25 역색인."""
+
+    def __init__(
+        self,
+        terms: List[str],
+        indptr: np.ndarray,
+        doc_ids: np.ndarray,
+        weights: np.ndarray,
+        idf: np.ndarray,
+        num_docs: int,
+    ) -> None:
+        self.terms = list(terms)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.idf = np.asarray(idf, dtype=np.float32)
+        self.num_docs = int(num_docs)
+        self._vocab: Dict[str, int] = {term: idx for idx, term in enumerate(self.terms)}
+
+    def __len__(self) -> int:
+        return self.num_docs
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.indptr.nbytes + self.doc_ids.nbytes + self.weights.nbytes + self.idf.nbytes)
+
+    @classmethod
+    def build(cls, texts: Iterable[str], k1: float = 1.5, b: float = 0.75) -> "SparseIndex":
+        counts = [Counter(tokenize(text)) for text in texts]
+        num_docs = len(counts)
+        doc_len = np.array([sum(counter.values()) for counter in counts], dtype=np.float32)
+        avgdl = float(doc_len.mean()) if num_docs and doc_len.mean() > 0 else 1.0
+
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for doc_id, counter in enumerate(counts):
+            for term, tf in counter.items():
+                postings.setdefault(term, []).append((doc_id, tf))
+
+        terms = sorted(postings)
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(postings[term]) for term in terms])
+        doc_ids = np.empty(indptr[-1], dtype=np.int32)
+        tfs = np.empty(indptr[-1], dtype=np.float32)
+        idf = np.empty(len(terms), dtype=np.float32)
+        for term_id, term in enumerate(terms):
+            lo, hi = indptr[term_id], indptr[term_id + 1]
+            rows, freqs = zip(*postings[term])
+            doc_ids[lo:hi] = rows
+            tfs[lo:hi] = freqs
+            df = hi - lo
+            idf[term_id] = math.log(1 + (num_docs - df + 0.5) / (df + 0.5))
+
+        norm = k1 * (1 - b + b * doc_len[doc_ids] / avgdl)
+        weights = tfs * (k1 + 1) / (tfs + norm)
+        return cls(terms, indptr, doc_ids, weights, idf, num_docs)
+
+    def search(self, query: str, k: int, rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """질의 용어의 posting만 합산해 (점수, 행 번호) 상위 k개를 점수 내림차순으로 반환한다.
+
+        rows가 주어지면 해당 행(메타데이터 필터 결과)의 posting만 사용한다.
+        """
+
+        term_ids = [self._vocab[term] for term in Counter(tokenize(query)) if term in self._vocab]
+        if not term_ids or k <= 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        slices = [slice(self.indptr[t], self.indptr[t + 1]) for t in term_ids]
+        ids = np.concatenate([self.doc_ids[s] for s in slices])
+        contrib = np.concatenate([self.weights[s] * self.idf[t] for s, t in zip(slices, term_ids)])
+        if rows is not None:
+            keep = np.isin(ids, rows)
+            ids, contrib = ids[keep], contrib[keep]
+            if len(ids) == 0:
+                return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        # 후보 문서(posting에 등장한 문서)끼리만 점수를 모은다
+        candidates, inverse = np.unique(ids, return_inverse=True)
+        scores = np.bincount(inverse, weights=contrib).astype(np.float32)
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return scores[top], candidates[top].astype(np.int64)
+
+    def save(self, output_dir: Path) -> Path:
+        path = output_dir / SPARSE_FILENAME
+        np.savez(
+            path,
+            terms=np.array(self.terms, dtype=str),
+            indptr=self.indptr,
+            doc_ids=self.doc_ids,
+            weights=self.weights,
+            idf=self.idf,
+            num_docs=np.array(self.num_docs),
+        )
+        return path
+
+
+def load_sparse_index(index_dir: Path) -> Optional[SparseIndex]:
+    path = index_dir / SPARSE_FILENAME
+    if not path.exists():
+        return None
+    with np.load(path) as data:
+        return SparseIndex(
+            data["terms"].tolist(),
+            data["indptr"],
+            data["doc_ids"],
+            data["weights"],
+            data["idf"],
+            int(data["num_docs"]),
+        )
@@ -0,0 +1,120 @@
+"""3주차 벡터 양자화 저장 및 근사 점수 계산.
+
+정규화된 float32 벡터를 float16 또는 차원별 스케일을 갖는 대칭 int8로 저장한다.
+검색 시에는 양자화 벡터로 전체 후보의 근사 점수를 구하고, 상위 후보만 디스크의
+float32 벡터(메모리 맵)로 재계산하는 용도로 쓴다.
+
+    <index_dir>/
+    ├── vectors.npy              # 정규화 float32 (재점수용, 메모리 맵으로 읽음)
+    └── quantized_vectors.npz    # codes(float16|int8), scale(float32, int8 전용), precision
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+PRECISIONS = ("float32", "float16", "int8")
+VECTORS_FILENAME = "vectors.npy"
+QUANTIZED_FILENAME = "quantized_vectors.npz"
+SCORE_BLOCK_ROWS = 65_536  # 근사 점수 계산 시 float32로 복원하는 블록 크기 (임시 메모리 상한)
+
+
+class QuantizedVectors:
+    """float16/int8로 압축된 벡터 행렬.
+
+    int8은 차원 d마다 scale[d] = max|x[:, d]| / 127 로 나눠 반올림한 값을 저장하며,
+    x ≈ codes * scale 로 복원된다. 내적은 codes @ (query * scale)로 계산해 복원 비용을 줄인다.
+    """
+
+    def __init__(self, codes: np.ndarray, precision: str, scale: Optional[np.ndarray] = None) -> None:
+        if precision not in ("float16", "int8"):
+            raise ValueError(f"지원하지 않는 양자화 정밀도입니다: {precision}")
+        if precision == "int8" and scale is None:
+            raise ValueError("int8 양자화에는 차원별 scale이 필요합니다.")
+        self.codes = codes
+        self.precision = precision
+        self.scale = None if scale is None else np.asarray(scale, dtype="float32")
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codes.nbytes + (self.scale.nbytes if self.scale is not None else 0))
+
+    @classmethod
+    def from_vectors(cls, vectors: np.ndarray, precision: str) -> "QuantizedVectors":
+        vectors = np.asarray(vectors, dtype="float32")
+        if precision == "float16":
+            return cls(vectors.astype(np.float16), precision)
+        if precision == "int8":
+            scale = np.abs(vectors).max(axis=0) / 127.0
+            scale[scale == 0] = 1.0
+            codes = np.clip(np.rint(vectors / scale), -127, 127).astype(np.int8)
+            return cls(codes, precision, scale.astype("float32"))
+        raise ValueError(f"지원하지 않는 양자화 정밀도입니다: {precision}")
+
+    def score(self, query_vec: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """query_vec와의 근사 내적을 반환한다. rows가 주어지면 해당 행만 계산한다.
+
+        query_vec가 (dim,)이면 (n,), 질의 행렬 (q, dim)이면 (q, n) 배열을 반환한다.
+        """
+
+        query = np.asarray(query_vec, dtype="float32")
+        if self.scale is not None:
+            query = query * self.scale
+        queries = np.atleast_2d(query)
+        codes = self.codes if rows is None else self.codes[rows]
+        sims = np.empty((len(queries), len(codes)), dtype="float32")
+        for lo in range(0, len(codes), SCORE_BLOCK_ROWS):
+            hi = lo + SCORE_BLOCK_ROWS
+            sims[:, lo:hi] = queries @ codes[lo:hi].astype("float32").T
+        return sims[0] if query.ndim == 1 else sims
+
+    def dequantize(self) -> np.ndarray:
+        vectors = self.codes.astype("float32")
+        if self.scale is not None:
+            vectors *= self.scale
+        return vectors
+
+    def save(self, output_dir: Path) -> Path:
+        path = output_dir / QUANTIZED_FILENAME
+        arrays = {"codes": self.codes, "precision": np.array(self.precision)}
+        if self.scale is not None:
+            arrays["scale"] = self.scale
+        np.savez(path, **arrays)
+        return path
+
+
+def write_quantized_vectors(vectors: np.ndarray, output_dir: Path, precision: str) -> Optional[Path]:
+    """precision이 float16/int8이면 정규화 float32(vectors.npy)와 양자화 파일을 함께 저장한다."""
+
+    if precision not in PRECISIONS:
+        raise ValueError(f"precision은 {PRECISIONS} 중 하나여야 합니다: {precision}")
+    if precision == "float32":
+        return None
+    vectors = np.asarray(vectors, dtype="float32")
+    vectors = vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-10)
+    np.save(output_dir / VECTORS_FILENAME, vectors)
+    return QuantizedVectors.from_vectors(vectors, precision).save(output_dir)
+
+
+def load_quantized_vectors(index_dir: Path) -> Optional[QuantizedVectors]:
+    path = index_dir / QUANTIZED_FILENAME
+    if not path.exists():
+        return None
+    with np.load(path) as data:
+        scale = data["scale"] if "scale" in data.files else None
+        return QuantizedVectors(data["codes"], str(data["precision"]), scale)
+
+
+def load_float32_vectors(index_dir: Path) -> Optional[np.ndarray]:
+    """재점수용 정규화 float32 벡터를 메모리 맵으로 연다 (RAM에 통째로 올리지 않음)."""
+
+    path = index_dir / VECTORS_FILENAME
+    if not path.exists():
+        return None
+    return np.load(path, mmap_mode="r")
@@ -0,0 +1,162 @@
+"""3주차 벡터 샤드 저장 및 분산(scatter-gather) 검색.
+
+한 전략의 정규화 벡터를 N개의 `.npy` 샤드로 나눠 저장하고, 검색 시에는 프로세스 풀의
+워커들이 샤드를 메모리 맵으로 열어 샤드별 top-k를 구한 뒤 힙으로 병합한다.
+
+    <index_dir>/shards/
+    ├── shards.json      # {"dim": 384, "count": 2000000, "shards": [{"file": ..., "offset": ...}, ...]}
+    ├── shard_000.npy
+    └── shard_001.npy
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import json
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+SHARDS_DIRNAME = "shards"
+SHARDS_MANIFEST = "shards.json"
+
+
+def write_vector_shards(vectors: np.ndarray, output_dir: Path, num_shards: int) -> Path:
+    """벡터를 행 방향으로 num_shards개로 나눠 저장하고 shards 폴더 경로를 반환한다.
+
+    검색 시 내적을 코사인 유사도로 쓰기 위해 저장 전에 L2 정규화한다.
+    """
+
+    if num_shards < 1:
+        raise ValueError("num_shards는 1 이상이어야 합니다.")
+    vectors = np.asarray(vectors, dtype="float32")
+    shard_dir = output_dir / SHARDS_DIRNAME
+    shard_dir.mkdir(parents=True, exist_ok=True)
+
+    bounds = np.linspace(0, len(vectors), num_shards + 1, dtype=int)
+    shards = []
+    for shard_idx, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:])):
+        block = vectors[start:stop]
+        block = block / (np.linalg.norm(block, axis=1, keepdims=True) + 1e-10)
+        name = f"shard_{shard_idx:03d}.npy"
+        np.save(shard_dir / name, block.astype("float32"))
+        shards.append({"file": name, "offset": int(start), "count": int(stop - start)})
+
+    write_shards_manifest(shard_dir, int(vectors.shape[1]), shards)
+    return shard_dir
+
+
+def write_shards_manifest(shard_dir: Path, dim: int, shards: List[Dict]) -> Path:
+    """shards.json을 기록한다. shards 항목은 {"file", "offset", "count"} 형식이다."""
+
+    manifest = {"dim": dim, "count": sum(int(shard["count"]) for shard in shards), "shards": shards}
+    path = shard_dir / SHARDS_MANIFEST
+    path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return path
+
+
+def read_shards_manifest(index_dir: Path) -> Optional[Dict]:
+    path = index_dir / SHARDS_DIRNAME / SHARDS_MANIFEST
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+# 워커 프로세스마다 한 번씩 연 메모리 맵 샤드 (경로 → 배열)
+_WORKER_SHARDS: Dict[str, np.ndarray] = {}
+
+
+def _open_shard(path: str) -> np.ndarray:
+    shard = _WORKER_SHARDS.get(path)
+    if shard is None:
+        shard = np.load(path, mmap_mode="r")
+        _WORKER_SHARDS[path] = shard
+    return shard
+
+
+def search_shard(path: str, offset: int, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """샤드 하나에서 질의별 top-k (점수, 전역 행 번호)를 구한다. 결과는 점수 내림차순."""
+
+    shard = _open_shard(path)
+    sims = queries @ shard.T  # (질의 수, 샤드 크기)
+    k = min(k, sims.shape[1])
+    if k == 0:
+        empty = np.empty((len(queries), 0))
+        return empty.astype("float32"), empty.astype("int64")
+    top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(sims, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    return np.take_along_axis(top_scores, order, axis=1), top.astype("int64") + offset
+
+
+def merge_topk(
+    partials: Iterable[Tuple[np.ndarray, np.ndarray]],
+    num_queries: int,
+    k: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """샤드별 top-k 결과를 질의마다 힙으로 병합해 전체 top-k를 만든다."""
+
+    partials = list(partials)
+    scores = np.full((num_queries, k), -np.inf, dtype="float32")
+    ids = np.full((num_queries, k), -1, dtype="int64")
+    for q in range(num_queries):
+        candidates = itertools.chain.from_iterable(
+            zip(part_scores[q].tolist(), part_ids[q].tolist()) for part_scores, part_ids in partials
+        )
+        best = heapq.nlargest(k, candidates)
+        if best:
+            scores[q, : len(best)] = [score for score, _ in best]
+            ids[q, : len(best)] = [idx for _, idx in best]
+    return scores, ids
+
+
+class ShardedSearcher:
+    """샤드 폴더를 프로세스 풀에 분산해 검색하는 검색기.
+
+    workers=0이면 현재 프로세스에서 샤드를 순서대로 검색한다(디버깅/소규모용).
+    """
+
+    def __init__(self, index_dir: Path, workers: int = 0, executor: Optional[Executor] = None) -> None:
+        manifest = read_shards_manifest(index_dir)
+        if manifest is None:
+            raise FileNotFoundError(f"샤드 매니페스트를 찾을 수 없습니다: {index_dir / SHARDS_DIRNAME}")
+        shard_dir = index_dir / SHARDS_DIRNAME
+        self.dim = int(manifest["dim"])
+        self.count = int(manifest["count"])
+        self.shards: List[Tuple[str, int]] = [
+            (str(shard_dir / shard["file"]), int(shard["offset"])) for shard in manifest["shards"]
+        ]
+        self._owns_executor = executor is None and workers > 0
+        self._executor = executor or (ProcessPoolExecutor(max_workers=workers) if workers > 0 else None)
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """정규화된 질의 행렬 (q, dim)에 대해 (점수, 행 번호) 배열 (q, k)를 반환한다.
+
+        후보가 k개보다 적으면 남는 자리는 점수 -inf, 행 번호 -1로 채운다.
+        """
+
+        queries = np.atleast_2d(np.asarray(queries, dtype="float32"))
+        if queries.shape[1] != self.dim:
+            raise ValueError(f"질의 차원({queries.shape[1]})이 샤드 차원({self.dim})과 다릅니다.")
+
+        if self._executor is None:
+            partials = [search_shard(path, offset, queries, k) for path, offset in self.shards]
+        else:
+            futures = [self._executor.submit(search_shard, path, offset, queries, k) for path, offset in self.shards]
+            partials = [future.result() for future in futures]
+        return merge_topk(partials, len(queries), k)
+
+    def close(self) -> None:
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> "ShardedSearcher":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -5,22 +5,45 @@ from __future__ import annotations
 import json
 from dataclasses import asdict
 from pathlib import Path
-from typing import Iterable
+from typing import Dict, Iterable, Optional
 
 import faiss
 import numpy as np
 
+from dim_reduction import DimensionReducer
 from embedding_pipeline import EmbeddingResult
+from sparse_index import SparseIndex
+from vector_quantization import write_quantized_vectors
+from vector_shards import write_vector_shards
 
 
-def build_faiss_index(embeddings: Iterable[EmbeddingResult], output_dir: Path) -> Path:
-    """임베딩 결과를 받아 FAISS 인덱스를 생성하고 저장한다."""
+def build_faiss_index(
+    embeddings: Iterable[EmbeddingResult],
+    output_dir: Path,
+    num_shards: int = 1,
+    precision: str = "float32",
+    reducer: Optional[DimensionReducer] = None,
+    sparse: Optional[Dict[str, float]] = None,
+) -> Path:
+    """임베딩 결과를 받아 FAISS 인덱스를 생성하고 저장한다.
+
+    num_shards가 2 이상이면 분산 검색용 벡터 샤드(shards/)도 함께 저장한다.
+    precision이 float16/int8이면 양자화 벡터와 재점수용 float32 벡터 파일을 함께 저장한다.
+    reducer가 주어지면 검색용 벡터(FAISS/샤드/양자화)는 축소 차원으로 저장하고 reducer.npz를 남긴다.
+    metadata.json에는 원본 임베딩을 그대로 기록한다. 단 양자화 인덱스는 검색·재점수에 vectors.npy만 쓰므로
+    metadata.json에 doc_id와 본문만 남긴다 (로드 시 float 목록 파싱으로 메모리를 쓰지 않도록).
+    sparse(BM25 파라미터 {"k1", "b"})가 주어지면 청크 텍스트로 희소 역색인(sparse_index.npz)을 만든다.
+    """
 
     output_dir.mkdir(parents=True, exist_ok=True)
 
+    embeddings = list(embeddings)
     vectors = np.array([result.vector for result in embeddings], dtype="float32")
     if vectors.size == 0:
         raise ValueError("저장할 임베딩이 없습니다.")
+    if reducer is not None:
+        vectors = reducer.transform(vectors)
+        reducer.save(output_dir)
 
     index = faiss.IndexFlatL2(vectors.shape[1])
     index.add(vectors)
@@ -29,8 +52,18 @@ def build_faiss_index(embeddings: Iterable[EmbeddingResult], output_dir: Path) -
     faiss.write_index(index, str(index_path))
 
     metadata_path = output_dir / "metadata.json"
+    if precision == "float32":
+        records = [asdict(result) for result in embeddings]
+    else:
+        records = [{"doc_id": result.doc_id, "text": result.text} for result in embeddings]
     with metadata_path.open("w", encoding="utf-8") as f:
-        json.dump([asdict(result) for result in embeddings], f, ensure_ascii=False, indent=2)
+        json.dump(records, f, ensure_ascii=False, indent=2)
+
+    if num_shards > 1:
+        write_vector_shards(vectors, output_dir, num_shards)
+    write_quantized_vectors(vectors, output_dir, precision)
+    if sparse is not None:
+        SparseIndex.build((result.text for result in embeddings), **sparse).save(output_dir)
 
     return index_path
 
@@ -0,0 +1,80 @@
+"""4주차 적응형 검색 깊이(adaptive k).
+
+고정 k 대신 상위 max_k개 후보의 유사도 분포를 보고 질의마다 몇 개를 LLM에 넘길지 정한다.
+
+- gap: 순위상 이웃한 두 결과의 점수 차이가 gap 이상이면 그 앞에서 자른다 (0.9 → 0.2 같은 급락)
+- relative: 점수가 1위 점수 x relative 미만인 결과부터 자른다
+- 결과 수는 항상 [min_k, max_k] 범위로 제한한다 (점수가 비슷하게 이어지면 max_k까지 유지)
+
+질의별로 고른 k는 AdaptiveKLog에 기록해 분포를 보고 gap/relative를 조정할 수 있게 한다.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional
+
+import numpy as np
+
+
+def adaptive_cut(
+    scores: np.ndarray,
+    min_k: int = 1,
+    max_k: Optional[int] = None,
+    gap: Optional[float] = None,
+    relative: Optional[float] = None,
+) -> int:
+    """내림차순(순위순) 점수 배열에서 남길 결과 수를 반환한다."""
+
+    n = len(scores) if max_k is None else min(len(scores), max_k)
+    min_k = min(max(min_k, 1), n)
+    if n <= min_k:
+        return n
+    scores = np.asarray(scores[:n], dtype="float64")
+    cut = np.zeros(n, dtype=bool)
+    if gap is not None:
+        cut[1:] |= (scores[:-1] - scores[1:]) >= gap
+    if relative is not None and scores[0] > 0:
+        cut |= scores < relative * scores[0]
+    cut[:min_k] = False
+    positions = np.flatnonzero(cut)
+    return int(positions[0]) if len(positions) else n
+
+
+class AdaptiveKLog:
+    """질의별로 선택된 k 기록 (최근 항목 + 전체 분포, 스레드 안전)."""
+
+    def __init__(self, max_recent: int = 100, verbose: bool = False) -> None:
+        self.verbose = verbose
+        self.counts: Counter = Counter()
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=max_recent)
+        self._lock = threading.Lock()
+
+    def record(self, query: str, k: int, scores: np.ndarray) -> None:
+        entry = {
+            "query": query,
+            "k": k,
+            "top_score": float(scores[0]) if len(scores) else None,
+            "cut_score": float(scores[k - 1]) if k else None,
+            "next_score": float(scores[k]) if k < len(scores) else None,
+        }
+        with self._lock:
+            self.counts[k] += 1
+            self._recent.append(entry)
+        if self.verbose:
+            print(f"ℹ️  adaptive k={k} (1위 {entry['top_score']:.3f}, 마지막 {entry['cut_score']:.3f}) | {query}")
+
+    def recent(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._recent)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = sum(self.counts.values())
+            return {
+                "queries": total,
+                "mean_k": sum(k * n for k, n in self.counts.items()) / total if total else None,
+                "k_counts": {str(k): n for k, n in sorted(self.counts.items())},
+                "recent": list(self._recent)[-10:],
+            }
@@ -0,0 +1,90 @@
+"""4주차 비동기 검색 실행기.
+
+임베딩 모델 추론과 행렬 곱은 CPU 작업이라 이벤트 루프에서 직접 실행하면 루프 전체가 멈춘다.
+크기가 제한된 스레드 풀에서 실행하고(numpy/torch 연산은 GIL을 놓는다), 동시에 실행 중이거나
+대기 중인 작업 수를 세마포어로 제한한다.
+
+호출 측이 취소되면 아직 시작하지 않은 작업은 풀에서 취소되고, 이미 실행 중인 단계는 끝까지
+돌지만 그 다음 단계(예: 임베딩 후 점수 계산)는 시작하지 않는다.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class AsyncRetrievalExecutor:
+    """검색 단계를 실행하는 제한된 스레드 풀 + 동시 실행 한도."""
+
+    def __init__(self, max_workers: int = 4, max_concurrency: Optional[int] = None) -> None:
+        if max_workers < 1:
+            raise ValueError("max_workers는 1 이상이어야 합니다.")
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency or max_workers * 2
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="retrieval")
+        # asyncio.Semaphore는 이벤트 루프별로 만들어야 한다
+        self._semaphores: Dict[int, asyncio.Semaphore] = {}
+        self._lock = threading.Lock()
+        self.running = 0
+        self.cancelled = 0
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop_id = id(asyncio.get_running_loop())
+        with self._lock:
+            semaphore = self._semaphores.get(loop_id)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self.max_concurrency)
+                self._semaphores[loop_id] = semaphore
+            return semaphore
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """fn(*args, **kwargs)를 스레드 풀에서 실행하고 결과를 기다린다."""
+
+        async with self._semaphore():
+            future = self._pool.submit(functools.partial(fn, *args, **kwargs))
+            self.running += 1
+            try:
+                return await asyncio.wrap_future(future)
+            except asyncio.CancelledError:
+                # 아직 대기 중이면 실행되지 않는다 (이미 실행 중인 작업은 끝나면 결과를 버린다)
+                future.cancel()
+                self.cancelled += 1
+                raise
+            finally:
+                self.running -= 1
+
+    def submit(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> "Future[T]":
+        """동기 코드에서 같은 스레드 풀에 작업을 제출한다 (동시 실행 한도는 적용하지 않음)."""
+
+        return self._pool.submit(fn, *args, **kwargs)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "max_workers": self.max_workers,
+            "max_concurrency": self.max_concurrency,
+            "running": self.running,
+            "cancelled": self.cancelled,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+_DEFAULT_EXECUTOR: Optional[AsyncRetrievalExecutor] = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def default_retrieval_executor() -> AsyncRetrievalExecutor:
+    """실행기를 따로 지정하지 않은 검색기들이 공유하는 프로세스 전역 실행기."""
+
+    global _DEFAULT_EXECUTOR
+    with _DEFAULT_LOCK:
+        if _DEFAULT_EXECUTOR is None:
+            _DEFAULT_EXECUTOR = AsyncRetrievalExecutor()
+        return _DEFAULT_EXECUTOR
@@ -0,0 +1,214 @@
+"""4주차 토큰 예산 기반 컨텍스트 패킹.
+
+RetrievalQA("stuff")는 검색된 k개 청크를 그대로 이어 붙이므로, 겹침(overlap)이 있는 fixed 청크나
+이웃 확장으로 넓힌 창은 같은 원문이 프롬프트에 두 번 들어간다. 검색과 LLM 사이에서
+
+1. 같은 출처에서 원문 구간(start/end)이 겹치는 청크를 하나로 합치고 (본문이 같은 청크도 하나만 남김)
+2. 점수 / 토큰 수가 큰 순서로 token_budget까지 탐욕적으로 채운 뒤
+3. 원래 검색 순위 순서로 돌려준다.
+
+검색 결과에는 점수가 실리지 않으므로 점수는 순위 이득 1 / log2(순위 + 2)(nDCG와 같은 할인)를 쓰고,
+합친 청크는 구성 청크 점수의 합을 갖는다. 토큰 수는 Gemini 토크나이저를 호출하지 않는 추정치다
+(ASCII 약 4자당 1토큰, 한글 등 그 밖의 문자 약 1.5자당 1토큰). 실제 토큰 수가 필요하면 token_counter를 넘긴다.
+ContextPackingRetriever는 검색기를 감싸 LLM 경로(invoke/ainvoke)의 결과에만 패킹을 적용한다.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import math
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain.schema import Document
+from langchain_core.retrievers import BaseRetriever
+
+_LAST_REPORT: contextvars.ContextVar[Optional[Dict[str, int]]] = contextvars.ContextVar(
+    "context_packing_last_report", default=None
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Gemini 토큰 수 추정치 (ASCII 4자 ≈ 1토큰, 그 밖의 문자 1.5자 ≈ 1토큰)."""
+
+    ascii_chars = sum(1 for ch in text if ch.isascii())
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars) / 1.5)
+
+
+def _span(doc: Document) -> Optional[Tuple[str, int, int]]:
+    metadata = doc.metadata or {}
+    source, start, end = metadata.get("source"), metadata.get("start"), metadata.get("end")
+    if source is None or start is None or end is None:
+        return None
+    # Week2 recursive/sentence 청킹은 원문에서 위치를 찾지 못하면 start=-1을 기록한다
+    if int(start) < 0:
+        return None
+    # 본문 길이가 구간 길이와 다르면(정규화된 문장 청크 등) 오프셋으로 이어 붙일 수 없다
+    if len(doc.page_content) != int(end) - int(start):
+        return None
+    return str(source), int(start), int(end)
+
+
+class ContextPacker:
+    """검색 결과를 겹침 제거 + 토큰 예산 안으로 줄이는 패커 (요청별 보고 + 누적 통계)."""
+
+    def __init__(self, token_budget: int = 2000, token_counter: Callable[[str], int] = estimate_tokens) -> None:
+        if token_budget < 1:
+            raise ValueError("token_budget은 1 이상이어야 합니다.")
+        self.token_budget = token_budget
+        self.token_counter = token_counter
+        self.requests = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.overlap_tokens_removed = 0
+        self._lock = threading.Lock()
+
+    def _merge_overlaps(self, docs: List[Document]) -> List[Tuple[int, float, Document]]:
+        """(대표 순위, 점수 합, 문서) 목록. 같은 출처에서 겹치는 구간과 본문이 같은 청크를 합친다.
+
+        구간은 검색 순위와 무관하게 출처별로 시작 위치 순으로 정렬해 한 번 훑으며 합치므로
+        입력 순서가 달라도 결과 구간이 같고, 합친 구간끼리 다시 겹치는 경우가 남지 않는다.
+        """
+
+        units: List[list] = []  # [대표 순위, 점수, 출처, 시작, 끝, 본문, 메타데이터, [(순위, doc_id)]]
+        seen_texts: Dict[str, list] = {}
+        spans_by_source: Dict[str, List[Tuple[int, int, int, float, Document]]] = {}
+        for rank, doc in enumerate(docs):
+            gain = 1.0 / math.log2(rank + 2)
+            doc_id = (doc.metadata or {}).get("doc_id")
+            span = _span(doc)
+            if span is None:
+                unit = seen_texts.get(doc.page_content)
+                if unit is not None:
+                    unit[1] += gain
+                    unit[7].append((rank, doc_id))
+                    continue
+                unit = [rank, gain, None, -1, -1, doc.page_content, dict(doc.metadata or {}), [(rank, doc_id)]]
+                seen_texts[doc.page_content] = unit
+                units.append(unit)
+                continue
+            source, start, end = span
+            spans_by_source.setdefault(source, []).append((start, end, rank, gain, doc))
+
+        for source, spans in spans_by_source.items():
+            unit = None
+            for start, end, rank, gain, doc in sorted(spans, key=lambda s: (s[0], s[1])):
+                doc_id = doc.metadata.get("doc_id")
+                if unit is None or start >= unit[4]:
+                    unit = [rank, gain, source, start, end, doc.page_content, dict(doc.metadata), [(rank, doc_id)]]
+                    units.append(unit)
+                    continue
+                # 겹치는 구간 (시작 순 정렬이므로 앞쪽은 이미 덮여 있다): 뒤쪽에서 겹치지 않는 부분만 이어 붙인다
+                if end > unit[4]:
+                    unit[5] += doc.page_content[unit[4] - start :]
+                    unit[4] = end
+                unit[1] += gain
+                if rank < unit[0]:
+                    # 메타데이터는 가장 높은 순위 청크의 것을 쓴다
+                    unit[0], unit[6] = rank, dict(doc.metadata)
+                unit[7].append((rank, doc_id))
+
+        results = []
+        for rank, score, source, start, end, text, metadata, members in sorted(units, key=lambda u: u[0]):
+            if len(members) > 1:
+                metadata = {**metadata, "packed_from": [doc_id for _, doc_id in sorted(members, key=lambda m: m[0])]}
+                if source is not None:
+                    metadata["start"], metadata["end"] = start, end
+            results.append((rank, score, Document(page_content=text, metadata=metadata)))
+        return results
+
+    def pack(self, docs: List[Document]) -> Tuple[List[Document], Dict[str, int]]:
+        """겹침을 합치고 점수/토큰 순으로 예산까지 채운 문서 목록(검색 순위 순)과 요청 보고를 반환한다."""
+
+        tokens_in = sum(self.token_counter(doc.page_content) for doc in docs)
+        units = [(rank, score, doc, self.token_counter(doc.page_content)) for rank, score, doc in self._merge_overlaps(docs)]
+        merged_tokens = sum(tokens for *_, tokens in units)
+
+        chosen = []
+        used = 0
+        for unit in sorted(units, key=lambda u: u[1] / max(u[3], 1), reverse=True):
+            if used + unit[3] <= self.token_budget:
+                chosen.append(unit)
+                used += unit[3]
+        if not chosen and units:
+            # 예산보다 긴 청크만 있으면 최상위 하나는 보낸다 (빈 컨텍스트로 답하지 않도록)
+            chosen = [min(units, key=lambda u: u[0])]
+            used = chosen[0][3]
+        chosen.sort(key=lambda u: u[0])
+
+        report = {
+            "documents_in": len(docs),
+            "documents_out": len(chosen),
+            "tokens_in": tokens_in,
+            "tokens_out": used,
+            "tokens_saved": tokens_in - used,
+            "overlap_tokens_removed": tokens_in - merged_tokens,
+        }
+        with self._lock:
+            self.requests += 1
+            self.tokens_in += tokens_in
+            self.tokens_out += used
+            self.overlap_tokens_removed += tokens_in - merged_tokens
+        _LAST_REPORT.set(report)
+        return [doc for _, _, doc, _ in chosen], report
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            saved = self.tokens_in - self.tokens_out
+            return {
+                "token_budget": self.token_budget,
+                "requests": self.requests,
+                "tokens_in": self.tokens_in,
+                "tokens_out": self.tokens_out,
+                "tokens_saved": saved,
+                "overlap_tokens_removed": self.overlap_tokens_removed,
+                "saved_ratio": saved / self.tokens_in if self.tokens_in else 0.0,
+                "avg_tokens_saved": saved / self.requests if self.requests else 0.0,
+            }
+
+
+def last_packing_report() -> Optional[Dict[str, int]]:
+    """현재 컨텍스트(요청 스레드)에서 마지막으로 패킹한 결과의 보고 (패킹하지 않았으면 None)."""
+
+    return _LAST_REPORT.get()
+
+
+def reset_packing_report() -> None:
+    _LAST_REPORT.set(None)
+
+
+class ContextPackingRetriever(BaseRetriever):
+    """검색 결과의 겹치는 원문 구간을 합치고 점수/토큰 순으로 토큰 예산까지만 LLM에 넘기는 검색기.
+
+    패킹은 LLM 경로(invoke/ainvoke)에만 적용한다. 여러 질의의 검색 결과만 돌려주는 search_batch/asearch_batch
+    (API /search)는 기반 검색기 결과를 그대로 반환하고 패킹 통계에도 세지 않는다.
+    요청별 절감 토큰 수는 last_packing_report(), 누적 통계는 packer.stats()로 확인한다.
+    """
+
+    base: BaseRetriever
+    packer: ContextPacker
+    k: int = 5
+
+    @property
+    def documents(self) -> List[Document]:
+        return self.base.documents
+
+    def _get_relevant_documents(self, query: str) -> List[Document]:
+        return self.packer.pack(self.base.invoke(query))[0]
+
+    def search_batch(self, queries: List[str], k: Optional[int] = None) -> List[List[Document]]:
+        if not queries:
+            return []
+        if hasattr(self.base, "search_batch"):
+            return self.base.search_batch(queries, k)
+        return [self.base.get_relevant_documents(query) for query in queries]
+
+    async def asearch_batch(self, queries: List[str], k: Optional[int] = None) -> List[List[Document]]:
+        if not queries:
+            return []
+        if hasattr(self.base, "asearch_batch"):
+            return await self.base.asearch_batch(queries, k)
+        return [await self.base.ainvoke(query) for query in queries]
+
+    async def _aget_relevant_documents(self, query: str) -> List[Document]:
+        return self.packer.pack(await self.base.ainvoke(query))[0]
@@ -0,0 +1,310 @@
+"""4주차 내장 밀집 벡터 검색기.
+
+인덱스 벡터(float32 또는 양자화 + 재점수)와 질의 임베딩의 행렬 곱으로 top-k를 고른다.
+여러 질의는 한 번의 배치 인코딩 + 행렬-행렬 곱으로 처리하고(search_batch), MMR·메타데이터 필터·샤드 분산 검색·
+차원 축소·질의 임베딩 캐시·적응형 k를 지원한다. 하이브리드/재순위화/연합 등 다른 검색기는 이 검색기를 감싸거나 묶는다.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain.schema import Document
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_core.retrievers import BaseRetriever
+from pydantic import Field
+
+from adaptive_k import AdaptiveKLog, adaptive_cut
+from async_retrieval import AsyncRetrievalExecutor, default_retrieval_executor
+from chunk_columns import ChunkColumns
+from dim_reduction import DimensionReducer
+from query_cache import QueryEmbeddingCache
+from vector_quantization import QuantizedVectors
+from vector_shards import ShardedSearcher
+
+SEARCH_BLOCK_ELEMENTS = 1 << 25  # 배치 검색 시 한 번에 만드는 점수 행렬 원소 수 상한 (float32 128MB)
+
+
+def top_k_indices(sims: np.ndarray, k: int) -> np.ndarray:
+    """마지막 축에서 점수 상위 k개의 위치를 내림차순으로 반환한다.
+
+    argpartition으로 O(n)에 후보 k개를 고른 뒤 k개만 정렬한다. sims가 (q, n)이면 (q, k).
+    """
+
+    k = min(k, sims.shape[-1])
+    if k <= 0:
+        return np.empty(sims.shape[:-1] + (0,), dtype=int)
+    top = np.argpartition(-sims, k - 1, axis=-1)[..., :k]
+    order = np.argsort(-np.take_along_axis(sims, top, axis=-1), axis=-1, kind="stable")
+    return np.take_along_axis(top, order, axis=-1)
+
+
+class DenseRetriever(BaseRetriever):
+    """간단한 내장 벡터 검색기."""
+
+    documents: List[Document] = Field(default_factory=list)
+    vectors: np.ndarray = Field(...)
+    embedder: HuggingFaceEmbeddings
+    k: int = 5
+    use_mmr: bool = False
+    mmr_diversity: float = 0.5  # lambda 파라미터: 0.0=유사도만, 1.0=다양성만
+    mmr_fetch_k: Optional[int] = None  # MMR 후보를 유사도 상위 fetch_k개로 제한 (None이면 전체 후보)
+    # 통합 인덱스의 출처/페이지/전략 컬럼과 필터 (예: {"source": "BLISS_5_2504", "page": [1, 2]})
+    columns: Optional[ChunkColumns] = None
+    metadata_filter: Optional[Dict[str, Any]] = None
+    # 샤드 분산 검색기 (설정 시 필터/MMR이 없는 유사도 검색을 샤드 워커로 위임)
+    searcher: Optional[ShardedSearcher] = None
+    # 양자화 벡터 (설정 시 근사 점수로 상위 k * rescore_factor개를 고른 뒤 float32로 재점수)
+    quantized: Optional[QuantizedVectors] = None
+    rescore_factor: int = 4
+    # 차원 축소 인덱스의 투영 (설정 시 질의 벡터도 같은 차원으로 축소)
+    reducer: Optional[DimensionReducer] = None
+    # 질의 임베딩 LRU 캐시 (설정 시 같은 모델/질의 문자열은 인코딩을 건너뜀)
+    query_cache: Optional[QueryEmbeddingCache] = None
+    # 비동기 검색(ainvoke/asearch_batch)에 쓰는 제한된 실행기 (None이면 프로세스 공유 실행기)
+    executor: Optional[AsyncRetrievalExecutor] = None
+    # 적응형 k: 상위 adaptive_max_k(None이면 k)개 중 점수 급락(gap)/1위 대비 비율(relative) 지점에서 자름.
+    # k를 명시하지 않은 호출(LLM에 넘길 최종 검색)에만 적용되고, 후보 수를 명시한 호출은 고정 k를 쓴다.
+    # MMR 결과는 점수 내림차순이 아니어서 점수 급락 지점을 정할 수 없으므로 use_mmr이면 적용하지 않는다
+    adaptive_k: bool = False
+    adaptive_min_k: int = 1
+    adaptive_max_k: Optional[int] = None
+    adaptive_gap: Optional[float] = 0.1
+    adaptive_relative: Optional[float] = None
+    adaptive_log: Optional[AdaptiveKLog] = None
+
+    def _filtered_rows(self) -> Optional[np.ndarray]:
+        """metadata_filter를 만족하는 행 번호. 필터가 없으면 None(전체 검색)."""
+
+        if not self.metadata_filter:
+            return None
+        if self.columns is None:
+            raise ValueError("metadata_filter를 사용하려면 columns.npz가 있는 통합 인덱스가 필요합니다.")
+        return np.flatnonzero(self.columns.build_mask(self.metadata_filter))
+
+    def _encode_queries(self, queries: List[str]) -> np.ndarray:
+        if len(queries) == 1:
+            query_mat = np.array([self.embedder.embed_query(queries[0])], dtype="float32")
+        else:
+            # HuggingFaceEmbeddings.embed_query는 embed_documents([text])와 같으므로 한 번의 배치 인코딩으로 처리한다
+            query_mat = np.array(self.embedder.embed_documents(list(queries)), dtype="float32")
+        query_mat /= np.linalg.norm(query_mat, axis=1, keepdims=True) + 1e-10
+        return query_mat
+
+    def _embed_queries(self, queries: List[str], reduce: bool = True) -> np.ndarray:
+        """질의들을 한 번에 임베딩해 정규화(필요 시 차원 축소)한 (q, dim) 행렬을 반환한다.
+
+        query_cache가 있으면 캐시에 없는 질의만 인코딩하고 결과를 캐시에 넣는다.
+        reduce=False면 차원 축소 전 원본 임베딩을 반환한다 (여러 인덱스가 질의 임베딩을 공유할 때).
+        """
+
+        if self.query_cache is None:
+            query_mat = self._encode_queries(queries)
+        else:
+            model_name = str(getattr(self.embedder, "model_name", type(self.embedder).__name__))
+            cached = [self.query_cache.get(model_name, query) for query in queries]
+            missing = [idx for idx, vector in enumerate(cached) if vector is None]
+            if missing:
+                encoded = self._encode_queries([queries[idx] for idx in missing])
+                for idx, vector in zip(missing, encoded):
+                    self.query_cache.put(model_name, queries[idx], vector)
+                    cached[idx] = vector
+            query_mat = np.stack(cached).astype("float32")
+
+        if reduce and self.reducer is not None:
+            query_mat = self.reducer.transform(query_mat)
+        return query_mat
+
+    def _get_relevant_documents(self, query: str) -> List[Document]:
+        return self.search_batch([query])[0]
+
+    def search_batch(self, queries: List[str], k: Optional[int] = None) -> List[List[Document]]:
+        """여러 질의를 한 번에 임베딩하고 행렬-행렬 곱 한 번으로 점수를 계산해 질의별 top-k 문서를 반환한다."""
+
+        return [[self.documents[i] for i in indices] for indices in self.search_rows_batch(queries, k)]
+
+    def search_rows_batch(self, queries: List[str], k: Optional[int] = None) -> List[np.ndarray]:
+        """search_batch와 같지만 문서 대신 질의별 행 번호 배열(순위순)을 반환한다."""
+
+        if not queries:
+            return []
+        return self._search_rows(queries, self._embed_queries(queries), k)
+
+    async def asearch_rows_batch(self, queries: List[str], k: Optional[int] = None) -> List[np.ndarray]:
+        """search_rows_batch의 비동기 버전. 임베딩과 점수 계산을 실행기의 스레드 풀에서 단계별로 실행한다.
+
+        호출 측이 취소되면 진행 중인 단계가 끝난 뒤 다음 단계를 시작하지 않는다.
+        """
+
+        if not queries:
+            return []
+        executor = self.executor or default_retrieval_executor()
+        query_mat = await executor.run(self._embed_queries, queries)
+        return await executor.run(self._search_rows, queries, query_mat, k)
+
+    async def asearch_batch(self, queries: List[str], k: Optional[int] = None) -> List[List[Document]]:
+        return [[self.documents[i] for i in indices] for indices in await self.asearch_rows_batch(queries, k)]
+
+    def _search_rows(self, queries: List[str], query_mat: np.ndarray, k: Optional[int]) -> List[np.ndarray]:
+        """k가 None이고 adaptive_k가 켜져 있으면(MMR 제외) 질의별로 점수 분포에 따라 k를 정하고, 아니면 고정 k로 검색한다."""
+
+        if k is not None or not self.adaptive_k or self.use_mmr:
+            return self._search_query_mat(query_mat, self.k if k is None else k)
+
+        results = []
+        for query, query_vec, rows in zip(queries, query_mat, self._search_query_mat(query_mat, self.adaptive_max_k or self.k)):
+            scores = np.asarray(self.vectors[rows], dtype="float32") @ query_vec
+            chosen = adaptive_cut(
+                scores,
+                min_k=self.adaptive_min_k,
+                max_k=self.adaptive_max_k or self.k,
+                gap=self.adaptive_gap,
+                relative=self.adaptive_relative,
+            )
+            if self.adaptive_log is not None:
+                self.adaptive_log.record(query, chosen, scores)
+            results.append(rows[:chosen])
+        return results
+
+    def _search_query_mat(self, query_mat: np.ndarray, k: int) -> List[np.ndarray]:
+        """임베딩된 질의 행렬 (q, dim)로 질의별 상위 k개 행 번호를 구한다."""
+
+        # 필터가 있으면 조건을 만족하는 행만 점수를 계산한다
+        rows = self._filtered_rows()
+        if self.searcher is not None and rows is None and not self.use_mmr:
+            _, ids = self.searcher.search(query_mat, k)
+            return [row_ids[row_ids >= 0] for row_ids in ids]
+
+        vectors = self.vectors if rows is None else self.vectors[rows]
+        results: List[np.ndarray] = []
+        # (질의 수 x 후보 수) 점수 행렬이 SEARCH_BLOCK_ELEMENTS를 넘지 않도록 질의를 나눠 계산한다
+        block = max(1, SEARCH_BLOCK_ELEMENTS // max(len(vectors), 1))
+        for lo in range(0, len(query_mat), block):
+            block_queries = query_mat[lo : lo + block]
+            if self.quantized is not None:
+                sims = np.atleast_2d(self.quantized.score(block_queries, rows))
+            else:
+                sims = block_queries @ vectors.T
+
+            if self.use_mmr:
+                selections = [
+                    self._mmr_search(query_vec, query_sims, k, self.mmr_diversity, vectors=vectors)
+                    for query_vec, query_sims in zip(block_queries, sims)
+                ]
+            elif self.quantized is not None:
+                selections = [
+                    self._rescore(query_vec, query_sims, vectors, k)
+                    for query_vec, query_sims in zip(block_queries, sims)
+                ]
+            else:
+                # 기본 유사도 검색
+                selections = list(top_k_indices(sims, k))
+
+            for indices in selections:
+                results.append(rows[indices] if rows is not None else np.asarray(indices))
+        return results
+
+    def _rescore(
+        self,
+        query_vec: np.ndarray,
+        approx_sims: np.ndarray,
+        vectors: np.ndarray,
+        k: Optional[int] = None,
+    ) -> np.ndarray:
+        """근사 점수 상위 k * rescore_factor개만 float32 벡터로 다시 계산해 top-k를 고른다."""
+
+        k = self.k if k is None else k
+        pool = min(len(approx_sims), k * max(self.rescore_factor, 1))
+        if pool == 0:
+            return np.array([], dtype=int)
+        # 행 번호 순으로 정렬해 메모리 맵에서 순차적으로 읽는다
+        candidates = np.sort(np.argpartition(-approx_sims, pool - 1)[:pool])
+        exact = np.asarray(vectors[candidates], dtype="float32") @ query_vec
+        return candidates[top_k_indices(exact, k)]
+
+    def _mmr_search(
+        self, 
+        query_vec: np.ndarray, 
+        similarities: np.ndarray, 
+        k: int, 
+        lambda_param: float,
+        vectors: Optional[np.ndarray] = None,
+        fetch_k: Optional[int] = None,
+    ) -> np.ndarray:
+        """
+        MMR (Maximal Marginal Relevance) 검색 알고리즘.
+        
+        MMR은 유사도와 다양성을 모두 고려하여 검색 결과의 다양성을 높입니다.
+        lambda_param: 0.0에 가까울수록 유사도 우선, 1.0에 가까울수록 다양성 우선
+        vectors: similarities와 같은 행 순서의 벡터 (None이면 self.vectors)
+        fetch_k: 유사도 상위 fetch_k개만 MMR 후보로 사용 (None이면 self.mmr_fetch_k, 그것도 None이면 전체)
+
+        후보별 "선택된 문서와의 최대 유사도"를 배열로 유지하고, 문서를 하나 고를 때마다
+        벡터 곱 한 번으로 갱신한다 (후보 수 n, 선택 수 k에 대해 O(k·n) 벡터 연산).
+        """
+        if vectors is None:
+            vectors = self.vectors
+        if fetch_k is None:
+            fetch_k = self.mmr_fetch_k
+
+        if fetch_k is not None and max(fetch_k, k) < len(similarities):
+            candidate_indices = top_k_indices(similarities, max(fetch_k, k, 1))
+            # 후보 벡터만 복사해 두고 후보 공간에서 유사도를 갱신한다
+            candidate_vecs = np.asarray(vectors[candidate_indices], dtype="float32")
+        else:
+            candidate_indices = np.argsort(similarities)[::-1]  # 유사도 순으로 정렬
+            candidate_vecs = None
+        if len(candidate_indices) == 0:
+            return np.array([], dtype=int)
+
+        # 점수 결합은 기존 스칼라 연산과 같은 float64로 계산해 선택 결과를 동일하게 유지한다
+        relevance = lambda_param * similarities[candidate_indices].astype("float64")
+        max_sim_to_selected = np.full(len(candidate_indices), -np.inf, dtype="float32")
+        available = np.ones(len(candidate_indices), dtype=bool)
+
+        # 첫 번째 문서는 가장 유사한 것으로 선택
+        position = 0
+        selected_positions = []
+        while True:
+            selected_positions.append(position)
+            available[position] = False
+            if len(selected_positions) >= k or not available.any():
+                break
+
+            # 방금 선택한 문서와의 유사도로 후보별 최대 유사도(다양성 측정)를 갱신
+            selected_vec = np.asarray(vectors[candidate_indices[position]], dtype="float32")
+            if candidate_vecs is not None:
+                sims_to_selected = candidate_vecs @ selected_vec
+            else:
+                sims_to_selected = (vectors @ selected_vec)[candidate_indices]
+            np.maximum(max_sim_to_selected, sims_to_selected, out=max_sim_to_selected)
+
+            # MMR 점수 = lambda * relevance - (1 - lambda) * max_sim_to_selected
+            mmr_scores = relevance - (1 - lambda_param) * max_sim_to_selected.astype("float64")
+            mmr_scores[~available] = -np.inf
+            # argmax는 동점일 때 유사도 순서상 앞선 후보를 고른다 (기존 순차 비교와 동일)
+            position = int(np.argmax(mmr_scores))
+
+        return candidate_indices[selected_positions]
+
+    async def _aget_relevant_documents(self, query: str) -> List[Document]:
+        return (await self.asearch_batch([query]))[0]
+
+
+def embed_queries(retriever: BaseRetriever, queries: List[str]) -> np.ndarray:
+    """검색기(감싼 검색기 포함)가 쓰는 임베딩 모델과 질의 캐시로 질의를 임베딩한다 (차원 축소 전, L2 정규화).
+
+    감싼 검색기는 base(재순위화/배칭/확장/패킹), dense(하이브리드), members(연합, 첫 인덱스) 순으로 따라간다.
+    """
+
+    while not isinstance(retriever, DenseRetriever):
+        if getattr(retriever, "members", None):
+            retriever = retriever.members[0]
+        elif getattr(retriever, "dense", None) is not None:
+            retriever = retriever.dense
+        elif getattr(retriever, "base", None) is not None:
+            retriever = retriever.base
+        else:
+            raise TypeError(f"임베딩 모델을 찾을 수 없는 검색기입니다: {type(retriever).__name__}")
+    return retriever._embed_queries(queries, reduce=False)
@@ -0,0 +1,157 @@
+"""4주차 연합 검색기.
+
+여러 인덱스 디렉터리(문서 x 청킹 전략)를 같은 질의 임베딩으로 병렬 검색하고, 인덱스마다 다른 점수 분포를
+정규화해 하나의 top-k로 합친다. 같은 원문 구간을 가리키는 청크는 출처/구간 겹침으로 중복 제거한다.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain.schema import Document
+from langchain_core.retrievers import BaseRetriever
+
+from async_retrieval import AsyncRetrievalExecutor, default_retrieval_executor
+from dense_retriever import DenseRetriever
+
+
+def score_distribution(vectors: np.ndarray, block_rows: int = 65536) -> tuple[np.ndarray, np.ndarray]:
+    """인덱스 벡터의 평균과 (비중심) 공분산을 블록 단위로 계산한다 (메모리 맵 벡터도 한 번만 순차로 읽음).
+
+    질의 q에 대한 전체 문서 점수 q·v의 평균은 q·mean, 분산은 qᵀ cov q이므로 전체 점수를 계산하지 않고
+    인덱스별 점수 분포로 z-점수를 낼 수 있다.
+    """
+
+    dim = vectors.shape[1]
+    total = np.zeros(dim, dtype="float64")
+    second = np.zeros((dim, dim), dtype="float64")
+    for lo in range(0, len(vectors), block_rows):
+        block = np.asarray(vectors[lo : lo + block_rows], dtype="float64")
+        total += block.sum(axis=0)
+        second += block.T @ block
+    mean = total / max(len(vectors), 1)
+    cov = second / max(len(vectors), 1) - np.outer(mean, mean)
+    return mean, cov
+
+
+def spans_overlap(a: tuple[int, int], b: tuple[int, int], min_ratio: float) -> bool:
+    """두 (start, end) 구간의 겹친 길이가 짧은 쪽 길이의 min_ratio 이상이면 True."""
+
+    overlap = min(a[1], b[1]) - max(a[0], b[0])
+    if overlap <= 0:
+        return False
+    return overlap >= min_ratio * max(min(a[1] - a[0], b[1] - b[0]), 1)
+
+
+class FederatedRetriever(BaseRetriever):
+    """여러 인덱스 디렉터리(문서 x 청킹 전략)를 한 번에 검색해 하나의 top-k로 합치는 검색기.
+
+    - 질의 임베딩은 한 번만 계산해 모든 인덱스가 공유한다 (인덱스별 차원 축소만 따로 적용).
+    - 인덱스별 검색은 실행기의 스레드 풀에서 병렬로 실행한다.
+    - 점수는 인덱스마다 분포가 다르므로 score_norm으로 정규화한 뒤 합친다.
+        zscore: 인덱스 전체 문서 점수 분포 기준 표준화 (기본), minmax: 인덱스별 후보 안에서 0~1,
+        none: 코사인 유사도 그대로
+    - 같은 출처(source)에서 원문 구간이 dedup_overlap 이상 겹치는 청크는 점수가 높은 하나만 남긴다.
+      위치 정보가 없는 청크는 본문이 같을 때만 중복으로 본다.
+    """
+
+    members: List[DenseRetriever]
+    labels: List[str]
+    k: int = 5
+    candidate_k: int = 20  # 인덱스별 후보 수 (k보다 작으면 k 사용)
+    score_norm: str = "zscore"
+    dedup_overlap: float = 0.5
+    executor: Optional[AsyncRetrievalExecutor] = None
+    # 인덱스별 (평균, 공분산). None이면 zscore 정규화 첫 검색 때 계산한다
+    score_stats: Optional[List[tuple]] = None
+
+    @property
+    def documents(self) -> List[Document]:
+        return [doc for member in self.members for doc in member.documents]
+
+    def _get_relevant_documents(self, query: str) -> List[Document]:
+        return self.search_batch([query])[0]
+
+    def _executor(self) -> AsyncRetrievalExecutor:
+        return self.executor or default_retrieval_executor()
+
+    def _member_stats(self) -> List[tuple]:
+        if self.score_stats is None or len(self.score_stats) != len(self.members):
+            self.score_stats = [score_distribution(member.vectors) for member in self.members]
+        return self.score_stats
+
+    def _search_member(self, idx: int, raw_mat: np.ndarray, depth: int) -> List[tuple[np.ndarray, np.ndarray]]:
+        """idx번째 인덱스에서 질의별 (행 번호, 정규화 점수)를 구한다."""
+
+        member = self.members[idx]
+        query_mat = member.reducer.transform(raw_mat) if member.reducer is not None else raw_mat
+        results = []
+        for query_vec, rows in zip(query_mat, member._search_query_mat(query_mat, depth)):
+            scores = np.asarray(member.vectors[rows], dtype="float32") @ query_vec
+            if self.score_norm == "zscore":
+                mean, cov = self._member_stats()[idx]
+                std = float(np.sqrt(max(query_vec @ cov @ query_vec, 1e-12)))
+                scores = (scores - float(query_vec @ mean)) / std
+            elif self.score_norm == "minmax" and len(scores):
+                spread = float(scores.max() - scores.min())
+                scores = (scores - scores.min()) / spread if spread > 0 else np.ones_like(scores)
+            results.append((rows, scores))
+        return results
+
+    def _merge(self, per_member: List[List[tuple[np.ndarray, np.ndarray]]], k: int) -> List[List[Document]]:
+        merged: List[List[Document]] = []
+        for q_idx in range(len(per_member[0]) if per_member else 0):
+            candidates = [
+                (float(score), m_idx, int(row))
+                for m_idx, results in enumerate(per_member)
+                for row, score in zip(*results[q_idx])
+            ]
+            # 점수가 같으면 앞쪽 인덱스, 앞쪽 순위가 먼저 (sorted는 안정 정렬)
+            candidates.sort(key=lambda item: -item[0])
+
+            selected: List[Document] = []
+            kept_spans: Dict[str, List[tuple[int, int]]] = {}
+            kept_texts = set()
+            for _, m_idx, row in candidates:
+                doc = self.members[m_idx].documents[row]
+                meta = doc.metadata or {}
+                if meta.get("start") is not None and meta.get("end") is not None:
+                    span = (int(meta["start"]), int(meta["end"]))
+                    source_spans = kept_spans.setdefault(str(meta.get("source")), [])
+                    if any(spans_overlap(span, kept, self.dedup_overlap) for kept in source_spans):
+                        continue
+                    source_spans.append(span)
+                elif doc.page_content in kept_texts:
+                    continue
+                kept_texts.add(doc.page_content)
+                selected.append(doc)
+                if len(selected) >= k:
+                    break
+            merged.append(selected)
+        return merged
+
+    def search_batch(self, queries: List[str], k: Optional[int] = None) -> List[List[Document]]:
+        if not queries or not self.members:
+            return [[] for _ in queries]
+        k = self.k if k is None else k
+        depth = max(self.candidate_k, k)
+        raw_mat = self.members[0]._embed_queries(queries, reduce=False)
+        futures = [self._executor().submit(self._search_member, idx, raw_mat, depth) for idx in range(len(self.members))]
+        return self._merge([future.result() for future in futures], k)
+
+    async def asearch_batch(self, queries: List[str], k: Optional[int] = None) -> List[List[Document]]:
+        if not queries or not self.members:
+            return [[] for _ in queries]
+        k = self.k if k is None else k
+        depth = max(self.candidate_k, k)
+        executor = self._executor()
+        raw_mat = await executor.run(self.members[0]._embed_queries, queries, False)
+        per_member = await asyncio.gather(
+            *(executor.run(self._search_member, idx, raw_mat, depth) for idx in range(len(self.members)))
+        )
+        return self._merge(list(per_member), k)
+
+    async def _aget_relevant_documents(self, query: str) -> List[Document]:
+        return (await self.asearch_batch([query]))[0]
@@ -0,0 +1,84 @@
+"""4주차 하이브리드(dense + BM25) 검색기.
+
+밀집 검색과 희소 검색은 점수 척도가 달라 점수를 그대로 더할 수 없으므로, 양쪽 후보의 순위만으로
+RRF(Reciprocal Rank Fusion) 점수를 매겨 하나의 top-k로 합친다.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain.schema import Document
+from langchain_core.retrievers import BaseRetriever
+
+from async_retrieval import default_retrieval_executor
+from dense_retriever import DenseRetriever
+from sparse_index import SparseIndex
+
+
+def reciprocal_rank_fusion(rankings: List[np.ndarray], k: int, rrf_k: int = 60) -> np.ndarray:
+    """여러 순위 목록(행 번호 배열)을 RRF 점수 Σ 1 / (rrf_k + 순위)로 합쳐 상위 k개 행 번호를 반환한다.
+
+    점수가 같으면 앞쪽 순위 목록에서 먼저 나온 행이 앞선다.
+    """
+
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking.tolist(), start=1):
+            scores[row] = scores.get(row, 0.0) + 1.0 / (rrf_k + rank)
+    # dict는 삽입 순서를 유지하고 sorted는 안정 정렬이므로 동점은 먼저 나온 행이 앞선다
+    fused = sorted(scores, key=scores.__getitem__, reverse=True)[:k]
+    return np.array(fused, dtype=int)
+
+
+class HybridRetriever(BaseRetriever):
+    """밀집(DenseRetriever) 검색과 BM25 희소 검색 결과를 RRF로 합치는 검색기.
+
+    양쪽에서 각각 candidate_k개씩 후보를 뽑아 순위만으로 합친다 (점수 척도 차이 무관).
+    메타데이터 필터는 dense 쪽 설정을 그대로 희소 검색에도 적용한다.
+    """
+
+    dense: DenseRetriever
+    sparse: SparseIndex
+    k: int = 5
+    candidate_k: int = 20  # 각 검색기에서 가져올 후보 수 (k보다 작으면 k 사용)
+    rrf_k: int = 60  # RRF 상수 (클수록 하위 순위 기여가 커짐)
+
+    @property
+    def documents(self) -> List[Document]:
+        return self.dense.documents
+
+    def _get_relevant_documents(self, query: str) -> List[Document]:
+        return self.search_batch([query])[0]
+
+    def search_batch(self, queries: List[str], k: Optional[int] = None) -> List[List[Document]]:
+        """dense는 질의 배치를 한 번에, 희소 검색은 질의별 posting 합산으로 처리한 뒤 RRF로 합친다."""
+
+        if not queries:
+            return []
+        k = self.k if k is None else k
+        depth = max(self.candidate_k, k)
+        dense_rankings = self.dense.search_rows_batch(queries, depth)
+        return self._fuse(queries, dense_rankings, depth, k)
+
+    async def asearch_batch(self, queries: List[str], k: Optional[int] = None) -> List[List[Document]]:
+        if not queries:
+            return []
+        k = self.k if k is None else k
+        depth = max(self.candidate_k, k)
+        dense_rankings = await self.dense.asearch_rows_batch(queries, depth)
+        executor = self.dense.executor or default_retrieval_executor()
+        return await executor.run(self._fuse, queries, dense_rankings, depth, k)
+
+    def _fuse(self, queries: List[str], dense_rankings: List[np.ndarray], depth: int, k: int) -> List[List[Document]]:
+        rows = self.dense._filtered_rows()
+        results: List[List[Document]] = []
+        for query, dense_rows in zip(queries, dense_rankings):
+            _, sparse_rows = self.sparse.search(query, depth, rows=rows)
+            fused = reciprocal_rank_fusion([dense_rows, sparse_rows], k, self.rrf_k)
+            results.append([self.dense.documents[i] for i in fused])
+        return results
+
+    async def _aget_relevant_documents(self, query: str) -> List[Document]:
+        return (await self.asearch_batch([query]))[0]
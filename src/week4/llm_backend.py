@@ -0,0 +1,195 @@
+"""LLM 백엔드 선택과 오프라인용 로컬 대체 모델.
+
+build_rag_chain, api_server.create_app, LangGraph 데모, PromptTuner가 만드는 채팅 모델을
+create_chat_model(backend=...) 한 곳에서 만든다.
+
+- gemini: ChatGoogleGenerativeAI (GOOGLE_API_KEY 필요)
+- local: LocalStandInChatModel. 네트워크/API 키 없이 프롬프트 해시로 정해지는 결정적 텍스트를 돌려주고,
+  첫 토큰 지연(분포 지정 가능)과 초당 토큰 처리량만큼 시간을 소비한다. 검색·패킹·캐시·서빙 오버헤드를
+  Gemini 지연과 분리해 부하 테스트/벤치마크할 때 쓴다.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+import numpy as np
+from langchain_core.caches import BaseCache
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+LLM_BACKENDS = ("gemini", "local")
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+
+
+class LocalStandInChatModel(BaseChatModel):
+    """결정적 응답 + 설정 가능한 지연/처리량을 갖는 로컬 대체 채팅 모델.
+
+    응답 시간 = 첫 토큰 지연(first_token_ms를 중앙값으로 latency_distribution에서 추출) + output_tokens / tokens_per_second.
+    응답 본문은 메시지 내용의 해시와 마지막 메시지의 단어로 만들어 같은 입력이면 항상 같다.
+    지연 표본은 seed로 초기화한 난수열에서 뽑으므로 같은 호출 순서면 실행마다 같다.
+    """
+
+    model_name: str = "local-stand-in"
+    first_token_ms: float = 300.0
+    latency_distribution: str = "lognormal"
+    # uniform: 중앙값 대비 ±비율, lognormal: log 표준편차 (fixed면 무시)
+    latency_spread: float = 0.3
+    tokens_per_second: Optional[float] = 80.0  # None이면 생성 시간 0
+    output_tokens: int = 120
+    seed: int = 0
+    _rng: Any = None
+    _rng_lock: Any = None
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        if self.latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"지원하지 않는 latency_distribution입니다: {self.latency_distribution}")
+        object.__setattr__(self, "_rng", np.random.default_rng(self.seed))
+        object.__setattr__(self, "_rng_lock", threading.Lock())
+
+    @property
+    def _llm_type(self) -> str:
+        return "local-stand-in"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {
+            "model_name": self.model_name,
+            "output_tokens": self.output_tokens,
+            "first_token_ms": self.first_token_ms,
+            "latency_distribution": self.latency_distribution,
+            "latency_spread": self.latency_spread,
+            "tokens_per_second": self.tokens_per_second,
+            "seed": self.seed,
+        }
+
+    def first_token_seconds(self) -> float:
+        """설정한 분포에서 첫 토큰 지연(초)을 하나 뽑는다."""
+
+        median = self.first_token_ms / 1000
+        with self._rng_lock:
+            if self.latency_distribution == "uniform":
+                return max(0.0, median * (1 + self._rng.uniform(-self.latency_spread, self.latency_spread)))
+            if self.latency_distribution == "lognormal":
+                return median * float(np.exp(self._rng.normal(0.0, self.latency_spread)))
+        return median
+
+    def token_seconds(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def render(self, messages: List[BaseMessage]) -> List[str]:
+        """입력 메시지로 결정되는 응답 토큰(단어) 목록."""
+
+        text = "\n".join(f"{message.type}:{message.content}" for message in messages)
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+        words = re.findall(r"\w+", str(messages[-1].content)) if messages else []
+        tokens = [f"[{self.model_name} {digest}]"]
+        for idx in range(max(self.output_tokens - 1, 0)):
+            tokens.append(words[idx % len(words)] if words else f"token{idx}")
+        return tokens
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tokens = self.render(messages)
+        time.sleep(self.first_token_seconds() + self.token_seconds() * len(tokens))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=" ".join(tokens)))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tokens = self.render(messages)
+        # 이벤트 루프를 막지 않도록 asyncio.sleep으로 기다린다 (동시 요청 부하 테스트용)
+        await asyncio.sleep(self.first_token_seconds() + self.token_seconds() * len(tokens))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=" ".join(tokens)))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        tokens = self.render(messages)
+        time.sleep(self.first_token_seconds())
+        for idx, token in enumerate(tokens):
+            if idx:
+                time.sleep(self.token_seconds())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token if idx == 0 else f" {token}"))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        tokens = self.render(messages)
+        await asyncio.sleep(self.first_token_seconds())
+        for idx, token in enumerate(tokens):
+            if idx:
+                await asyncio.sleep(self.token_seconds())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token if idx == 0 else f" {token}"))
+
+
+def create_chat_model(
+    backend: str = "gemini",
+    model_name: str = "gemini-2.5-flash",
+    temperature: float = 0.0,
+    top_p: Optional[float] = None,
+    top_k: Optional[int] = None,
+    google_api_key: Optional[str] = None,
+    cache: Optional[BaseCache] = None,
+    local_options: Optional[Dict[str, Any]] = None,
+) -> BaseChatModel:
+    """설정한 백엔드의 채팅 모델을 만든다. 응답 캐시(cache)는 temperature 0일 때만 붙인다.
+
+    local_options: LocalStandInChatModel 필드 (first_token_ms, latency_distribution, latency_spread,
+        tokens_per_second, output_tokens, seed)
+    """
+
+    if backend not in LLM_BACKENDS:
+        raise ValueError(f"지원하지 않는 LLM 백엔드입니다: {backend} (가능: {', '.join(LLM_BACKENDS)})")
+    if temperature > 0:
+        # 캐시 키는 샘플링 결과를 구분하지 못하므로 temperature > 0이면 첫 샘플을 계속 재생하게 된다
+        cache = None
+
+    if backend == "local":
+        return LocalStandInChatModel(cache=cache, **(local_options or {}))
+
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    key = google_api_key or os.getenv("GOOGLE_API_KEY")
+    if not key:
+        raise EnvironmentError("GOOGLE_API_KEY 환경 변수가 필요합니다.")
+    llm_kwargs: Dict[str, Any] = {
+        "model": model_name,
+        "temperature": temperature,
+        "convert_system_message_to_human": False,
+        "google_api_key": key,
+    }
+    # Gemini API는 top_p, top_k를 지원하며, LangChain 래퍼도 이를 지원합니다
+    if top_p is not None:
+        llm_kwargs["top_p"] = float(top_p)
+    if top_k is not None:
+        llm_kwargs["top_k"] = int(top_k)
+    # 같은 파라미터 + 같은 프롬프트(검색 컨텍스트 포함)는 디스크 캐시의 응답을 재사용한다
+    if cache is not None:
+        llm_kwargs["cache"] = cache
+    return ChatGoogleGenerativeAI(**llm_kwargs)
@@ -0,0 +1,139 @@
+"""디스크 기반 LLM 응답 캐시.
+
+같은 모델 파라미터(모델, temperature, top_p/top_k 등)와 같은 메시지(검색 컨텍스트까지 렌더링된 프롬프트)로
+Gemini를 다시 호출하지 않도록 응답을 SQLite 파일 하나에 저장한다. LangChain BaseCache 구현이므로
+ChatGoogleGenerativeAI(cache=...)로 붙이면 build_rag_chain, PromptTuner, LangGraph generate_node가
+같은 파일을 공유한다 (프로세스가 달라도 재사용, temperature 0 평가 재실행은 사실상 재생).
+
+- 키: sha256(LangChain llm_string + 직렬화된 메시지). llm_string에 API 키는 포함되지 않는다.
+- 크기 제한: 저장된 응답 바이트 합계가 max_bytes를 넘으면 가장 오래 쓰이지 않은 항목부터 지운다.
+- bypass=True면 캐시를 읽지 않고 항상 LLM을 호출하되, 새 응답으로 항목을 갱신한다.
+- 키가 같으면 같은 응답을 돌려주므로 샘플링(temperature > 0) 모델에는 붙이지 않는다 (create_chat_model이 건너뜀).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+import warnings
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+class DiskLLMCache(BaseCache):
+    """SQLite 파일 기반 LLM 응답 캐시 (스레드/프로세스 공유, LRU 크기 제한)."""
+
+    def __init__(self, path: Path, max_bytes: Optional[int] = 256 * 2**20, bypass: bool = False) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        with self._conn:
+            # WAL: 다른 프로세스(예: Week4 스윕과 Week5 동시 실행)가 읽는 동안에도 쓸 수 있다
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used)")
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        if self.bypass:
+            return None
+        key = cache_key(prompt, llm_string)
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")  # langchain_core.load.loads는 beta 경고를 낸다
+            return loads(row[0])
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        value = dumps(list(return_val))
+        size = len(value.encode("utf-8"))
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (cache_key(prompt, llm_string), value, size, now, now),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        if self.max_bytes is None:
+            return
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        while total > self.max_bytes:
+            row = self._conn.execute("SELECT key, size FROM responses ORDER BY last_used LIMIT 1").fetchone()
+            if row is None:
+                return
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (row[0],))
+            total -= row[1]
+            self.evictions += 1
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "path": str(self.path),
+                "entries": entries,
+                "size_mb": total / 2**20,
+                "max_mb": self.max_bytes / 2**20 if self.max_bytes is not None else None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "bypass": self.bypass,
+            }
+
+
+_DEFAULT_CACHE: Optional[DiskLLMCache] = None
+
+
+def default_llm_cache() -> Optional[DiskLLMCache]:
+    """configure_llm_cache()로 설정한 프로세스 전역 캐시 (설정하지 않았으면 None)."""
+
+    return _DEFAULT_CACHE
+
+
+def configure_llm_cache(
+    path: Optional[Path],
+    max_mb: Optional[float] = 256,
+    bypass: bool = False,
+) -> Optional[DiskLLMCache]:
+    """프로세스 전역 LLM 응답 캐시를 설정한다 (path가 None이면 캐시를 끈다)."""
+
+    global _DEFAULT_CACHE
+    if path is None:
+        _DEFAULT_CACHE = None
+        return None
+    if _DEFAULT_CACHE is None or _DEFAULT_CACHE.path != Path(path):
+        _DEFAULT_CACHE = DiskLLMCache(Path(path))
+    _DEFAULT_CACHE.max_bytes = int(max_mb * 2**20) if max_mb is not None else None
+    _DEFAULT_CACHE.bypass = bypass
+    return _DEFAULT_CACHE
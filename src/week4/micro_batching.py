@@ -0,0 +1,243 @@
+"""4주차 질의 임베딩 동적 마이크로 배칭.
+
+API 요청마다 질의 하나씩 embed_query(배치 크기 1)를 실행하면 동시 요청이 많을 때 모델 호출의 고정 비용을
+요청 수만큼 치른다. MicroBatcher는 짧은 창(window_ms) 동안 또는 max_batch개가 찰 때까지 들어온 질의를 모아
+batch_fn 한 번(= search_batch: 배치 인코딩 1회 + 행렬 곱 검색 1회)으로 처리하고 결과를 각 호출자에게 돌려준다.
+
+- 첫 질의가 도착한 시점부터 window_ms가 지나거나 max_batch개가 모이면 배치를 실행한다 (대기 중 질의가 없으면 스레드는 잠든다)
+- 배치 실행 중 예외는 그 배치의 모든 호출자에게 전달된다
+- 배치 실행 전에 취소된 호출(비동기 호출자 취소)은 배치에서 뺀다
+
+MicroBatchingRetriever는 이 스케줄러로 기반 검색기의 단일 질의 검색(과 API 답변 캐시용 질의 임베딩)을 묶는다.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from langchain.schema import Document
+from langchain_core.retrievers import BaseRetriever
+
+from dense_retriever import embed_queries
+
+
+class MicroBatcher:
+    """짧은 창 안에 들어온 항목을 모아 batch_fn(items) 한 번으로 처리하는 배치 스케줄러 (전용 스레드 1개).
+
+    batch_fn은 항목 목록을 받아 같은 길이·순서의 결과 목록을 반환해야 한다.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        window_ms: float = 5.0,
+        max_batch: int = 32,
+        name: str = "micro-batcher",
+    ) -> None:
+        if max_batch < 1:
+            raise ValueError("max_batch는 1 이상이어야 합니다.")
+        self.batch_fn = batch_fn
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+        self.name = name
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+        self.size_counts: Counter = Counter()
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def submit(self, item: Any) -> "Future[Any]":
+        """항목을 다음 배치에 넣고 결과 Future를 반환한다."""
+
+        if self._closed:
+            raise RuntimeError("종료된 MicroBatcher입니다.")
+        future: Future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+                self._thread.start()
+        self._queue.put((item, future))
+        return future
+
+    def run(self, item: Any) -> Any:
+        """submit()한 뒤 결과를 기다린다 (동기 호출자용)."""
+
+        return self.submit(item).result()
+
+    async def arun(self, item: Any) -> Any:
+        """submit()한 뒤 결과를 기다린다. 호출 측이 취소되면 아직 배치에 들어가지 않은 항목은 실행하지 않는다."""
+
+        future = self.submit(item)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+
+    def _collect(self, first: tuple) -> List[tuple]:
+        batch = [first]
+        deadline = time.perf_counter() + self.window_ms / 1000
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is None:
+                self._queue.put(None)  # close() 신호는 현재 배치를 처리한 뒤 루프에서 받는다
+                break
+            batch.append(entry)
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            # 실행 전에 취소된 항목은 빼고, 남은 항목은 RUNNING으로 바꿔 이후 취소를 막는다
+            batch = [(item, future) for item, future in self._collect(first) if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            with self._lock:
+                self.batches += 1
+                self.items += len(batch)
+                self.size_counts[len(batch)] += 1
+            try:
+                results = self.batch_fn([item for item, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"batch_fn 결과 수({len(results)})가 항목 수({len(batch)})와 다릅니다.")
+            except BaseException as exc:  # noqa: BLE001 - 호출자 스레드에서 다시 발생시킨다
+                with self._lock:
+                    self.errors += 1
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def close(self) -> None:
+        """대기 중인 항목을 처리한 뒤 스케줄러 스레드를 멈춘다."""
+
+        self._closed = True
+        with self._lock:
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "window_ms": self.window_ms,
+                "max_batch": self.max_batch,
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+                "max_batch_size": max(self.size_counts) if self.size_counts else 0,
+                "errors": self.errors,
+                "batch_size_counts": {str(size): n for size, n in sorted(self.size_counts.items())},
+            }
+
+
+class MicroBatchingRetriever(BaseRetriever):
+    """동시에 들어온 단일 질의 검색을 짧은 창 동안 모아 기반 검색기의 search_batch 한 번으로 처리하는 검색기.
+
+    요청마다 배치 크기 1로 임베딩하는 대신 창(window_ms) 안의 질의를 한 번의 배치 인코딩 + 행렬 곱 검색으로
+    처리하고 결과를 각 요청에 나눠준다. 여러 질의를 한 번에 넘기는 search_batch/asearch_batch는 이미 배치이므로
+    기반 검색기를 바로 호출한다. 배치 크기 분포는 batcher.stats()로 확인한다.
+
+    검색 전에 질의 벡터만 필요한 호출(API 답변 캐시 조회)은 embed_query/aembed_query로 같은 스케줄러에 넣는다.
+    한 배치 안의 임베딩 요청은 한 번에 인코딩해 질의 임베딩 캐시에 넣고, 뒤따르는 검색은 그 벡터를 재사용한다
+    (질의 임베딩 캐시가 없으면 검색 때 다시 인코딩한다).
+    """
+
+    base: BaseRetriever
+    k: int = 5
+    window_ms: float = 5.0
+    max_batch: int = 32
+    batcher: Optional[MicroBatcher] = None
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        if self.batcher is None:
+            self.batcher = MicroBatcher(self._search_items, window_ms=self.window_ms, max_batch=self.max_batch)
+
+    @property
+    def documents(self) -> List[Document]:
+        return self.base.documents
+
+    def _search_items(self, items: List[tuple]) -> List[Any]:
+        """("embed" | "search", 질의, k) 목록을 처리한다 (입력 순서 유지).
+
+        임베딩 요청을 먼저 한 번에 인코딩한 뒤, 검색 요청을 k별로 묶어 기반 검색기의 search_batch로 검색한다.
+        """
+
+        results: List[Any] = [None] * len(items)
+        embed_positions = [idx for idx, (kind, _, _) in enumerate(items) if kind == "embed"]
+        if embed_positions:
+            vectors = embed_queries(self.base, [items[idx][1] for idx in embed_positions])
+            for idx, vector in zip(embed_positions, vectors):
+                results[idx] = vector
+        groups: Dict[Optional[int], List[int]] = {}
+        for idx, (kind, _, k) in enumerate(items):
+            if kind == "search":
+                groups.setdefault(k, []).append(idx)
+        for k, positions in groups.items():
+            queries = [items[idx][1] for idx in positions]
+            if hasattr(self.base, "search_batch"):
+                hits = self.base.search_batch(queries, k)
+            else:
+                hits = [self.base.get_relevant_documents(query) for query in queries]
+            for idx, docs in zip(positions, hits):
+                results[idx] = docs
+        return results
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """embed_queries()와 같은 벡터(차원 축소 전, L2 정규화)를 배치 스케줄러를 거쳐 계산한다."""
+
+        return self.batcher.run(("embed", query, None))
+
+    async def aembed_query(self, query: str) -> np.ndarray:
+        return await self.batcher.arun(("embed", query, None))
+
+    def _get_relevant_documents(self, query: str) -> List[Document]:
+        return self.batcher.run(("search", query, None))
+
+    def search_batch(self, queries: List[str], k: Optional[int] = None) -> List[List[Document]]:
+        if not queries:
+            return []
+        if len(queries) == 1:
+            return [self.batcher.run(("search", queries[0], k))]
+        return self._search_items([("search", query, k) for query in queries])
+
+    async def asearch_batch(self, queries: List[str], k: Optional[int] = None) -> List[List[Document]]:
+        if not queries:
+            return []
+        if len(queries) == 1:
+            return [await self.batcher.arun(("search", queries[0], k))]
+        if hasattr(self.base, "asearch_batch"):
+            return await self.base.asearch_batch(queries, k)
+        return [await self.base.ainvoke(query) for query in queries]
+
+    async def _aget_relevant_documents(self, query: str) -> List[Document]:
+        return await self.batcher.arun(("search", query, None))
+
+
+def find_micro_batching(retriever: BaseRetriever) -> Optional[MicroBatchingRetriever]:
+    """감싼 검색기들 중 MicroBatchingRetriever (없으면 None)."""
+
+    while retriever is not None:
+        if isinstance(retriever, MicroBatchingRetriever):
+            return retriever
+        retriever = getattr(retriever, "base", None)
+    return None
@@ -0,0 +1,126 @@
+"""4주차 이웃 청크 확장(small-to-big) 검색기.
+
+작은 청크로 정밀하게 검색한 뒤, 결과 청크를 원문(sources/)에서 같은 출처의 앞/뒤 이웃 청크까지 넓힌
+문자 창으로 바꿔 LLM에 넘긴다. 이웃 관계는 청크의 원문 구간(source/start/end)으로 만든 ChunkAdjacency를 쓴다.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain.schema import Document
+from langchain_core.retrievers import BaseRetriever
+
+from source_text import ChunkAdjacency
+
+
+def load_chunk_adjacency(documents: List[Document]) -> ChunkAdjacency:
+    """문서 메타데이터의 source/start/end로 인접 색인을 만든다 (위치 정보가 없으면 -1)."""
+
+    return ChunkAdjacency(
+        [doc.metadata.get("source") if doc.metadata.get("start") is not None else None for doc in documents],
+        np.array([doc.metadata.get("start", -1) for doc in documents], dtype=np.int64),
+        np.array([doc.metadata.get("end", -1) for doc in documents], dtype=np.int64),
+    )
+
+
+class NeighborExpansionRetriever(BaseRetriever):
+    """작은 청크로 검색한 뒤 각 결과를 원문의 문자 창으로 넓혀 돌려주는 small-to-big 검색기.
+
+    - 결과 청크마다 ChunkAdjacency로 같은 출처의 앞/뒤 이웃 청크를 번갈아 붙여 window_chars 이내로 넓힌다.
+    - 같은 출처에서 겹치거나 맞닿은 창은 시작 위치 순으로 훑어 하나로 합친다 (순위는 가장 높은 결과 기준).
+    - 합친 창들의 총 길이가 max_context_chars를 넘으면 그 창은 건너뛴다 (프롬프트 크기는 청크 크기가 아니라 예산으로 결정).
+    원문 위치가 없는 청크는 넓히지 않고 그대로 포함한다.
+    """
+
+    base: BaseRetriever
+    adjacency: ChunkAdjacency
+    texts: Dict[str, str]
+    k: int = 5
+    window_chars: int = 1200
+    max_context_chars: int = 4000
+    # doc_id → 행 번호 (base 결과 문서를 인접 색인의 행으로 찾기 위함)
+    rows_by_id: Optional[Dict[str, int]] = None
+
+    @property
+    def documents(self) -> List[Document]:
+        return self.base.documents
+
+    def _row(self, doc: Document) -> Optional[int]:
+        if self.rows_by_id is None:
+            self.rows_by_id = {str(d.metadata.get("doc_id")): row for row, d in enumerate(self.base.documents)}
+        row = self.rows_by_id.get(str((doc.metadata or {}).get("doc_id")))
+        return row if row is not None and self.adjacency.has_span(row) else None
+
+    def expand(self, docs: List[Document]) -> List[Document]:
+        """검색 결과를 창으로 넓히고 합친 뒤 예산 안에서 순위 순으로 반환한다.
+
+        창은 출처별로 시작 위치 순으로 정렬해 한 번 훑으며 합치므로 검색 순위와 무관하게
+        같은 출처의 창끼리는 겹치거나 맞닿지 않는다.
+        """
+
+        # [대표 순위, 출처, 시작, 끝, 대표 문서, [(순위, doc_id)]]
+        windows: List[list] = []
+        spans_by_source: Dict[str, List[Tuple[int, int, int, Document]]] = {}
+        for rank, doc in enumerate(docs):
+            row = self._row(doc)
+            if row is None or self.adjacency.sources[row] not in self.texts:
+                windows.append([rank, None, -1, -1, doc, [(rank, doc.metadata.get("doc_id"))]])
+                continue
+            start, end = self.adjacency.expand(row, self.window_chars)
+            spans_by_source.setdefault(self.adjacency.sources[row], []).append((start, end, rank, doc))
+
+        for source, spans in spans_by_source.items():
+            window = None
+            for start, end, rank, doc in sorted(spans, key=lambda s: (s[0], s[1])):
+                doc_id = doc.metadata.get("doc_id")
+                if window is None or start > window[3]:
+                    window = [rank, source, start, end, doc, [(rank, doc_id)]]
+                    windows.append(window)
+                    continue
+                window[3] = max(window[3], end)
+                if rank < window[0]:
+                    # 메타데이터는 가장 높은 순위 결과의 것을 쓴다
+                    window[0], window[4] = rank, doc
+                window[5].append((rank, doc_id))
+        windows.sort(key=lambda w: w[0])
+
+        results: List[Document] = []
+        used = 0
+        for _, source, start, end, doc, members in windows:
+            if source is None:
+                content, metadata = doc.page_content, dict(doc.metadata)
+            else:
+                content = self.texts[source][start:end]
+                doc_ids = [doc_id for _, doc_id in sorted(members, key=lambda m: m[0])]
+                metadata = {**doc.metadata, "start": start, "end": end, "expanded_from": doc_ids}
+            if used + len(content) > self.max_context_chars and results:
+                continue
+            used += len(content)
+            results.append(Document(page_content=content, metadata=metadata))
+        return results
+
+    def _get_relevant_documents(self, query: str) -> List[Document]:
+        return self.search_batch([query])[0]
+
+    def search_batch(self, queries: List[str], k: Optional[int] = None) -> List[List[Document]]:
+        if not queries:
+            return []
+        if hasattr(self.base, "search_batch"):
+            hits = self.base.search_batch(queries, k)
+        else:
+            hits = [self.base.get_relevant_documents(query) for query in queries]
+        return [self.expand(docs) for docs in hits]
+
+    async def asearch_batch(self, queries: List[str], k: Optional[int] = None) -> List[List[Document]]:
+        if not queries:
+            return []
+        if hasattr(self.base, "asearch_batch"):
+            hits = await self.base.asearch_batch(queries, k)
+        else:
+            hits = [await self.base.ainvoke(query) for query in queries]
+        return [self.expand(docs) for docs in hits]
+
+    async def _aget_relevant_documents(self, query: str) -> List[Document]:
+        return (await self.asearch_batch([query]))[0]
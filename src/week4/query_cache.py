@@ -0,0 +1,127 @@
+"""4주차 질의 임베딩 LRU 캐시.
+
+같은 질문(자주 묻는 질문, LangGraph 재검색 등)을 매번 임베딩 모델로 인코딩하지 않도록
+(모델 이름, 정규화한 질의 문자열) → 정규화 질의 벡터를 메모리에 보관한다.
+여러 스레드(FastAPI 워커 스레드 등)에서 동시에 사용해도 안전하며,
+선택적으로 디스크(.npz)에 저장해 두었다가 시작 시 미리 채울 수 있다.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+import unicodedata
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+CacheKey = Tuple[str, str]
+
+
+def normalize_query(text: str) -> str:
+    """캐시 키용 질의 정규화: NFKC, 앞뒤 공백 제거, 연속 공백을 하나로."""
+
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip()
+
+
+class QueryEmbeddingCache:
+    """스레드 안전한 크기 제한 LRU 질의 벡터 캐시.
+
+    warm_path가 주어지고 파일이 있으면 생성 시 불러오며, save()로 현재 내용을 기록한다.
+    """
+
+    def __init__(self, max_entries: int = 1024, warm_path: Optional[Path] = None) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries는 1 이상이어야 합니다.")
+        self.max_entries = max_entries
+        self.warm_path = Path(warm_path) if warm_path is not None else None
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[CacheKey, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        if self.warm_path is not None and self.warm_path.exists():
+            self.load(self.warm_path)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> CacheKey:
+        return model_name, normalize_query(text)
+
+    def get(self, model_name: str, text: str) -> Optional[np.ndarray]:
+        key = self.make_key(model_name, text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, model_name: str, text: str, vector: np.ndarray) -> None:
+        key = self.make_key(model_name, text)
+        vector = np.array(vector, dtype="float32")
+        vector.setflags(write=False)  # 공유 벡터가 호출 측에서 수정되지 않도록
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+    def save(self, path: Optional[Path] = None) -> Optional[Path]:
+        """현재 캐시를 오래된 순서대로 .npz에 기록한다 (임시 파일 기록 후 교체)."""
+
+        path = Path(path) if path is not None else self.warm_path
+        if path is None:
+            return None
+        with self._lock:
+            items = list(self._entries.items())
+
+        vectors = [vector for _, vector in items]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        with tmp_path.open("wb") as f:
+            np.savez(
+                f,
+                models=np.array([model for (model, _), _ in items], dtype=str),
+                texts=np.array([text for (_, text), _ in items], dtype=str),
+                dims=np.array([len(vector) for vector in vectors], dtype="int64"),
+                vectors=np.concatenate(vectors) if vectors else np.empty(0, dtype="float32"),
+            )
+        os.replace(tmp_path, path)
+        return path
+
+    def load(self, path: Path) -> int:
+        """save()로 기록한 파일을 읽어 캐시에 채우고 불러온 항목 수를 반환한다."""
+
+        with np.load(path) as data:
+            models: List[str] = data["models"].tolist()
+            texts: List[str] = data["texts"].tolist()
+            vectors = np.split(data["vectors"], np.cumsum(data["dims"])[:-1]) if len(models) else []
+        for model_name, text, vector in zip(models, texts, vectors):
+            self.put(model_name, text, vector)
+        return len(models)
@@ -1,25 +1,112 @@
-﻿"""4주차 RAG 체인 구성 스크립트."""
+﻿"""4주차 RAG 체인 구성 스크립트.
+
+인덱스 로드(버전 해석·매니페스트 검증·문서/벡터 읽기)와 build_rag_chain(RagChainConfig)을 담당한다.
+검색기는 각 모듈에 있다: dense_retriever(DenseRetriever, embed_queries), hybrid_retriever, reranker(RerankRetriever),
+federated_retriever, micro_batching(MicroBatchingRetriever), neighbor_expansion, context_packing(ContextPackingRetriever).
+"""
 
 from __future__ import annotations
 
 import json
-import os
+import sys
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 import numpy as np
 from dotenv import load_dotenv
 from langchain.chains import RetrievalQA
 from langchain.schema import Document
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_core.retrievers import BaseRetriever
-from pydantic import Field
+from langchain_core.caches import BaseCache
+
+CURRENT_DIR = Path(__file__).resolve().parent
+WEEK3_DIR = CURRENT_DIR.parent / "week3"
+for path in (WEEK3_DIR, CURRENT_DIR):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from chunk_columns import load_chunk_columns  # noqa: E402
+from dim_reduction import load_dimension_reducer  # noqa: E402
+from model_registry import configure_model_registry, default_model_registry, get_embeddings  # noqa: E402
+from index_store import (  # noqa: E402
+    discover_index_dirs,
+    read_current_version,
+    read_manifest,
+    resolve_index_dir,
+    verify_manifest,
+)
+from adaptive_k import AdaptiveKLog  # noqa: E402
+from async_retrieval import AsyncRetrievalExecutor  # noqa: E402
+from context_packing import ContextPacker, ContextPackingRetriever, last_packing_report  # noqa: E402
+from dense_retriever import DenseRetriever  # noqa: E402
+from federated_retriever import FederatedRetriever  # noqa: E402
+from hybrid_retriever import HybridRetriever  # noqa: E402
+from llm_backend import create_chat_model  # noqa: E402
+from llm_cache import configure_llm_cache, default_llm_cache  # noqa: E402
+from micro_batching import MicroBatchingRetriever  # noqa: E402
+from neighbor_expansion import NeighborExpansionRetriever, load_chunk_adjacency  # noqa: E402
+from query_cache import QueryEmbeddingCache  # noqa: E402
+from reranker import CrossEncoderReranker, RerankRetriever  # noqa: E402
+from source_text import load_source_texts  # noqa: E402
+from sparse_index import load_sparse_index  # noqa: E402
+from vector_quantization import QuantizedVectors, load_float32_vectors, load_quantized_vectors  # noqa: E402
+from vector_shards import ShardedSearcher, read_shards_manifest  # noqa: E402
 
 load_dotenv()
 
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def open_index_dir(index_dir: Path, expected_model: Optional[str] = None, verify_checksums: bool = False) -> Path:
+    """current.json이 가리키는 버전 폴더로 해석하고 manifest.json을 검증한다.
+
+    기본 검증은 파일 존재·크기와 임베딩 모델만 확인한다 (verify_checksums=True면 SHA-256까지 비교).
+    버전 관리 이전의 평면 구조(매니페스트 없음)는 그대로 사용한다.
+    """
+
+    resolved = resolve_index_dir(index_dir)
+    verify_manifest(resolved, expected_model=expected_model, check_checksums=verify_checksums)
+    return resolved
+
+
+def index_version(index_dirs: List[Path]) -> str:
+    """인덱스 디렉터리들의 현재 버전을 하나의 문자열로 만든다 (답변 캐시 무효화 판단용).
+
+    버전 관리 인덱스는 current.json의 버전, 평면 구조는 metadata.json 수정 시각을 사용한다.
+    """
+
+    parts = []
+    for index_dir in index_dirs:
+        version = read_current_version(Path(index_dir))
+        if version is None:
+            metadata_path = Path(index_dir) / "metadata.json"
+            version = str(metadata_path.stat().st_mtime_ns) if metadata_path.exists() else "missing"
+        parts.append(f"{index_dir}@{version}")
+    return "|".join(parts)
+
 
-def load_documents_and_vectors(index_dir: Path) -> tuple[List[Document], np.ndarray]:
+def index_precision(index_dir: Path) -> str:
+    """매니페스트에 기록된 벡터 저장 정밀도 (매니페스트가 없으면 float32)."""
+
+    manifest = read_manifest(index_dir) or {}
+    return str(manifest.get("precision", "float32"))
+
+
+def load_index_quantization(index_dir: Path) -> Optional[QuantizedVectors]:
+    """매니페스트 정밀도가 float16/int8이면 양자화 벡터를 읽는다."""
+
+    if index_precision(index_dir) == "float32":
+        return None
+    return load_quantized_vectors(index_dir)
+
+
+def load_documents_and_vectors(
+    index_dir: Path,
+    expected_model: Optional[str] = None,
+    verify_checksums: bool = False,
+) -> tuple[List[Document], np.ndarray]:
+    index_dir = open_index_dir(index_dir, expected_model=expected_model, verify_checksums=verify_checksums)
     metadata_path = index_dir / "metadata.json"
     if not metadata_path.exists():
         raise FileNotFoundError(f"metadata.json을 찾을 수 없습니다: {metadata_path}")
@@ -28,150 +115,315 @@ def load_documents_and_vectors(index_dir: Path) -> tuple[List[Document], np.ndar
     if not metadata:
         raise ValueError(f"{metadata_path}에 문서가 없습니다.")
 
-    documents = [Document(page_content=item["text"], metadata={"doc_id": item["doc_id"]}) for item in metadata]
+    columns = load_chunk_columns(index_dir)
+    spans = load_chunk_spans(index_dir)
+    documents = []
+    for idx, item in enumerate(metadata):
+        doc_meta: Dict[str, Any] = {"doc_id": item["doc_id"]}
+        if columns is not None:
+            doc_meta.update(columns.record(idx))
+        if item["doc_id"] in spans:
+            doc_meta["start"], doc_meta["end"], source = spans[item["doc_id"]]
+            if source is not None:
+                doc_meta.setdefault("source", source)
+        documents.append(Document(page_content=item["text"], metadata=doc_meta))
+    mapped = load_float32_vectors(index_dir) if index_precision(index_dir) != "float32" else None
+    if mapped is not None:
+        # 양자화 인덱스는 float32 벡터를 RAM에 올리지 않고 재점수용 메모리 맵으로 둔다
+        return documents, mapped
+    if "vector" not in metadata[0]:
+        raise ValueError(f"metadata.json에 벡터가 없고 재점수용 벡터 파일도 없습니다: {index_dir}")
     vectors = np.array([item["vector"] for item in metadata], dtype="float32")
+    reducer = load_dimension_reducer(index_dir)
+    if reducer is not None:
+        # metadata.json은 원본 임베딩이므로 인덱스와 같은 투영으로 축소한다
+        return documents, reducer.transform(vectors)
     vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-10
     return documents, vectors
 
 
-class DenseRetriever(BaseRetriever):
-    """간단한 내장 벡터 검색기."""
+def load_chunk_spans(index_dir: Path) -> Dict[str, tuple[int, int, Optional[str]]]:
+    """chunks_with_ids.json에서 doc_id별 원문(full_text.txt) 내 (start, end, 출처 slug)를 읽는다.
+
+    파일이 없거나 위치 정보가 없는 청크는 결과에 포함하지 않는다. 출처는 청크의 source(통합 인덱스),
+    없으면 파일의 source(문서별 인덱스), 둘 다 없으면 None이다.
+    """
+
+    path = index_dir / "chunks_with_ids.json"
+    if not path.exists():
+        return {}
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    default_source = payload.get("source")
+    spans: Dict[str, tuple[int, int, Optional[str]]] = {}
+    for chunk in payload.get("chunks", []):
+        if chunk.get("doc_id") is not None and chunk.get("start") is not None and chunk.get("end") is not None:
+            source = chunk.get("source", default_source)
+            spans[str(chunk["doc_id"])] = (int(chunk["start"]), int(chunk["end"]), source)
+    return spans
+
+
+def index_label(index_dir: Path) -> str:
+    """인덱스 디렉터리의 사람이 읽을 수 있는 이름 (<문서 slug>/<전략>)."""
+
+    return "/".join(Path(index_dir).parts[-2:])
+
 
-    documents: List[Document] = Field(default_factory=list)
-    vectors: np.ndarray = Field(...)
-    embedder: HuggingFaceEmbeddings
-    k: int = 5
+def load_dense_retriever(index_dir: Path, embedder: HuggingFaceEmbeddings, **retriever_kwargs: Any) -> DenseRetriever:
+    """인덱스 디렉터리의 문서/벡터와 부가 파일(컬럼, 양자화, 차원 축소)을 읽어 DenseRetriever를 만든다."""
+
+    index_dir = resolve_index_dir(index_dir)
+    documents, vectors = load_documents_and_vectors(index_dir, expected_model=EMBEDDING_MODEL)
+    return DenseRetriever(
+        documents=documents,
+        vectors=vectors,
+        embedder=embedder,
+        columns=load_chunk_columns(index_dir),
+        quantized=load_index_quantization(index_dir),
+        reducer=load_dimension_reducer(index_dir),
+        **retriever_kwargs,
+    )
+
+
+def load_federated_retriever(
+    index_dirs: List[Path],
+    embedder: HuggingFaceEmbeddings,
+    k: int = 5,
+    candidate_k: int = 20,
+    score_norm: str = "zscore",
+    dedup_overlap: float = 0.5,
+    executor: Optional[AsyncRetrievalExecutor] = None,
+    **retriever_kwargs: Any,
+) -> FederatedRetriever:
+    """여러 인덱스 디렉터리를 하나의 FederatedRetriever로 묶는다.
+
+    문서별 인덱스의 doc_id(예: semantic_00001)는 인덱스끼리 겹치므로, 통합 인덱스와 같은 방식으로
+    "<인덱스 이름>/<doc_id>"로 바꾸고 출처가 없는 문서에는 상위 폴더 이름(문서 slug)을 source로 기록한다.
+    retriever_kwargs(MMR 설정 등)는 모든 인덱스의 DenseRetriever에 그대로 전달하며,
+    metadata_filter는 컬럼(columns.npz)이 있는 통합 인덱스에만 적용한다.
+    """
+
+    if score_norm not in {"zscore", "minmax", "none"}:
+        raise ValueError(f"지원하지 않는 score_norm입니다: {score_norm}")
+    members: List[DenseRetriever] = []
+    labels: List[str] = []
+    for index_dir in index_dirs:
+        label = index_label(index_dir)
+        member = load_dense_retriever(index_dir, embedder, executor=executor, **retriever_kwargs)
+        if member.metadata_filter and member.columns is None:
+            print(f"ℹ️  {label}에는 columns.npz가 없어 metadata_filter 없이 검색합니다.")
+            member.metadata_filter = None
+        for doc in member.documents:
+            doc.metadata["doc_id"] = f"{label}/{doc.metadata['doc_id']}"
+            doc.metadata.setdefault("source", Path(index_dir).parent.name)
+        members.append(member)
+        labels.append(label)
+    retriever = FederatedRetriever(
+        members=members,
+        labels=labels,
+        k=k,
+        candidate_k=candidate_k,
+        score_norm=score_norm,
+        dedup_overlap=dedup_overlap,
+        executor=executor,
+    )
+    if score_norm == "zscore":
+        retriever._member_stats()
+    return retriever
+
+
+@dataclass
+class RagChainConfig:
+    """build_rag_chain 옵션 (검색·후처리·LLM 설정). 모델/캐시/실행기 같은 실행 중 객체는 build_rag_chain 인자로 넘긴다.
+
+    각 단계는 기본값이면 꺼져 있고, 켠 단계만 dense → 하이브리드 → 재순위화 → 마이크로 배칭 → 이웃 확장 →
+    컨텍스트 패킹 순으로 검색기를 감싼다.
+    """
+
+    # LLM
+    model_name: str = "gemini-2.5-flash"
+    temperature: float = 0.0
+    top_p: Optional[float] = None
+    top_k: Optional[int] = None
+    llm_backend: str = "gemini"  # gemini: Gemini API, local: API 키 없이 동작하는 결정적 로컬 대체 모델
+    local_llm_options: Optional[Dict[str, Any]] = None  # 로컬 대체 모델 설정 (첫 토큰 지연 분포, 초당 토큰 수 등)
+    # dense 검색
+    retrieval_k: int = 5
     use_mmr: bool = False
-    mmr_diversity: float = 0.5  # lambda 파라미터: 0.0=유사도만, 1.0=다양성만
-
-    def _get_relevant_documents(self, query: str) -> List[Document]:
-        query_vec = np.array(self.embedder.embed_query(query), dtype="float32")
-        query_vec /= np.linalg.norm(query_vec) + 1e-10
-        sims = self.vectors @ query_vec
-        
-        if self.use_mmr:
-            indices = self._mmr_search(query_vec, sims, self.k, self.mmr_diversity)
-        else:
-            # 기본 유사도 검색
-            indices = np.argsort(sims)[::-1][: self.k]
-        
-        return [self.documents[i] for i in indices]
-
-    def _mmr_search(
-        self, 
-        query_vec: np.ndarray, 
-        similarities: np.ndarray, 
-        k: int, 
-        lambda_param: float
-    ) -> np.ndarray:
-        """
-        MMR (Maximal Marginal Relevance) 검색 알고리즘.
-        
-        MMR은 유사도와 다양성을 모두 고려하여 검색 결과의 다양성을 높입니다.
-        lambda_param: 0.0에 가까울수록 유사도 우선, 1.0에 가까울수록 다양성 우선
-        """
-        selected_indices = []
-        candidate_indices = np.argsort(similarities)[::-1]  # 유사도 순으로 정렬
-        
-        # 첫 번째 문서는 가장 유사한 것으로 선택
-        if len(candidate_indices) > 0:
-            selected_indices.append(candidate_indices[0])
-            candidate_indices = candidate_indices[1:]
-        
-        # 나머지 문서는 MMR 점수로 선택
-        while len(selected_indices) < k and len(candidate_indices) > 0:
-            best_score = -np.inf
-            best_idx = None
-            
-            for candidate_idx in candidate_indices:
-                # 유사도 점수
-                relevance = similarities[candidate_idx]
-                
-                # 이미 선택된 문서들과의 최대 유사도 (다양성 측정)
-                max_sim_to_selected = 0.0
-                if selected_indices:
-                    candidate_vec = self.vectors[candidate_idx]
-                    selected_vecs = self.vectors[selected_indices]
-                    sims_to_selected = selected_vecs @ candidate_vec
-                    max_sim_to_selected = np.max(sims_to_selected)
-                
-                # MMR 점수 = lambda * relevance - (1 - lambda) * max_sim_to_selected
-                mmr_score = lambda_param * relevance - (1 - lambda_param) * max_sim_to_selected
-                
-                if mmr_score > best_score:
-                    best_score = mmr_score
-                    best_idx = candidate_idx
-            
-            if best_idx is not None:
-                selected_indices.append(best_idx)
-                candidate_indices = candidate_indices[candidate_indices != best_idx]
-            else:
-                break
-        
-        return np.array(selected_indices)
-
-    async def _aget_relevant_documents(self, query: str) -> List[Document]:
-        return self._get_relevant_documents(query)
+    mmr_diversity: float = 0.5  # 0.0=유사도만, 1.0=다양성만
+    mmr_fetch_k: Optional[int] = None  # MMR 후보로 쓸 유사도 상위 문서 수 (None이면 전체 문서)
+    metadata_filter: Optional[Dict[str, Any]] = None  # 통합 인덱스 필터 (source/page/strategy)
+    shard_workers: int = 0  # 샤드 분산 검색 워커 프로세스 수 (0이면 단일 프로세스 검색)
+    # 적응형 k: 질의마다 유사도 분포로 검색 문서 수를 정함 (MMR이 아닌 dense 검색에만 적용)
+    adaptive_k: bool = False
+    adaptive_min_k: int = 1
+    adaptive_max_k: Optional[int] = None  # None이면 retrieval_k
+    adaptive_gap: Optional[float] = 0.1  # 이웃 순위 점수 차이가 이 값 이상이면 자름
+    adaptive_relative: Optional[float] = None  # 1위 점수 x 이 비율 미만이면 자름
+    # 하이브리드 검색 (BM25 + dense, RRF)
+    hybrid: bool = False
+    hybrid_candidate_k: int = 20
+    rrf_k: int = 60
+    # 재순위화 (reranker 인자를 넘겼을 때만)
+    rerank_candidate_k: int = 20
+    rerank_top_k: Optional[int] = None  # None이면 retrieval_k
+    # 연합 검색: index_dir과 함께 병렬 검색할 인덱스 디렉터리들 (None이면 index_dir만 검색)
+    federated_index_dirs: Optional[List[Path]] = None
+    federated_candidate_k: int = 20
+    federated_score_norm: str = "zscore"  # zscore/minmax/none
+    federated_dedup_overlap: float = 0.5
+    # 마이크로 배칭: 동시에 들어온 단일 질의 검색을 모아 배치 인코딩 + 배치 검색 한 번으로 처리
+    micro_batching: bool = False
+    micro_batch_window_ms: float = 5.0
+    micro_batch_max_size: int = 32
+    # 이웃 확장 (small-to-big)
+    neighbor_expansion: bool = False
+    expansion_window_chars: int = 1200  # 결과 하나를 넓힐 최대 문자 수
+    expansion_context_chars: int = 4000  # 넓힌 창 전체의 문자 수 예산
+    # 컨텍스트 패킹: LLM에 넘길 컨텍스트 토큰 예산 (None이면 검색 결과를 그대로 전달)
+    context_token_budget: Optional[int] = None
 
 
 def build_rag_chain(
     index_dir: Path,
+    config: Optional[RagChainConfig] = None,
+    *,
     google_api_key: Optional[str] = None,
-    model_name: str = "gemini-2.5-flash",
-    retrieval_k: int = 5,
-    use_mmr: bool = False,
-    mmr_diversity: float = 0.5,
-    temperature: float = 0.0,
-    top_p: Optional[float] = None,
-    top_k: Optional[int] = None,
+    query_cache: Optional[QueryEmbeddingCache] = None,
+    reranker: Optional[CrossEncoderReranker] = None,
+    retrieval_executor: Optional[AsyncRetrievalExecutor] = None,
+    adaptive_log: Optional[AdaptiveKLog] = None,
+    llm_cache: Optional[BaseCache] = None,
+    **options: Any,
 ) -> RetrievalQA:
     """
     RAG 체인을 구성한다.
-    
+
     Args:
         index_dir: 인덱스 디렉토리 경로
+        config: 검색·후처리·LLM 옵션 (None이면 RagChainConfig 기본값)
         google_api_key: Google API 키 (None이면 환경 변수 사용)
-        model_name: LLM 모델 이름
-        retrieval_k: 검색할 문서 수
-        use_mmr: MMR 검색 사용 여부
-        mmr_diversity: MMR 다양성 파라미터 (0.0=유사도만, 1.0=다양성만)
-        temperature: LLM temperature 파라미터
-        top_p: LLM top_p 파라미터 (None이면 기본값 사용)
-        top_k: LLM top_k 파라미터 (None이면 기본값 사용)
+        query_cache: 질의 임베딩 LRU 캐시 (None이면 매 질의를 인코딩)
+        reranker: 크로스 인코더 재순위화기 (None이면 재순위화하지 않음)
+        retrieval_executor: 비동기 검색(ainvoke/asearch_batch)용 실행기 (None이면 프로세스 공유 실행기)
+        adaptive_log: 적응형 k가 질의별로 고른 k를 기록할 로그 (None이면 새로 만듦)
+        llm_cache: LLM 응답 캐시 (None이면 configure_llm_cache()로 설정한 전역 캐시, 그것도 없으면 캐시 안 함)
+        **options: config 필드를 개별로 덮어쓸 값 (예: build_rag_chain(index_dir, retrieval_k=3, use_mmr=True))
     """
-    documents, vectors = load_documents_and_vectors(index_dir)
-    embedder = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-
-    key = google_api_key or os.getenv("GOOGLE_API_KEY")
-    if not key:
-        raise EnvironmentError("GOOGLE_API_KEY 환경 변수가 필요합니다.")
-
-    # LLM 파라미터 설정
-    llm_kwargs = {
-        "model": model_name,
-        "temperature": temperature,
-        "convert_system_message_to_human": False,
-        "google_api_key": key,
-    }
-    
-    # top_p와 top_k 파라미터 추가
-    # Gemini API는 top_p, top_k를 지원하며, LangChain 래퍼도 이를 지원합니다
-    if top_p is not None:
-        llm_kwargs["top_p"] = float(top_p)
-    if top_k is not None:
-        llm_kwargs["top_k"] = int(top_k)
-    
-    llm = ChatGoogleGenerativeAI(**llm_kwargs)
-
-    retriever = DenseRetriever(
-        documents=documents, 
-        vectors=vectors, 
-        embedder=embedder, 
-        k=retrieval_k,
-        use_mmr=use_mmr,
-        mmr_diversity=mmr_diversity,
+    config = replace(config or RagChainConfig(), **options)
+    unresolved_dir = Path(index_dir)
+    index_dir = resolve_index_dir(index_dir)
+    embedder = get_embeddings(EMBEDDING_MODEL)
+
+    searcher = None
+    if config.federated_index_dirs and config.shard_workers > 0:
+        print("⚠️  연합 검색에서는 샤드 분산 검색을 사용하지 않습니다.")
+    elif config.shard_workers > 0:
+        if read_shards_manifest(index_dir) is None:
+            print(f"⚠️  {index_dir}에 샤드가 없어 단일 프로세스 검색을 사용합니다.")
+        else:
+            searcher = ShardedSearcher(index_dir, workers=config.shard_workers)
+
+    llm = create_chat_model(
+        config.llm_backend,
+        model_name=config.model_name,
+        temperature=config.temperature,
+        top_p=config.top_p,
+        top_k=config.top_k,
+        google_api_key=google_api_key,
+        cache=llm_cache or default_llm_cache(),
+        local_options=config.local_llm_options,
     )
 
+    retriever_kwargs: Dict[str, Any] = {
+        "k": config.retrieval_k,
+        "use_mmr": config.use_mmr,
+        "mmr_diversity": config.mmr_diversity,
+        "mmr_fetch_k": config.mmr_fetch_k,
+        "metadata_filter": config.metadata_filter,
+        "query_cache": query_cache,
+    }
+    if config.adaptive_k and (config.federated_index_dirs or config.hybrid or reranker is not None or config.use_mmr):
+        print("⚠️  적응형 k는 dense 유사도 검색 결과를 그대로 쓸 때만 적용되어 연합/하이브리드/재순위화/MMR에서는 고정 k를 사용합니다.")
+    elif config.adaptive_k:
+        retriever_kwargs.update(
+            adaptive_k=True,
+            adaptive_min_k=config.adaptive_min_k,
+            adaptive_max_k=config.adaptive_max_k,
+            adaptive_gap=config.adaptive_gap,
+            adaptive_relative=config.adaptive_relative,
+            adaptive_log=adaptive_log or AdaptiveKLog(),
+        )
+    if config.federated_index_dirs:
+        retriever = load_federated_retriever(
+            [unresolved_dir, *[Path(path) for path in config.federated_index_dirs if Path(path) != unresolved_dir]],
+            embedder,
+            k=config.retrieval_k,
+            candidate_k=config.federated_candidate_k,
+            score_norm=config.federated_score_norm,
+            dedup_overlap=config.federated_dedup_overlap,
+            executor=retrieval_executor,
+            **{key: value for key, value in retriever_kwargs.items() if key != "k"},
+        )
+    else:
+        retriever = load_dense_retriever(
+            index_dir, embedder, searcher=searcher, executor=retrieval_executor, **retriever_kwargs
+        )
+
+    if config.hybrid and config.federated_index_dirs:
+        print("⚠️  연합 검색에서는 하이브리드 검색을 지원하지 않아 dense 검색만 사용합니다.")
+    elif config.hybrid:
+        sparse = load_sparse_index(index_dir)
+        if sparse is None:
+            print(f"⚠️  {index_dir}에 sparse_index.npz가 없어 dense 검색만 사용합니다.")
+        else:
+            retriever = HybridRetriever(
+                dense=retriever,
+                sparse=sparse,
+                k=config.retrieval_k,
+                candidate_k=config.hybrid_candidate_k,
+                rrf_k=config.rrf_k,
+            )
+
+    if reranker is not None:
+        retriever = RerankRetriever(
+            base=retriever,
+            reranker=reranker,
+            k=config.rerank_top_k or config.retrieval_k,
+            candidate_k=config.rerank_candidate_k,
+        )
+
+    # 배치 스케줄러는 요청별 후처리(이웃 확장, 컨텍스트 패킹 보고)보다 안쪽에 둔다
+    if config.micro_batching:
+        retriever = MicroBatchingRetriever(
+            base=retriever,
+            k=retriever.k,
+            window_ms=config.micro_batch_window_ms,
+            max_batch=config.micro_batch_max_size,
+        )
+
+    if config.neighbor_expansion:
+        texts = load_source_texts(index_dir)
+        if config.federated_index_dirs:
+            print("⚠️  연합 검색에서는 이웃 확장을 지원하지 않아 검색된 청크를 그대로 사용합니다.")
+        elif not texts:
+            print(f"⚠️  {index_dir}에 sources/ 원문이 없어 이웃 확장을 건너뜁니다 (Week3를 다시 실행하세요).")
+        else:
+            retriever = NeighborExpansionRetriever(
+                base=retriever,
+                adjacency=load_chunk_adjacency(retriever.documents),
+                texts=texts,
+                k=retriever.k,
+                window_chars=config.expansion_window_chars,
+                max_context_chars=config.expansion_context_chars,
+            )
+
+    if config.context_token_budget is not None:
+        retriever = ContextPackingRetriever(
+            base=retriever,
+            packer=ContextPacker(token_budget=config.context_token_budget),
+            k=retriever.k,
+        )
+
     chain = RetrievalQA.from_chain_type(
         llm=llm,
         chain_type="stuff",
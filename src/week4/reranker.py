@@ -0,0 +1,156 @@
+"""4주차 크로스 인코더 재순위화(rerank).
+
+dense/하이브리드 검색으로 넓게 뽑은 후보 청크를 (질의, 청크) 쌍 단위로 로컬 크로스 인코더에
+한 번의 배치로 넣어 점수를 매기고, 상위 k개만 LLM 프롬프트로 보낸다.
+같은 질의-청크 쌍의 점수는 (질의 해시, 청크 본문 해시) 키의 LRU 캐시에 보관해 재사용한다.
+doc_id(예: fixed_00001)는 PDF/인덱스마다 반복되므로 키로 쓰지 않는다 (한 재순위화기를 여러 인덱스가 공유해도 안전).
+RerankRetriever는 기반 검색기를 감싸 후보 검색 → 재순위화를 한 검색기로 묶는다.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain.schema import Document
+from langchain_core.retrievers import BaseRetriever
+
+from async_retrieval import default_retrieval_executor
+from model_registry import get_cross_encoder
+from query_cache import normalize_query
+
+DEFAULT_RERANK_MODEL = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"  # 한국어 포함 다국어 MS MARCO
+
+ScoreKey = Tuple[str, str]
+
+
+def query_hash(query: str) -> str:
+    return hashlib.sha1(normalize_query(query).encode("utf-8")).hexdigest()[:16]
+
+
+class CrossEncoderReranker:
+    """sentence-transformers CrossEncoder 기반 재순위화기 (점수 LRU 캐시 포함)."""
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_RERANK_MODEL,
+        batch_size: int = 32,
+        cache_size: int = 4096,
+        max_length: int = 512,
+    ) -> None:
+        self.model_name = model_name
+        # 모델은 프로세스 전역 레지스트리에서 공유한다 (API 앱을 여러 개 만들어도 한 번만 로드)
+        self.model = get_cross_encoder(model_name, max_length=max_length)
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._scores: "OrderedDict[ScoreKey, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _doc_key(doc: Document) -> str:
+        # 점수는 (질의, 본문)으로만 정해지므로 본문 해시로 구분한다
+        return hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+
+    def score_batch(self, queries: Sequence[str], candidates: Sequence[Sequence[Document]]) -> List[np.ndarray]:
+        """질의별 후보 문서 점수를 반환한다. 캐시에 없는 쌍은 모든 질의를 통틀어 한 번에 예측한다."""
+
+        keys = [[(query_hash(query), self._doc_key(doc)) for doc in docs] for query, docs in zip(queries, candidates)]
+        scores = [np.empty(len(docs), dtype=np.float32) for docs in candidates]
+        missing: List[Tuple[int, int]] = []
+        with self._lock:
+            for q_idx, doc_keys in enumerate(keys):
+                for d_idx, key in enumerate(doc_keys):
+                    cached = self._scores.get(key)
+                    if cached is None:
+                        missing.append((q_idx, d_idx))
+                    else:
+                        self._scores.move_to_end(key)
+                        scores[q_idx][d_idx] = cached
+            self.hits += sum(len(doc_keys) for doc_keys in keys) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            pairs = [(queries[q_idx], candidates[q_idx][d_idx].page_content) for q_idx, d_idx in missing]
+            predicted = np.asarray(
+                self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False),
+                dtype=np.float32,
+            ).reshape(-1)
+            with self._lock:
+                for (q_idx, d_idx), value in zip(missing, predicted):
+                    scores[q_idx][d_idx] = value
+                    self._scores[keys[q_idx][d_idx]] = float(value)
+                while len(self._scores) > self.cache_size:
+                    self._scores.popitem(last=False)
+        return scores
+
+    def rerank_batch(
+        self,
+        queries: Sequence[str],
+        candidates: Sequence[Sequence[Document]],
+        k: int,
+    ) -> List[List[Document]]:
+        """질의별로 크로스 인코더 점수 상위 k개 문서를 반환한다 (동점이면 원래 순위 유지)."""
+
+        results = []
+        for docs, scores in zip(candidates, self.score_batch(queries, candidates)):
+            order = np.argsort(-scores, kind="stable")[:k]
+            results.append([docs[i] for i in order])
+        return results
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._scores),
+                "max_entries": self.cache_size,
+            }
+
+
+class RerankRetriever(BaseRetriever):
+    """기반 검색기(dense/하이브리드)에서 candidate_k개 후보를 받아 크로스 인코더로 재순위화해 k개만 남긴다."""
+
+    base: BaseRetriever
+    reranker: CrossEncoderReranker
+    k: int = 5
+    candidate_k: int = 20
+
+    @property
+    def documents(self) -> List[Document]:
+        return self.base.documents
+
+    def _get_relevant_documents(self, query: str) -> List[Document]:
+        return self.search_batch([query])[0]
+
+    def search_batch(self, queries: List[str], k: Optional[int] = None) -> List[List[Document]]:
+        if not queries:
+            return []
+        k = self.k if k is None else k
+        depth = max(self.candidate_k, k)
+        if hasattr(self.base, "search_batch"):
+            candidates = self.base.search_batch(queries, depth)
+        else:
+            candidates = [self.base.get_relevant_documents(query) for query in queries]
+        return self.reranker.rerank_batch(queries, candidates, k)
+
+    async def asearch_batch(self, queries: List[str], k: Optional[int] = None) -> List[List[Document]]:
+        if not queries:
+            return []
+        k = self.k if k is None else k
+        depth = max(self.candidate_k, k)
+        if hasattr(self.base, "asearch_batch"):
+            candidates = await self.base.asearch_batch(queries, depth)
+        else:
+            candidates = [await self.base.ainvoke(query) for query in queries]
+        executor = getattr(self.base, "executor", None) or default_retrieval_executor()
+        return await executor.run(self.reranker.rerank_batch, queries, candidates, k)
+
+    async def _aget_relevant_documents(self, query: str) -> List[Document]:
+        return (await self.asearch_batch([query]))[0]
@@ -1,6 +1,12 @@
 ﻿"""4주차 검색 평가 스크립트.
 
-검증용 질문-답변 세트를 기반으로 간단한 재현율(Recall) 지표를 계산한다.
+검증용 질문-답변 세트로 여러 인덱스의 검색 품질(Recall/MRR/nDCG@k)을 한 번에 비교한다.
+질문은 한 번만 임베딩하고, 인덱스마다 (질문 수 x 청크 수) 점수 행렬로 가장 큰 k까지 한 번만
+순위를 매긴 뒤 그 순위에서 모든 k의 지표를 계산한다.
+정답 청크는 답변 문자열을 본문에 포함하는 청크이며, 지표는 인덱스에 정답 청크가 있는 질문만으로
+평균한다 (문서별 인덱스에 다른 문서에 대한 질문이 섞여 있어도 0점으로 끌어내리지 않도록).
+전략별 요약은 문서별 인덱스만 합치고, 여러 문서를 합친 통합 인덱스(columns.npz 보유, 예: _merged/<전략>)는
+같은 질문을 두 번 세지 않도록 별도 행으로 보고한다.
 """
 
 from __future__ import annotations
@@ -8,11 +14,22 @@ from __future__ import annotations
 import json
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List
+from typing import Dict, Iterable, List, Optional, Sequence
 
-from rag_chain import DenseRetriever, load_documents_and_vectors
+import numpy as np
+
+from dense_retriever import embed_queries
+from rag_chain import (
+    EMBEDDING_MODEL,
+    get_embeddings,
+    index_label,
+    load_dense_retriever,
+)
 from langchain_community.embeddings import HuggingFaceEmbeddings
 
+DEFAULT_KS = (1, 3, 5, 10)
+METRICS = ("recall", "mrr", "ndcg")
+
 
 @dataclass
 class QAExample:
@@ -27,17 +44,164 @@ def load_validation_set(path: Path) -> List[QAExample]:
     return [QAExample(**item) for item in data]
 
 
-def evaluate(index_dir: Path, validation_path: Path, k: int = 5) -> float:
-    """주어진 인덱스와 검증 세트로 Recall@k를 계산한다."""
+def relevance_matrix(examples: Sequence[QAExample], texts: Sequence[str]) -> np.ndarray:
+    """(질문 수, 청크 수) 불리언 행렬: 청크 본문이 답변 문자열을 포함하면 True."""
+
+    return np.array([[example.answer in text for text in texts] for example in examples], dtype=bool).reshape(
+        len(examples), len(texts)
+    )
+
+
+def ranking_metrics(rankings: Sequence[np.ndarray], relevant: np.ndarray, ks: Iterable[int]) -> Dict[str, np.ndarray]:
+    """질문별 순위(행 번호 배열)와 정답 행렬로 질문별 Recall/MRR/nDCG@k 배열을 계산한다.
+
+    반환 키는 "recall@5" 형식이며 값은 (질문 수,) 배열이다.
+    """
+
+    ks = sorted(set(ks))
+    k_max = ks[-1]
+    num_queries = len(rankings)
+    # (질문 수, k_max) 순위별 정답 여부 (순위 목록이 k_max보다 짧으면 False로 채움)
+    hits = np.zeros((num_queries, k_max), dtype=bool)
+    for q_idx, rows in enumerate(rankings):
+        rows = np.asarray(rows)[:k_max]
+        hits[q_idx, : len(rows)] = relevant[q_idx, rows]
+    num_relevant = relevant.sum(axis=1)
 
-    documents, vectors = load_documents_and_vectors(index_dir)
-    embedder = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    retriever = DenseRetriever(documents=documents, vectors=vectors, embedder=embedder, k=k)
+    discounts = 1.0 / np.log2(np.arange(2, k_max + 2))
+    ideal = np.cumsum(discounts)
+    first_hit = np.where(hits.any(axis=1), hits.argmax(axis=1), k_max)
+
+    metrics: Dict[str, np.ndarray] = {}
+    for k in ks:
+        metrics[f"recall@{k}"] = hits[:, :k].any(axis=1).astype(float)
+        metrics[f"mrr@{k}"] = np.where(first_hit < k, 1.0 / (first_hit + 1), 0.0)
+        dcg = hits[:, :k] @ discounts[:k]
+        idcg = np.where(num_relevant > 0, ideal[np.clip(np.minimum(num_relevant, k) - 1, 0, None)], 1.0)
+        metrics[f"ndcg@{k}"] = dcg / idcg
+    return metrics
+
+
+def evaluate_indexes(
+    index_dirs: Sequence[Path],
+    validation_path: Path,
+    ks: Iterable[int] = DEFAULT_KS,
+    embedder: Optional[HuggingFaceEmbeddings] = None,
+) -> List[Dict]:
+    """여러 인덱스를 같은 질문 임베딩으로 평가해 인덱스별 결과 행 목록을 반환한다.
+
+    각 행: {"index", "source", "strategy", "merged", "answerable", "total", "recall@k", "mrr@k", "ndcg@k", ...}
+    merged는 여러 문서를 합친 통합 인덱스(columns.npz 보유)인지 여부다.
+    """
+
+    ks = sorted(set(int(k) for k in ks))
     examples = load_validation_set(validation_path)
+    questions = [example.question for example in examples]
+    embedder = embedder or get_embeddings(EMBEDDING_MODEL)
+
+    rows: List[Dict] = []
+    raw_mat: Optional[np.ndarray] = None
+    for index_dir in index_dirs:
+        retriever = load_dense_retriever(index_dir, embedder, k=ks[-1])
+        if raw_mat is None:
+            # 질문 임베딩은 첫 인덱스에서 한 번만 계산해 모든 인덱스가 공유한다
+            raw_mat = embed_queries(retriever, questions)
+        query_mat = retriever.reducer.transform(raw_mat) if retriever.reducer is not None else raw_mat
+        rankings = retriever._search_query_mat(query_mat, ks[-1])
+
+        relevant = relevance_matrix(examples, [doc.page_content for doc in retriever.documents])
+        answerable = relevant.any(axis=1)
+        per_query = ranking_metrics(rankings, relevant, ks)
+        label = index_label(index_dir)
+        row: Dict = {
+            "index": label,
+            "source": Path(index_dir).parent.name,
+            "strategy": Path(index_dir).name,
+            "merged": retriever.columns is not None,
+            "answerable": int(answerable.sum()),
+            "total": len(examples),
+        }
+        for name, values in per_query.items():
+            row[name] = float(values[answerable].mean()) if answerable.any() else 0.0
+            # 전략별 합산용 합계 (answerable 가중 평균)
+            row[f"_sum_{name}"] = float(values[answerable].sum())
+        rows.append(row)
+    return rows
 
+
+def summarize_by_strategy(rows: Sequence[Dict]) -> List[Dict]:
+    """전략별로 문서 인덱스들의 결과를 합친다 (답할 수 있는 질문 수로 가중 평균).
+
+    통합 인덱스는 문서별 인덱스와 같은 질문을 다시 세게 되므로 합치지 않고 "<전략> [<폴더>]" 행으로 따로 둔다.
+    """
+
+    summary: Dict[str, Dict] = {}
+    for row in rows:
+        strategy = f"{row['strategy']} [{row['source']}]" if row.get("merged") else row["strategy"]
+        entry = summary.setdefault(strategy, {"strategy": strategy, "indexes": 0, "answerable": 0})
+        entry["indexes"] += 1
+        entry["answerable"] += row["answerable"]
+        for key, value in row.items():
+            if key.startswith("_sum_"):
+                entry[key] = entry.get(key, 0.0) + value
+    results = []
+    for entry in summary.values():
+        for key in [key for key in entry if key.startswith("_sum_")]:
+            entry[key[len("_sum_") :]] = entry.pop(key) / entry["answerable"] if entry["answerable"] else 0.0
+        results.append(entry)
+    return sorted(results, key=lambda entry: entry["strategy"])
+
+
+def format_comparison_table(rows: Sequence[Dict], ks: Iterable[int], key: str = "index") -> str:
+    """결과 행을 마크다운 표로 만든다 (key 열 + 지표 열)."""
+
+    ks = sorted(set(ks))
+    columns = [f"{metric}@{k}" for metric in METRICS for k in ks]
+    lines = [
+        "| " + " | ".join([key, "answerable", *columns]) + " |",
+        "|" + "---|" * (len(columns) + 2),
+    ]
+    for row in rows:
+        values = [f"{row.get(column, 0.0):.3f}" for column in columns]
+        lines.append("| " + " | ".join([str(row[key]), str(row["answerable"]), *values]) + " |")
+    return "\n".join(lines)
+
+
+def write_comparison(rows: Sequence[Dict], ks: Iterable[int], output_dir: Path) -> Path:
+    """인덱스별/전략별 비교표를 retrieval_eval.md, 원본 결과를 retrieval_eval.json으로 저장한다."""
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    public_rows = [{key: value for key, value in row.items() if not key.startswith("_")} for row in rows]
+    strategies = summarize_by_strategy(rows)
+    (output_dir / "retrieval_eval.json").write_text(
+        json.dumps({"indexes": public_rows, "strategies": strategies}, ensure_ascii=False, indent=2),
+        encoding="utf-8",
+    )
+    path = output_dir / "retrieval_eval.md"
+    path.write_text(
+        "## 전략별\n\n"
+        + format_comparison_table(strategies, ks, key="strategy")
+        + "\n\n## 인덱스별\n\n"
+        + format_comparison_table(sorted(public_rows, key=lambda row: (row["strategy"], row["source"])), ks)
+        + "\n",
+        encoding="utf-8",
+    )
+    return path
+
+
+def evaluate(index_dir: Path, validation_path: Path, k: int = 5) -> float:
+    """주어진 인덱스와 검증 세트로 Recall@k를 계산한다.
+
+    evaluate_indexes()의 recall@k와 달리 상위 k개 청크를 이어 붙인 본문에 답변이 있으면 적중으로 보고,
+    인덱스에 정답이 없는 질문까지 포함한 전체 질문 수로 평균한다 (기존 정의 유지).
+    """
+
+    examples = load_validation_set(validation_path)
+    if not examples:
+        return 0.0
+    retriever = load_dense_retriever(index_dir, get_embeddings(EMBEDDING_MODEL), k=k)
     hits = 0
-    for example in examples:
-        docs = retriever.get_relevant_documents(example.question)
+    for example, docs in zip(examples, retriever.search_batch([example.question for example in examples], k)):
         context = "\n".join(doc.page_content for doc in docs)
         if example.answer in context:
             hits += 1
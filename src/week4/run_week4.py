@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import os
 import sys
+from dataclasses import replace
 from pathlib import Path
 from typing import List, Optional
 
@@ -11,12 +12,22 @@ from omegaconf import DictConfig, OmegaConf
 
 CURRENT_DIR = Path(__file__).resolve().parent
 ROOT_DIR = CURRENT_DIR.parent.parent
-for path in {CURRENT_DIR, ROOT_DIR / "week3"}:
+for path in {CURRENT_DIR, ROOT_DIR / "src" / "week3"}:
     if str(path) not in sys.path:
         sys.path.insert(0, str(path))
 
-from rag_chain import build_rag_chain  # noqa: E402
-from retrieval_eval import evaluate  # noqa: E402
+from index_store import discover_index_dirs, resolve_index_dir  # noqa: E402
+from model_registry import configure_model_registry  # noqa: E402
+from adaptive_k import AdaptiveKLog  # noqa: E402
+from rag_chain import RagChainConfig, build_rag_chain, configure_llm_cache, default_llm_cache, last_packing_report  # noqa: E402
+from reranker import DEFAULT_RERANK_MODEL, CrossEncoderReranker  # noqa: E402
+from retrieval_eval import (  # noqa: E402
+    DEFAULT_KS,
+    evaluate_indexes,
+    format_comparison_table,
+    summarize_by_strategy,
+    write_comparison,
+)
 
 load_dotenv()
 
@@ -30,19 +41,9 @@ def resolve_google_key(config_key: Optional[str]) -> Optional[str]:
 
 
 def find_index_dirs(root: Path, recursive: bool) -> List[Path]:
-    """index.faiss 파일을 포함하는 디렉터리를 탐색한다."""
+    """index.faiss 파일 또는 버전 포인터(current.json)를 포함하는 디렉터리를 탐색한다."""
 
-    candidates = set()
-    if (root / "index.faiss").exists():
-        candidates.add(root.resolve())
-        if not recursive:
-            return sorted(candidates)
-
-    if recursive:
-        for path in root.glob("**/index.faiss"):
-            candidates.add(path.parent.resolve())
-
-    return sorted(candidates)
+    return discover_index_dirs(root, recursive=recursive)
 
 
 def resolve_index_dirs(index_root: Path, recursive: bool) -> List[Path]:
@@ -79,8 +80,13 @@ def run_workflow(cfg: DictConfig) -> None:
     validation_path = resolve_validation_path(cfg.evaluation.validation_path)
     google_key = resolve_google_key(cfg.rag.google_key)
     skip_qa = bool(cfg.rag.skip_qa)
+    backend_cfg = cfg.get("llm_backend") or {}
+    llm_backend = str(backend_cfg.get("name", "gemini"))
+    local_llm_options = backend_cfg.get("local")
+    if local_llm_options is not None:
+        local_llm_options = OmegaConf.to_container(local_llm_options, resolve=True)
 
-    if google_key is None and not skip_qa:
+    if llm_backend == "gemini" and google_key is None and not skip_qa:
         print("⚠️  GOOGLE_API_KEY가 없어 QA 단계를 건너뜁니다. `.env` 또는 환경 변수를 확인하세요.")
         skip_qa = True
 
@@ -89,50 +95,127 @@ def run_workflow(cfg: DictConfig) -> None:
     model_name = cfg.rag.model
     use_mmr = bool(cfg.rag.get("use_mmr", False))
     mmr_diversity = float(cfg.rag.get("mmr_diversity", 0.5))
+    mmr_fetch_k = cfg.rag.get("mmr_fetch_k")
     temperature = float(cfg.rag.get("temperature", 0.0))
     top_p = cfg.rag.get("top_p")
     top_k_llm = cfg.rag.get("top_k_llm")
+    shard_workers = int(cfg.rag.get("shard_workers", 0))
+    hybrid_cfg = cfg.rag.get("hybrid") or {}
+    rerank_cfg = cfg.rag.get("rerank") or {}
+    expansion_cfg = cfg.rag.get("neighbor_expansion") or {}
+    packing_cfg = cfg.rag.get("context_packing") or {}
+    context_token_budget = int(packing_cfg.get("token_budget", 2000)) if packing_cfg.get("enable", False) else None
+    adaptive_cfg = cfg.rag.get("adaptive_k") or {}
+    reranker = None
+    if rerank_cfg.get("enable", False):
+        reranker = CrossEncoderReranker(rerank_cfg.get("model_name", DEFAULT_RERANK_MODEL))
+    metadata_filter = cfg.rag.get("metadata_filter")
+    if metadata_filter is not None:
+        metadata_filter = OmegaConf.to_container(metadata_filter, resolve=True)
+    rag_config = RagChainConfig(
+        model_name=model_name,
+        temperature=temperature,
+        top_p=top_p,
+        top_k=top_k_llm,
+        llm_backend=llm_backend,
+        local_llm_options=local_llm_options,
+        retrieval_k=top_k,
+        use_mmr=use_mmr,
+        mmr_diversity=mmr_diversity,
+        mmr_fetch_k=mmr_fetch_k,
+        metadata_filter=metadata_filter,
+        shard_workers=shard_workers,
+        adaptive_k=bool(adaptive_cfg.get("enable", False)),
+        adaptive_min_k=int(adaptive_cfg.get("min_k", 1)),
+        adaptive_max_k=adaptive_cfg.get("max_k"),
+        adaptive_gap=adaptive_cfg.get("gap", 0.1),
+        adaptive_relative=adaptive_cfg.get("relative"),
+        hybrid=bool(hybrid_cfg.get("enable", False)),
+        hybrid_candidate_k=int(hybrid_cfg.get("candidate_k", 20)),
+        rrf_k=int(hybrid_cfg.get("rrf_k", 60)),
+        rerank_candidate_k=int(rerank_cfg.get("candidate_k", 20)),
+        rerank_top_k=rerank_cfg.get("top_k"),
+        neighbor_expansion=bool(expansion_cfg.get("enable", False)),
+        expansion_window_chars=int(expansion_cfg.get("window_chars", 1200)),
+        expansion_context_chars=int(expansion_cfg.get("max_context_chars", 4000)),
+        context_token_budget=context_token_budget,
+    )
 
     for idx, index_dir in enumerate(index_dirs, start=1):
         print(f"\n=== [{idx}/{len(index_dirs)}] 인덱스: {index_dir} ===")
 
-        if not skip_qa and google_key is not None:
+        if not skip_qa:
             search_method = "MMR" if use_mmr else "Similarity"
-            print(f"[1/3] RAG 체인 구성 (index={index_dir}, 검색={search_method})")
+            print(f"[1/2] RAG 체인 구성 (index={index_dir}, 검색={search_method})")
             try:
                 chain = build_rag_chain(
                     index_dir,
+                    rag_config,
                     google_api_key=google_key,
-                    model_name=model_name,
-                    retrieval_k=top_k,
-                    use_mmr=use_mmr,
-                    mmr_diversity=mmr_diversity,
-                    temperature=temperature,
-                    top_p=top_p,
-                    top_k=top_k_llm,
+                    reranker=reranker,
+                    # 샘플 질문마다 고른 k를 출력한다
+                    adaptive_log=AdaptiveKLog(verbose=True),
+                    metadata_filter=metadata_filter if (resolve_index_dir(index_dir) / "columns.npz").exists() else None,
                 )
             except Exception as exc:  # pragma: no cover - 외부 API 호출 오류
                 print(f"    ❌ RAG 체인 생성 실패: {exc}")
             else:
-                print("[2/3] 샘플 질문 실행")
+                print("[2/2] 샘플 질문 실행")
                 try:
                     result = chain.invoke({"query": question})
                     answer = result.get("result", result)
                     print("질문:", question)
                     print("답변:")
                     print(answer)
+                    report = last_packing_report() if context_token_budget is not None else None
+                    if report:
+                        print(
+                            f"ℹ️  컨텍스트 패킹: {report['tokens_in']} → {report['tokens_out']} 토큰 "
+                            f"({report['tokens_saved']} 절감, 겹침 제거 {report['overlap_tokens_removed']})"
+                        )
                 except Exception as exc:
                     print(f"    ❌ QA 실행 실패: {exc}")
         else:
             print("⚠️  QA 실행이 비활성화되어 있습니다.")
 
-        if validation_path:
-            print("[3/3] Recall 평가 실행")
-            try:
-                score = evaluate(index_dir, validation_path, k=top_k)
-                print(f"Recall@{top_k}: {score:.2%}")
-            except Exception as exc:
-                print(f"    ❌ 평가 실패: {exc}")
+    if validation_path:
+        # 질문은 한 번만 임베딩하고 모든 인덱스를 같은 순위 계산으로 평가한다
+        ks = [int(k) for k in (cfg.evaluation.get("ks") or DEFAULT_KS)]
+        print(f"\n=== 검색 평가: 인덱스 {len(index_dirs)}개, k={ks} ===")
+        try:
+            rows = evaluate_indexes(index_dirs, validation_path, ks=ks)
+        except Exception as exc:
+            print(f"    ❌ 평가 실패: {exc}")
+        else:
+            print(format_comparison_table(summarize_by_strategy(rows), ks, key="strategy"))
+            output_dir = cfg.evaluation.get("output_dir")
+            if output_dir:
+                print(f"📄 비교표 저장: {write_comparison(rows, ks, Path(output_dir))}")
+
+    federated_cfg = cfg.rag.get("federated") or {}
+    if federated_cfg.get("enable", False) and len(index_dirs) > 1 and not skip_qa:
+        print(f"\n=== 연합 검색: 인덱스 {len(index_dirs)}개 ===")
+        try:
+            # 연합 검색은 문서별 인덱스를 합치므로 하이브리드/샤드/이웃 확장/적응형 k 없이 검색한다
+            federated_config = replace(
+                rag_config,
+                shard_workers=0,
+                hybrid=False,
+                neighbor_expansion=False,
+                adaptive_k=False,
+                federated_index_dirs=index_dirs,
+                federated_candidate_k=int(federated_cfg.get("candidate_k", 20)),
+                federated_score_norm=str(federated_cfg.get("score_norm", "zscore")),
+                federated_dedup_overlap=float(federated_cfg.get("dedup_overlap", 0.5)),
+            )
+            chain = build_rag_chain(index_dirs[0], federated_config, google_api_key=google_key, reranker=reranker)
+            print("검색된 청크:", ", ".join(str(doc.metadata.get("doc_id")) for doc in chain.retriever.invoke(question)))
+            result = chain.invoke({"query": question})
+            print("질문:", question)
+            print("답변:")
+            print(result.get("result", result))
+        except Exception as exc:  # pragma: no cover - 외부 API 호출 오류
+            print(f"    ❌ 연합 검색 실행 실패: {exc}")
 
     print(f"\n✅ 총 {len(index_dirs)}개 인덱스에 대해 Week4 테스트를 완료했습니다.")
 
@@ -141,7 +224,18 @@ def run_workflow(cfg: DictConfig) -> None:
 def main(cfg: DictConfig) -> None:
     print("=== Week4 Hydra 설정 ===")
     print(OmegaConf.to_yaml(cfg, resolve=True))
+    registry_cfg = cfg.get("model_registry") or {}
+    configure_model_registry(registry_cfg.get("max_memory_mb"), warmup=bool(registry_cfg.get("warmup", True)))
+    cache_cfg = cfg.get("llm_cache") or {}
+    if cache_cfg.get("enable", False):
+        configure_llm_cache(
+            Path(str(cache_cfg.path)), max_mb=cache_cfg.get("max_mb"), bypass=bool(cache_cfg.get("bypass", False))
+        )
     run_workflow(cfg)
+    cache = default_llm_cache()
+    if cache is not None:
+        stats = cache.stats()
+        print(f"ℹ️  LLM 응답 캐시: 적중 {stats['hits']} / 미스 {stats['misses']} (항목 {stats['entries']}개, {stats['size_mb']:.1f}MB)")
 
 
 if __name__ == "__main__":
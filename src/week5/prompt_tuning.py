@@ -7,6 +7,7 @@ from dataclasses import dataclass
 from typing import Dict, Iterable, List, Optional, Tuple
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
 
 
@@ -27,7 +28,13 @@ class PromptTuner:
         temperature: float = 0.2,
         top_p: Optional[float] = None,
         top_k: Optional[int] = None,
+        llm: Optional[BaseChatModel] = None,
     ) -> None:
+        # llm을 넘기면 그 모델을 그대로 쓴다 (예: run_week5.build_llm이 만든 응답 캐시 연결 모델, 로컬 대체 모델)
+        if llm is not None:
+            self.llm = llm
+            return
+
         llm_kwargs = {
             "model": model_name,
             "temperature": temperature,
@@ -14,21 +14,63 @@ CURRENT_DIR = Path(__file__).resolve().parent
 SRC_DIR = CURRENT_DIR.parent
 ROOT_DIR = SRC_DIR.parent  # Rag_Study 루트 디렉토리
 
-if str(SRC_DIR) not in sys.path:
-    sys.path.insert(0, str(SRC_DIR))
+for path in (SRC_DIR, SRC_DIR / "week3", SRC_DIR / "week4", CURRENT_DIR):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
 
-if str(CURRENT_DIR) not in sys.path:
-    sys.path.insert(0, str(CURRENT_DIR))
-
-from langchain_google_genai import ChatGoogleGenerativeAI  # noqa: E402
-from langchain_community.embeddings import HuggingFaceEmbeddings  # noqa: E402
 from prompt_tuning import PromptTuner, PromptVariant  # noqa: E402
-from week4.rag_chain import DenseRetriever, load_documents_and_vectors  # noqa: E402
+from dense_retriever import DenseRetriever  # noqa: E402
+from week4.rag_chain import (  # noqa: E402
+    QueryEmbeddingCache,
+    configure_llm_cache,
+    configure_model_registry,
+    create_chat_model,
+    default_llm_cache,
+    discover_index_dirs,
+    get_embeddings,
+    load_dimension_reducer,
+    load_documents_and_vectors,
+    resolve_index_dir,
+)
 from langgraph_rag import build_rag_graph, preview_documents, run_rag  # noqa: E402
 
 load_dotenv()
 
 
+def apply_llm_cache_config(cfg: DictConfig) -> None:
+    cache_cfg = cfg.get("llm_cache") or {}
+    if not cache_cfg.get("enable", False):
+        return
+    cache = configure_llm_cache(
+        Path(str(cache_cfg.path)),
+        max_mb=cache_cfg.get("max_mb"),
+        bypass=bool(cache_cfg.get("bypass", False)),
+    )
+    print(f"ℹ️  LLM 응답 캐시: {cache.path} (항목 {cache.stats()['entries']}개{', 읽기 생략' if cache.bypass else ''})")
+
+
+def build_llm(
+    cfg: DictConfig,
+    model_name: str,
+    temperature: float,
+    top_p: Optional[float],
+    top_k: Optional[int],
+):
+    """llm_backend 설정에 맞는 채팅 모델 (프롬프트 튜닝과 LangGraph가 같은 응답 캐시를 공유)."""
+
+    backend_cfg = cfg.get("llm_backend") or {}
+    local_options = backend_cfg.get("local")
+    return create_chat_model(
+        str(backend_cfg.get("name", "gemini")),
+        model_name=model_name,
+        temperature=temperature,
+        top_p=top_p,
+        top_k=top_k,
+        cache=default_llm_cache(),
+        local_options=OmegaConf.to_container(local_options, resolve=True) if local_options is not None else None,
+    )
+
+
 def ensure_google_api_key(required: bool) -> Optional[str]:
     key = os.getenv("GOOGLE_API_KEY")
     if required and not key:
@@ -118,49 +160,38 @@ def run_langgraph_demo(cfg: DictConfig) -> None:
         print(f"[LangGraph] 프로젝트 루트: {ROOT_DIR}")
         return
     
-    # metadata.json이 있는 하위 디렉토리를 찾기
-    # 먼저 직접 경로에 metadata.json이 있는지 확인
-    if (index_dir_root / "metadata.json").exists():
+    # 인덱스 디렉토리(index.faiss 또는 버전 포인터 current.json 보유)를 찾기
+    # 먼저 직접 경로가 인덱스 디렉토리인지 확인
+    index_dirs = discover_index_dirs(index_dir_root, recursive=True)
+    if index_dir_root.resolve() in index_dirs:
         index_dir = index_dir_root
     else:
-        # 하위 디렉토리에서 metadata.json을 찾기
-        metadata_files = list(index_dir_root.rglob("metadata.json"))
-        if not metadata_files:
-            print(f"[LangGraph] {index_dir_root} 아래에서 metadata.json을 찾을 수 없습니다.")
+        if not index_dirs:
+            print(f"[LangGraph] {index_dir_root} 아래에서 인덱스를 찾을 수 없습니다.")
             print(f"[LangGraph] 구체적인 하위 디렉토리 경로를 지정하세요 (예: data/processed/index/20201231-34-63/fixed)")
             return
-        # 첫 번째 metadata.json이 있는 디렉토리 사용
-        index_dir = metadata_files[0].parent
+        # 첫 번째 인덱스 디렉토리 사용
+        index_dir = index_dirs[0]
         print(f"[LangGraph] 인덱스 디렉토리 자동 선택: {index_dir}")
 
     print("\n=== LangGraph 기반 RAG 데모 ===")
 
-    documents, vectors = load_documents_and_vectors(index_dir)
-    embedder = HuggingFaceEmbeddings(model_name=langgraph_cfg.get("embedding_model", "sentence-transformers/all-MiniLM-L6-v2"))
+    embedding_model = langgraph_cfg.get("embedding_model", "sentence-transformers/all-MiniLM-L6-v2")
+    documents, vectors = load_documents_and_vectors(index_dir, expected_model=embedding_model)
+    embedder = get_embeddings(embedding_model)
     retriever = DenseRetriever(
         documents=documents,
         vectors=vectors,
         embedder=embedder,
         k=int(langgraph_cfg.get("retrieval_k", 5)),
+        reducer=load_dimension_reducer(resolve_index_dir(index_dir)),
+        # 재검색("(상세 검색)")과 반복 질문의 임베딩을 재사용
+        query_cache=QueryEmbeddingCache(max_entries=int(langgraph_cfg.get("query_cache_size", 256))),
     )
 
     model_name = langgraph_cfg.get("model_name") or cfg.llm.model_name
     temperature = float(langgraph_cfg.get("temperature", cfg.llm.temperature))
-    
-    # LLM 파라미터 추가
-    llm_kwargs = {
-        "model": model_name,
-        "temperature": temperature,
-        "convert_system_message_to_human": False,
-    }
-    
-    # top_p, top_k 파라미터 추가 (Gemini API 지원)
-    if langgraph_cfg.get("top_p") is not None:
-        llm_kwargs["top_p"] = float(langgraph_cfg.get("top_p"))
-    if langgraph_cfg.get("top_k") is not None:
-        llm_kwargs["top_k"] = int(langgraph_cfg.get("top_k"))
-    
-    llm = ChatGoogleGenerativeAI(**llm_kwargs)
+    llm = build_llm(cfg, model_name, temperature, langgraph_cfg.get("top_p"), langgraph_cfg.get("top_k"))
 
     # 조건부 분기 설정
     enable_branching = bool(langgraph_cfg.get("enable_conditional_branching", False))
@@ -211,19 +242,21 @@ def main(cfg: DictConfig) -> None:
     print("=== Week5 Hydra 설정 ===")
     print(OmegaConf.to_yaml(cfg, resolve=True))
 
-    ensure_google_api_key(bool(cfg.llm.ensure_api_key))
+    backend_cfg = cfg.get("llm_backend") or {}
+    if backend_cfg.get("name", "gemini") == "gemini":
+        ensure_google_api_key(bool(cfg.llm.ensure_api_key))
+    else:
+        print(f"ℹ️  LLM 백엔드: {backend_cfg.name} (Gemini API를 호출하지 않습니다)")
+    registry_cfg = cfg.get("model_registry") or {}
+    configure_model_registry(registry_cfg.get("max_memory_mb"), warmup=bool(registry_cfg.get("warmup", True)))
+    apply_llm_cache_config(cfg)
 
     variants = build_variants(cfg.variants)
     
     # 프롬프트 튜닝에 LLM 파라미터 추가
     top_p = cfg.llm.get("top_p")
     top_k = cfg.llm.get("top_k")
-    tuner = PromptTuner(
-        model_name=cfg.llm.model_name, 
-        temperature=cfg.llm.temperature,
-        top_p=top_p,
-        top_k=top_k,
-    )
+    tuner = PromptTuner(llm=build_llm(cfg, cfg.llm.model_name, float(cfg.llm.temperature), top_p, top_k))
     results = tuner.run(variants)
 
     report_lines, analytics_report = render_results(results, show_analytics=bool(cfg.output.show_analytics))
@@ -249,6 +282,11 @@ def main(cfg: DictConfig) -> None:
 
     run_langgraph_demo(cfg)
 
+    cache = default_llm_cache()
+    if cache is not None:
+        stats = cache.stats()
+        print(f"\nℹ️  LLM 응답 캐시: 적중 {stats['hits']} / 미스 {stats['misses']} (항목 {stats['entries']}개, {stats['size_mb']:.1f}MB)")
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
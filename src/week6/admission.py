@@ -0,0 +1,148 @@
+"""6주차 요청 수락 제어(동시 실행 한도 + 제한된 대기열).
+
+LLM을 호출하는 요청이 한꺼번에 몰리면 Gemini 요청 한도에 걸리고 대기 중인 요청이 메모리를 계속 차지한다.
+AdmissionController는 이벤트 루프 안에서
+
+- 동시에 실행할 수 있는 요청 수를 max_concurrency개로 제한하고
+- 자리가 없으면 최대 max_queue개까지만 도착 순서대로 기다리게 하며
+- 대기열이 가득 차면 바로 429, 대기열에서 queue_timeout초 안에 자리를 얻지 못하면 503으로 거절한다.
+
+거절 시에는 평균 처리 시간과 대기 중인 요청 수로 추정한 Retry-After(초)를 함께 알려준다.
+FastAPI에 의존하지 않으므로 호출 측(api_server)이 Overloaded를 HTTP 응답으로 바꾼다.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+
+class Overloaded(Exception):
+    """수락 제어로 거절된 요청 (status_code: 429 대기열 가득 참, 503 대기 시간 초과)."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """동시 실행 한도 + 제한된 FIFO 대기열 (한 이벤트 루프에서만 사용)."""
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        max_queue: int = 32,
+        queue_timeout: Optional[float] = 5.0,
+        retry_after: Optional[int] = None,
+    ) -> None:
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency는 1 이상이어야 합니다.")
+        if max_queue < 0:
+            raise ValueError("max_queue는 0 이상이어야 합니다.")
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        # None이면 평균 처리 시간으로 추정
+        self.retry_after = retry_after
+        self.running = 0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_queue_full = 0
+        self.rejected_queue_timeout = 0
+        self.peak_waiting = 0
+        self._service_seconds: Optional[float] = None  # 처리 시간 지수 이동 평균
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def retry_after_seconds(self) -> int:
+        """지금 거절된 요청이 다시 시도할 때까지 기다릴 시간(초) 추정치."""
+
+        if self.retry_after is not None:
+            return self.retry_after
+        service = self._service_seconds or 1.0
+        return min(60, max(1, math.ceil(service * (len(self._waiters) + 1) / self.max_concurrency)))
+
+    async def acquire(self) -> None:
+        """실행 자리를 얻을 때까지 기다린다. 대기열이 가득 찼거나 대기 시간을 넘기면 Overloaded를 던진다."""
+
+        if self.running < self.max_concurrency and not self._waiters:
+            self.running += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected_queue_full += 1
+            raise Overloaded(429, "요청이 많아 대기열이 가득 찼습니다. 잠시 후 다시 시도해주세요.", self.retry_after_seconds())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        self.peak_waiting = max(self.peak_waiting, len(self._waiters))
+        try:
+            # shield: 시간 초과 시 자리를 넘겨받은 직후인지 확인한 뒤 직접 정리한다
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                self.admitted += 1
+                return
+            self._abandon(waiter)
+            self.rejected_queue_timeout += 1
+            raise Overloaded(503, "대기 시간 안에 처리 자리를 얻지 못했습니다. 잠시 후 다시 시도해주세요.", self.retry_after_seconds())
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # 넘겨받은 자리를 다음 대기 요청에 돌려준다
+            else:
+                self._abandon(waiter)
+            raise
+        self.admitted += 1
+
+    def _abandon(self, waiter: asyncio.Future) -> None:
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self, service_seconds: Optional[float] = None) -> None:
+        """실행 자리를 반납한다. 대기 중인 요청이 있으면 자리를 바로 넘긴다 (running 수는 그대로)."""
+
+        if service_seconds is not None:
+            previous = self._service_seconds
+            self._service_seconds = service_seconds if previous is None else 0.8 * previous + 0.2 * service_seconds
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.running -= 1
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """async with controller.slot(): 실행 자리를 얻고 블록이 끝나면(취소 포함) 반납한다."""
+
+        await self.acquire()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "running": self.running,
+            "waiting": len(self._waiters),
+            "peak_waiting": self.peak_waiting,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_queue_timeout": self.rejected_queue_timeout,
+            "mean_service_ms": self._service_seconds * 1000 if self._service_seconds is not None else None,
+            "retry_after_seconds": self.retry_after_seconds(),
+        }
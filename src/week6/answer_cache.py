@@ -0,0 +1,128 @@
+"""6주차 의미 기반 답변 캐시.
+
+표현만 조금 다른 같은 질문("BLISS.5 연회비 얼마야?" / "BLISS.5 카드 연회비는 얼마인가요?")마다
+Gemini를 다시 호출하지 않도록, 이전 질문의 임베딩을 작은 메모리 내 벡터 색인에 보관하고
+새 질문과의 코사인 유사도가 threshold 이상인 항목이 있으면 그 답변을 돌려준다.
+
+- 색인은 (max_entries, dim) float32 행렬 하나이며 조회는 행렬-벡터 곱 한 번이다.
+- 항목은 ttl_seconds가 지나면 만료되고, 가득 차면 만료 항목 → 가장 오래 쓰이지 않은 항목 순으로 밀려난다.
+- 인덱스 버전(current.json의 버전 등)이 바뀌면 이전 답변은 모두 버린다.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """질문 임베딩 → 답변 캐시 (스레드 안전, TTL + 크기 제한)."""
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        threshold: float = 0.95,
+        ttl_seconds: Optional[float] = 3600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries는 1 이상이어야 합니다.")
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._clock = clock
+        self._vectors: Optional[np.ndarray] = None  # 첫 저장 때 임베딩 차원으로 할당
+        self._expires = np.full(max_entries, -np.inf)
+        self._last_used = np.zeros(max_entries, dtype=np.int64)
+        self._questions: List[Optional[str]] = [None] * max_entries
+        self._answers: List[Optional[str]] = [None] * max_entries
+        self._tick = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(np.count_nonzero(self._expires > self._clock()))
+
+    def _touch(self, slot: int) -> None:
+        self._tick += 1
+        self._last_used[slot] = self._tick
+
+    def check_version(self, version: Optional[str]) -> bool:
+        """인덱스 버전이 이전과 다르면 캐시를 비우고 True를 반환한다."""
+
+        with self._lock:
+            if version == self.version:
+                return False
+            invalidated = self.version is not None
+            self.version = version
+            if invalidated:
+                self._expires[:] = -np.inf
+                self._questions = [None] * self.max_entries
+                self._answers = [None] * self.max_entries
+                self.invalidations += 1
+            return invalidated
+
+    def get(self, vector: np.ndarray) -> Optional[str]:
+        """정규화된 질문 임베딩과 가장 비슷한 유효 항목이 threshold 이상이면 그 답변을 반환한다."""
+
+        with self._lock:
+            live = self._expires > self._clock()
+            if self._vectors is None or not live.any():
+                self.misses += 1
+                return None
+            sims = self._vectors @ np.asarray(vector, dtype="float32")
+            sims[~live] = -np.inf
+            slot = int(np.argmax(sims))
+            if sims[slot] < self.threshold:
+                self.misses += 1
+                return None
+            self._touch(slot)
+            self.hits += 1
+            return self._answers[slot]
+
+    def put(self, vector: np.ndarray, question: str, answer: str) -> None:
+        vector = np.asarray(vector, dtype="float32").reshape(-1)
+        now = self._clock()
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != len(vector):
+                self._vectors = np.zeros((self.max_entries, len(vector)), dtype="float32")
+                self._expires[:] = -np.inf
+            expired = np.flatnonzero(self._expires <= now)
+            # 빈(만료) 칸이 있으면 그중 가장 오래 쓰이지 않은 칸, 없으면 전체에서 LRU 칸을 덮어쓴다
+            candidates = expired if len(expired) else np.arange(self.max_entries)
+            slot = int(candidates[np.argmin(self._last_used[candidates])])
+            self._vectors[slot] = vector
+            self._expires[slot] = now + self.ttl_seconds if self.ttl_seconds is not None else np.inf
+            self._questions[slot] = question
+            self._answers[slot] = answer
+            self._touch(slot)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._expires[:] = -np.inf
+            self._questions = [None] * self.max_entries
+            self._answers = [None] * self.max_entries
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        size = len(self)
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": size,
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "invalidations": self.invalidations,
+                "index_version": self.version,
+            }
@@ -2,26 +2,110 @@
 
 from __future__ import annotations
 
+import asyncio
+import json
 import os
+import sys
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from langchain.schema import Document
 from pydantic import BaseModel
 
 from dotenv import load_dotenv
 
-from week4.rag_chain import build_rag_chain
+SRC_DIR = Path(__file__).resolve().parent.parent
+for path in (SRC_DIR, SRC_DIR / "week3", SRC_DIR / "week4"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+# Week4 모듈은 rag_chain과 같은 이름(week4 디렉터리 기준)으로 읽어야 같은 모듈 객체(전역 상태 포함)를 공유한다
+from week4.rag_chain import RagChainConfig, build_rag_chain, index_version  # noqa: E402
+from adaptive_k import AdaptiveKLog  # noqa: E402
+from async_retrieval import AsyncRetrievalExecutor  # noqa: E402
+from context_packing import ContextPackingRetriever, last_packing_report, reset_packing_report  # noqa: E402
+from dense_retriever import embed_queries  # noqa: E402
+from llm_cache import default_llm_cache  # noqa: E402
+from micro_batching import find_micro_batching  # noqa: E402
+from model_registry import default_model_registry  # noqa: E402
+from query_cache import QueryEmbeddingCache, normalize_query  # noqa: E402
+from reranker import CrossEncoderReranker  # noqa: E402
+from week6.admission import AdmissionController, Overloaded  # noqa: E402
+from week6.answer_cache import SemanticAnswerCache  # noqa: E402
+from week6.request_coalescing import SingleFlight  # noqa: E402
 
 load_dotenv()
 
 class QueryRequest(BaseModel):
     question: str
     top_k: Optional[int] = 5
+    # 요청 제한 시간(초). 서버 설정(request_timeout)보다 길게 잡을 수는 없다
+    timeout: Optional[float] = None
 
 
 class QueryResponse(BaseModel):
     answer: str
+    # 컨텍스트 패킹으로 이번 요청에서 줄인 프롬프트 토큰 수 (패킹을 쓰지 않거나 캐시된 답변이면 None)
+    context_tokens_saved: Optional[int] = None
+
+
+class SearchRequest(BaseModel):
+    questions: List[str]
+    top_k: Optional[int] = 5
+    timeout: Optional[float] = None
+
+
+class SearchHit(BaseModel):
+    doc_id: str
+    content: str
+    metadata: Dict[str, Any] = {}
+
+
+class SearchResponse(BaseModel):
+    results: List[List[SearchHit]]
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Server-Sent Events 한 건 (event 이름 + JSON data)."""
+
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def overloaded_error(exc: Overloaded) -> HTTPException:
+    """수락 제어 거절을 Retry-After 헤더가 붙은 429/503 응답으로 바꾼다."""
+
+    return HTTPException(status_code=exc.status_code, detail=exc.detail, headers={"Retry-After": str(exc.retry_after)})
+
+
+class SlotStreamingResponse(StreamingResponse):
+    """전송이 끝나거나 중단되면(연결 끊김 포함) on_close를 호출하는 StreamingResponse (수락 제어 자리 반납용)."""
+
+    def __init__(self, *args: Any, on_close: Callable[[], None], **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.on_close()
+
+
+def source_summary(doc: Document, preview_chars: int = 200) -> Dict[str, Any]:
+    """스트리밍 첫 이벤트로 보낼 검색 문서 요약 (출처 표시용)."""
+
+    metadata = doc.metadata or {}
+    return {
+        "doc_id": str(metadata.get("doc_id", "")),
+        "source": metadata.get("source"),
+        "page": metadata.get("page"),
+        "start": metadata.get("start"),
+        "end": metadata.get("end"),
+        "preview": doc.page_content[:preview_chars],
+    }
 
 
 def create_app(
@@ -33,6 +117,46 @@ def create_app(
     top_k: Optional[int] = None,
     use_mmr: bool = False,
     mmr_diversity: float = 0.5,
+    mmr_fetch_k: Optional[int] = None,
+    metadata_filter: Optional[Dict[str, Any]] = None,
+    shard_workers: int = 0,
+    query_cache_size: int = 1024,
+    query_cache_path: Optional[Path] = None,
+    hybrid: bool = False,
+    hybrid_candidate_k: int = 20,
+    rrf_k: int = 60,
+    rerank_model: Optional[str] = None,
+    rerank_candidate_k: int = 20,
+    rerank_top_k: Optional[int] = None,
+    retrieval_workers: int = 4,
+    retrieval_concurrency: Optional[int] = None,
+    federated_index_dirs: Optional[List[Path]] = None,
+    federated_candidate_k: int = 20,
+    federated_score_norm: str = "zscore",
+    federated_dedup_overlap: float = 0.5,
+    answer_cache_size: int = 0,
+    answer_cache_threshold: float = 0.95,
+    answer_cache_ttl: Optional[float] = 3600.0,
+    neighbor_expansion: bool = False,
+    expansion_window_chars: int = 1200,
+    expansion_context_chars: int = 4000,
+    context_token_budget: Optional[int] = None,
+    adaptive_k: bool = False,
+    adaptive_min_k: int = 1,
+    adaptive_max_k: Optional[int] = None,
+    adaptive_gap: Optional[float] = 0.1,
+    adaptive_relative: Optional[float] = None,
+    llm_backend: str = "gemini",
+    local_llm_options: Optional[Dict[str, Any]] = None,
+    coalesce_requests: bool = True,
+    micro_batching: bool = False,
+    micro_batch_window_ms: float = 5.0,
+    micro_batch_max_size: int = 32,
+    max_concurrent_requests: int = 8,
+    max_queued_requests: int = 32,
+    queue_timeout: Optional[float] = 5.0,
+    request_timeout: Optional[float] = 60.0,
+    retry_after: Optional[int] = None,
 ) -> FastAPI:
     """
     FAISS 인덱스를 기반으로 하는 RAG FastAPI 애플리케이션을 생성한다.
@@ -46,27 +170,356 @@ def create_app(
         top_k: LLM top_k 파라미터
         use_mmr: MMR 검색 사용 여부
         mmr_diversity: MMR 다양성 파라미터
+        mmr_fetch_k: MMR 후보로 쓸 유사도 상위 문서 수
+        metadata_filter: 통합 인덱스 필터 (source/page/strategy)
+        shard_workers: 샤드 분산 검색 워커 프로세스 수
+        query_cache_size: 질의 임베딩 LRU 캐시 크기 (0이면 캐시 사용 안 함)
+        query_cache_path: 캐시 저장 파일 (있으면 시작 시 불러오고 종료 시 저장)
+        hybrid: BM25 + dense 하이브리드(RRF) 검색 사용 여부
+        hybrid_candidate_k: 하이브리드 검색 시 각 검색기의 후보 수
+        rrf_k: RRF 상수
+        rerank_model: 크로스 인코더 모델 이름 (None이면 재순위화하지 않음)
+        rerank_candidate_k: 재순위화 전 후보 수
+        rerank_top_k: 재순위화 후 LLM에 넘길 문서 수
+        retrieval_workers: 비동기 검색(임베딩/점수 계산) 스레드 수
+        retrieval_concurrency: 동시에 실행·대기할 수 있는 검색 단계 수 (None이면 스레드 수의 2배)
+        federated_index_dirs: index_dir과 함께 연합 검색할 인덱스 디렉터리들 (None이면 index_dir만 검색)
+        federated_candidate_k: 연합 검색 시 인덱스별 후보 수
+        federated_score_norm: 연합 검색 점수 정규화 방식 (zscore/minmax/none)
+        federated_dedup_overlap: 같은 출처에서 이 비율 이상 겹치는 원문 구간은 하나만 남김
+        answer_cache_size: 의미 기반 답변 캐시 크기 (0이면 캐시 사용 안 함)
+        answer_cache_threshold: 캐시된 답변을 재사용할 질문 임베딩 코사인 유사도 하한
+        answer_cache_ttl: 캐시된 답변 유효 시간(초, None이면 만료 없음)
+        neighbor_expansion: 검색된 청크를 원문의 이웃 청크까지 넓혀 LLM에 넘길지 여부
+        expansion_window_chars: 결과 하나를 넓힐 최대 문자 수
+        expansion_context_chars: 넓힌 창 전체의 문자 수 예산
+        context_token_budget: LLM에 넘길 컨텍스트 토큰 예산 (None이면 컨텍스트 패킹 사용 안 함)
+        adaptive_k: /query 검색 문서 수를 질의별 유사도 분포로 정할지 여부 (/search는 요청의 top_k 사용)
+        adaptive_min_k: 적응형 k 하한
+        adaptive_max_k: 적응형 k 상한 (None이면 검색 k)
+        adaptive_gap: 이웃 순위 점수 차이가 이 값 이상이면 자름
+        adaptive_relative: 1위 점수 x 이 비율 미만이면 자름
+        llm_backend: LLM 백엔드 (gemini | local: API 키 없이 결정적 응답을 내는 부하 테스트용 대체 모델)
+        local_llm_options: 로컬 대체 모델 설정 (첫 토큰 지연 분포, 초당 토큰 수, 출력 토큰 수 등)
+        coalesce_requests: 같은 질문(정규화 후)으로 동시에 들어온 /query 요청을 한 번의 계산으로 병합할지 여부
+        micro_batching: 동시 요청들의 검색을 짧은 창 동안 모아 배치 인코딩 + 배치 검색 한 번으로 처리할지 여부
+        micro_batch_window_ms: 첫 질의 도착 후 배치를 모으는 최대 대기 시간(ms)
+        micro_batch_max_size: 배치 하나의 최대 질의 수
+        max_concurrent_requests: 동시에 LLM을 호출할 수 있는 /query, /query/stream 요청 수
+        max_queued_requests: 자리를 기다릴 수 있는 요청 수 (넘으면 바로 429)
+        queue_timeout: 대기열에서 자리를 기다리는 최대 시간(초, 넘으면 503, None이면 무제한)
+        request_timeout: 요청별 제한 시간(초). 넘으면 진행 중인 검색/LLM 호출을 취소하고 504 (None이면 무제한)
+        retry_after: 429/503 응답의 Retry-After(초, None이면 평균 처리 시간과 대기 요청 수로 추정)
     """
 
     key = google_api_key or os.getenv("GOOGLE_API_KEY")
-    chain = build_rag_chain(
-        index_dir, 
-        google_api_key=key, 
+    query_cache = None
+    if query_cache_size > 0:
+        query_cache = QueryEmbeddingCache(max_entries=query_cache_size, warm_path=query_cache_path)
+        if len(query_cache):
+            print(f"ℹ️  질의 임베딩 캐시 {len(query_cache)}개를 불러왔습니다: {query_cache_path}")
+    reranker = CrossEncoderReranker(rerank_model) if rerank_model else None
+    adaptive_log = AdaptiveKLog() if adaptive_k else None
+    retrieval_executor = AsyncRetrievalExecutor(max_workers=retrieval_workers, max_concurrency=retrieval_concurrency)
+    rag_config = RagChainConfig(
         model_name=model_name,
         temperature=temperature,
         top_p=top_p,
         top_k=top_k,
+        llm_backend=llm_backend,
+        local_llm_options=local_llm_options,
         use_mmr=use_mmr,
         mmr_diversity=mmr_diversity,
+        mmr_fetch_k=mmr_fetch_k,
+        metadata_filter=metadata_filter,
+        shard_workers=shard_workers,
+        adaptive_k=adaptive_k,
+        adaptive_min_k=adaptive_min_k,
+        adaptive_max_k=adaptive_max_k,
+        adaptive_gap=adaptive_gap,
+        adaptive_relative=adaptive_relative,
+        hybrid=hybrid,
+        hybrid_candidate_k=hybrid_candidate_k,
+        rrf_k=rrf_k,
+        rerank_candidate_k=rerank_candidate_k,
+        rerank_top_k=rerank_top_k,
+        federated_index_dirs=federated_index_dirs,
+        federated_candidate_k=federated_candidate_k,
+        federated_score_norm=federated_score_norm,
+        federated_dedup_overlap=federated_dedup_overlap,
+        micro_batching=micro_batching,
+        micro_batch_window_ms=micro_batch_window_ms,
+        micro_batch_max_size=micro_batch_max_size,
+        neighbor_expansion=neighbor_expansion,
+        expansion_window_chars=expansion_window_chars,
+        expansion_context_chars=expansion_context_chars,
+        context_token_budget=context_token_budget,
+    )
+    chain = build_rag_chain(
+        index_dir,
+        rag_config,
+        google_api_key=key,
+        query_cache=query_cache,
+        reranker=reranker,
+        retrieval_executor=retrieval_executor,
+        adaptive_log=adaptive_log,
     )
+    micro_batching_retriever = find_micro_batching(chain.retriever)
+    batcher = micro_batching_retriever.batcher if micro_batching_retriever is not None else None
+    packer = chain.retriever.packer if isinstance(chain.retriever, ContextPackingRetriever) else None
+
+    answer_cache = None
+    if answer_cache_size > 0:
+        answer_cache = SemanticAnswerCache(
+            max_entries=answer_cache_size,
+            threshold=answer_cache_threshold,
+            ttl_seconds=answer_cache_ttl,
+        )
+    served_dirs = [Path(index_dir), *[Path(path) for path in federated_index_dirs or []]]
+    if answer_cache is not None and micro_batching_retriever is not None and query_cache is None:
+        print("⚠️  질의 임베딩 캐시가 꺼져 있어 답변 캐시 조회와 검색이 질의를 각각 인코딩합니다.")
+
+    single_flight = SingleFlight() if coalesce_requests else None
+    admission = AdmissionController(
+        max_concurrency=max_concurrent_requests,
+        max_queue=max_queued_requests,
+        queue_timeout=queue_timeout,
+        retry_after=retry_after,
+    )
+    deadline_exceeded = {"query": 0, "query_stream": 0, "search": 0}
+    stream_stats = {"started": 0, "completed": 0, "cancelled": 0, "failed": 0, "timed_out": 0}
 
     app = FastAPI(title="Week6 RAG API", version="0.1.0")
 
+    async def question_vector(question: str) -> Any:
+        """답변 캐시 조회용 질의 벡터. 마이크로 배칭을 쓰면 동시 요청들과 한 번에 인코딩한다."""
+
+        if micro_batching_retriever is not None:
+            return await micro_batching_retriever.aembed_query(question)
+        return (await retrieval_executor.run(embed_queries, chain.retriever, [question]))[0]
+
+    def request_deadline(timeout: Optional[float]) -> Optional[float]:
+        """요청이 지정한 제한 시간과 서버 제한 시간 중 짧은 쪽 (둘 다 없으면 None)."""
+
+        limits = [limit for limit in (timeout, request_timeout) if limit is not None and limit > 0]
+        return min(limits) if limits else None
+
     @app.post("/query", response_model=QueryResponse)
-    def query(req: QueryRequest) -> QueryResponse:  # type: ignore[override]
+    async def query(req: QueryRequest) -> QueryResponse:  # type: ignore[override]
+        """질문에 답한다.
+
+        LLM 호출은 수락 제어의 동시 실행 한도 안에서만 실행되고, 대기열이 가득 차면 429, 대기 시간을 넘기면
+        503을 Retry-After와 함께 바로 돌려준다. 제한 시간을 넘기면 진행 중인 검색/LLM 호출을 취소하고 504를 돌려준다.
+        """
+
+        if not req.question.strip():
+            raise HTTPException(status_code=400, detail="질문을 입력해주세요")
+        timeout = request_deadline(req.timeout)
+        try:
+            if single_flight is None:
+                return await asyncio.wait_for(answer(req), timeout)
+            # 같은 질문이 이미 처리 중이면 그 결과를 함께 기다린다 (임베딩 + LLM 호출 1회).
+            # 기다리던 요청이 모두 제한 시간을 넘기거나 끊기면 공유 계산도 취소된다
+            # top_k는 답변 생성에 쓰이지 않으므로(검색 k는 서버 설정) 키는 정규화한 질문만 쓴다
+            key = normalize_query(req.question)
+            return await asyncio.wait_for(single_flight.ado(key, lambda: answer(req)), timeout)
+        except Overloaded as exc:
+            raise overloaded_error(exc)
+        except asyncio.TimeoutError:
+            deadline_exceeded["query"] += 1
+            raise HTTPException(status_code=504, detail=f"제한 시간({timeout:g}초)을 넘겨 처리를 중단했습니다.")
+
+    async def answer(req: QueryRequest) -> QueryResponse:
+        if answer_cache is None:
+            async with admission.slot():
+                return await run_chain(req.question)
+
+        # 인덱스가 새 버전으로 배포되면 이전 답변은 재사용하지 않는다
+        if answer_cache.check_version(index_version(served_dirs)):
+            print("ℹ️  인덱스 버전이 바뀌어 답변 캐시를 비웠습니다.")
+        vector = await question_vector(req.question)
+        cached = answer_cache.get(vector)
+        if cached is not None:
+            return QueryResponse(answer=cached)
+        # 캐시된 답변은 LLM을 부르지 않으므로 자리를 차지하지 않는다
+        async with admission.slot():
+            response = await run_chain(req.question)
+        answer_cache.put(vector, req.question, response.answer)
+        return response
+
+    async def run_chain(question: str) -> QueryResponse:
+        reset_packing_report()
+        result = await chain.ainvoke({"query": question})
+        report = last_packing_report() if packer is not None else None
+        return QueryResponse(answer=result["result"], context_tokens_saved=report["tokens_saved"] if report else None)
+
+    @app.post("/query/stream")
+    async def query_stream(req: QueryRequest, request: Request) -> StreamingResponse:
+        """답변을 Server-Sent Events로 토큰 단위 스트리밍한다.
+
+        이벤트 순서: retrieval(검색 문서 요약) → token(생성된 텍스트 조각, 여러 번) → done(전체 답변).
+        오류는 error 이벤트로 보낸다. 클라이언트 연결이 끊기면 LLM 스트림을 닫아 업스트림 생성을 취소한다.
+        답변 캐시에 있는 질문은 retrieval(cached=true) 뒤 답변 전체를 token 하나로 보낸다.
+        스트리밍 생성은 LangChain LLM 응답 캐시를 거치지 않는다.
+        /query와 같은 수락 제어 자리를 스트림이 끝날 때까지 차지하며(자리가 없으면 429/503),
+        제한 시간을 넘기면 생성을 멈추고 error 이벤트(status 504)를 보낸다.
+        """
+
         if not req.question.strip():
             raise HTTPException(status_code=400, detail="질문을 입력해주세요")
-        answer = chain.run(req.question)
-        return QueryResponse(answer=answer)
+        # 응답 헤더를 보내기 전에 자리를 얻어야 429/503을 상태 코드로 돌려줄 수 있다
+        try:
+            await admission.acquire()
+        except Overloaded as exc:
+            raise overloaded_error(exc)
+        started = time.perf_counter()
+        timeout = request_deadline(req.timeout)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+
+        def remaining() -> Optional[float]:
+            if deadline is None:
+                return None
+            left = deadline - loop.time()
+            if left <= 0:
+                raise asyncio.TimeoutError
+            return left
+
+        async def events() -> AsyncIterator[str]:
+            stream_stats["started"] += 1
+            answer_parts: List[str] = []
+            try:
+                vector = None
+                if answer_cache is not None:
+                    if answer_cache.check_version(index_version(served_dirs)):
+                        print("ℹ️  인덱스 버전이 바뀌어 답변 캐시를 비웠습니다.")
+                    vector = await asyncio.wait_for(question_vector(req.question), remaining())
+                    cached = answer_cache.get(vector)
+                    if cached is not None:
+                        yield sse_event("retrieval", {"cached": True, "documents": []})
+                        yield sse_event("token", {"text": cached})
+                        yield sse_event("done", {"answer": cached})
+                        stream_stats["completed"] += 1
+                        return
+
+                reset_packing_report()
+                docs = await asyncio.wait_for(chain.retriever.ainvoke(req.question), remaining())
+                report = last_packing_report() if packer is not None else None
+                yield sse_event(
+                    "retrieval",
+                    {
+                        "cached": False,
+                        "documents": [source_summary(doc) for doc in docs],
+                        "context_tokens_saved": report["tokens_saved"] if report else None,
+                    },
+                )
+
+                # RetrievalQA("stuff")와 같은 프롬프트를 만들어 LLM 스트림을 직접 연다
+                stuff_chain = chain.combine_documents_chain
+                prompt = stuff_chain.llm_chain.prompt.format_prompt(
+                    **stuff_chain._get_inputs(docs, question=req.question)
+                )
+                stream = stuff_chain.llm_chain.llm.astream(prompt.to_messages())
+                try:
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(stream.__anext__(), remaining())
+                        except StopAsyncIteration:
+                            break
+                        if await request.is_disconnected():
+                            raise asyncio.CancelledError
+                        text = chunk.content if isinstance(chunk.content, str) else str(chunk.content)
+                        if text:
+                            answer_parts.append(text)
+                            yield sse_event("token", {"text": text})
+                finally:
+                    # 연결이 끊기거나 취소되면 LLM 스트림을 닫아 업스트림 생성을 멈춘다
+                    await stream.aclose()
+
+                answer = "".join(answer_parts)
+                if answer_cache is not None and vector is not None:
+                    answer_cache.put(vector, req.question, answer)
+                yield sse_event("done", {"answer": answer})
+                stream_stats["completed"] += 1
+            except asyncio.CancelledError:
+                stream_stats["cancelled"] += 1
+                raise
+            except asyncio.TimeoutError:
+                # 제한 시간을 넘기면 남은 검색/생성을 멈추고 지금까지의 토큰 뒤에 오류 이벤트를 보낸다
+                stream_stats["timed_out"] += 1
+                deadline_exceeded["query_stream"] += 1
+                yield sse_event("error", {"status": 504, "detail": f"제한 시간({timeout:g}초)을 넘겨 생성을 중단했습니다."})
+            except Exception as exc:  # pragma: no cover - 외부 API 호출 오류
+                stream_stats["failed"] += 1
+                yield sse_event("error", {"detail": str(exc)})
+
+        released = False
+
+        def release_slot() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                admission.release(time.perf_counter() - started)
+
+        return SlotStreamingResponse(
+            events(),
+            on_close=release_slot,
+            media_type="text/event-stream",
+            # 프록시(nginx 등)가 이벤트를 모아 보내지 않도록 한다
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @app.get("/stats")
+    def stats() -> Dict[str, Any]:
+        """캐시 적중/미스 등 서버 내부 카운터를 반환한다."""
+
+        return {
+            "query_embedding_cache": query_cache.stats() if query_cache is not None else None,
+            "rerank_score_cache": reranker.stats() if reranker is not None else None,
+            "retrieval_executor": retrieval_executor.stats(),
+            "answer_cache": answer_cache.stats() if answer_cache is not None else None,
+            "context_packing": packer.stats() if packer is not None else None,
+            "adaptive_k": adaptive_log.stats() if adaptive_log is not None else None,
+            "llm_cache": default_llm_cache().stats() if default_llm_cache() is not None else None,
+            "model_registry": default_model_registry().stats(),
+            "query_stream": dict(stream_stats),
+            "request_coalescing": single_flight.stats() if single_flight is not None else None,
+            "micro_batching": batcher.stats() if batcher is not None else None,
+            "admission": {**admission.stats(), "deadline_exceeded": dict(deadline_exceeded)},
+        }
+
+    @app.on_event("shutdown")
+    def save_query_cache() -> None:
+        if query_cache is not None and query_cache.warm_path is not None:
+            query_cache.save()
+        retrieval_executor.shutdown(wait=False)
+        if batcher is not None:
+            batcher.close()
+
+    @app.post("/search", response_model=SearchResponse)
+    async def search(req: SearchRequest) -> SearchResponse:
+        """LLM 호출 없이 여러 질문의 검색 결과만 한 번의 배치 검색으로 반환한다.
+
+        임베딩과 점수 계산은 검색 실행기의 스레드 풀에서 실행되어 이벤트 루프를 막지 않으며,
+        클라이언트 연결이 끊기거나 제한 시간을 넘겨 요청이 취소되면 남은 검색 단계는 실행하지 않는다 (시간 초과는 504).
+        """
+
+        if not req.questions or any(not question.strip() for question in req.questions):
+            raise HTTPException(status_code=400, detail="질문을 입력해주세요")
+        timeout = request_deadline(req.timeout)
+        try:
+            results = await asyncio.wait_for(chain.retriever.asearch_batch(req.questions, k=req.top_k), timeout)
+        except asyncio.TimeoutError:
+            deadline_exceeded["search"] += 1
+            raise HTTPException(status_code=504, detail=f"제한 시간({timeout:g}초)을 넘겨 검색을 중단했습니다.")
+        return SearchResponse(
+            results=[
+                [
+                    SearchHit(doc_id=str(doc.metadata.get("doc_id", "")), content=doc.page_content, metadata=doc.metadata)
+                    for doc in docs
+                ]
+                for docs in results
+            ]
+        )
 
     return app
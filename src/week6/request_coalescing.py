@@ -0,0 +1,71 @@
+"""6주차 동일 질문 요청 병합(single-flight).
+
+같은 질문(정규화 후)의 요청이 동시에 여러 개 들어오면 첫 요청(leader)만 임베딩 + LLM 호출을
+실행하고, 실행 중에 도착한 나머지 요청은 그 결과를 함께 기다린다. 결과(또는 예외)는 모든 대기 요청에
+그대로 전달되고, 계산이 끝나면 키를 지우므로 이후 요청은 다시 계산한다 (결과 재사용은 답변 캐시의 역할).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """키별로 진행 중인 계산 하나를 공유하는 요청 병합기 (스레드/이벤트 루프 안전)."""
+
+    def __init__(self) -> None:
+        self.leaders = 0
+        self.coalesced = 0
+        self._tasks: Dict[Hashable, asyncio.Future] = {}
+        self._waiters: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """같은 key의 계산이 진행 중이면 그 결과를 기다리고, 아니면 fn()을 별도 태스크로 실행한다.
+
+        기다리던 요청이 모두 취소되면(연결 끊김, 제한 시간 초과) 계산도 취소한다.
+        """
+
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is None:
+                task = asyncio.ensure_future(fn())
+                self._tasks[key] = task
+                self._waiters[key] = 0
+                self.leaders += 1
+                task.add_done_callback(lambda _, key=key: self._forget(key))
+            else:
+                self.coalesced += 1
+            self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            # shield: 한 요청이 끊겨도 다른 요청이 기다리는 공유 계산은 계속된다
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            with self._lock:
+                abandoned = self._waiters.get(key, 1) <= 1
+            if abandoned and not task.done():
+                task.cancel()
+            raise
+        finally:
+            with self._lock:
+                if self._tasks.get(key) is task:
+                    self._waiters[key] -= 1
+
+    def _forget(self, key: Hashable) -> None:
+        with self._lock:
+            self._tasks.pop(key, None)
+            self._waiters.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.leaders + self.coalesced
+            return {
+                "executed": self.leaders,
+                "coalesced": self.coalesced,
+                "coalesced_ratio": self.coalesced / total if total else 0.0,
+                "in_flight": len(self._tasks),
+            }
@@ -14,11 +14,14 @@ from omegaconf import DictConfig, OmegaConf
 CURRENT_DIR = Path(__file__).resolve().parent
 SRC_DIR = CURRENT_DIR.parent
 PROJECT_ROOT = SRC_DIR.parent
-for path in {CURRENT_DIR, SRC_DIR}:
+for path in {CURRENT_DIR, SRC_DIR, SRC_DIR / "week3"}:
     if str(path) not in sys.path:
         sys.path.insert(0, str(path))
 
 from api_server import create_app  # noqa: E402
+from index_store import POINTER_FILENAME, discover_index_dirs  # noqa: E402
+from model_registry import configure_model_registry  # noqa: E402
+from week4.rag_chain import configure_llm_cache  # noqa: E402
 
 load_dotenv()
 
@@ -41,15 +44,11 @@ def read_latest_pointer(pointer_path: Path) -> Optional[dict]:
 
 
 def find_index_dirs(root: Path, recursive: bool) -> List[Path]:
-    dirs = set()
-    if (root / "index.faiss").exists():
-        dirs.add(root.resolve())
-        if not recursive:
-            return sorted(dirs)
-    if recursive:
-        for path in root.glob("**/index.faiss"):
-            dirs.add(path.parent.resolve())
-    return sorted(dirs)
+    return discover_index_dirs(root, recursive=recursive)
+
+
+def is_index_dir(path: Path) -> bool:
+    return (path / POINTER_FILENAME).exists() or (path / "index.faiss").exists()
 
 
 def determine_index_dir(
@@ -57,10 +56,15 @@ def determine_index_dir(
     pointer_path: Path,
     prefer_pointer: bool,
     recursive_search: bool,
+    merged_dir: Optional[Path] = None,
 ) -> Path:
-    if (root / "index.faiss").exists():
+    if is_index_dir(root):
         return root.resolve()
 
+    # 모든 PDF를 합친 통합 인덱스가 있으면 문서 하나로 제한하지 않고 이를 사용한다
+    if merged_dir is not None and is_index_dir(merged_dir):
+        return merged_dir.resolve()
+
     if prefer_pointer:
         pointer = read_latest_pointer(pointer_path)
         if pointer and pointer.get("output_dir"):
@@ -96,15 +100,40 @@ def main(cfg: DictConfig) -> None:
     if not index_root.exists():
         raise FileNotFoundError(f"인덱스 경로를 찾을 수 없습니다: {index_root}")
 
+    selection = cfg.index_selection
+    merged_dir = None
+    if bool(selection.get("prefer_merged", False)):
+        merged_dir = index_root / selection.get("merged_dir_name", "_merged") / selection.get("merged_strategy", "recursive")
+
     index_dir = determine_index_dir(
         root=index_root,
         pointer_path=Path(cfg.paths.latest_pointer).resolve(),
-        prefer_pointer=bool(cfg.index_selection.prefer_pointer),
-        recursive_search=bool(cfg.index_selection.recursive_search),
+        prefer_pointer=bool(selection.prefer_pointer),
+        recursive_search=bool(selection.recursive_search),
+        merged_dir=merged_dir,
     )
-    print(f"ℹ️  사용할 인덱스 디렉터리: {index_dir}")
-
-    ensure_google_key(bool(cfg.rag.ensure_google_key))
+    federated_cfg = cfg.rag.get("federated") or {}
+    federated_dirs = [index_root / path for path in federated_cfg.get("index_dirs") or []]
+    if federated_dirs:
+        # 연합 검색 대상이 지정되면 자동 선택한 인덱스 대신 지정한 인덱스들만 사용한다
+        index_dir = federated_dirs[0]
+        print(f"ℹ️  연합 검색 인덱스 {len(federated_dirs)}개: {', '.join(str(path) for path in federated_dirs)}")
+    else:
+        print(f"ℹ️  사용할 인덱스 디렉터리: {index_dir}")
+
+    backend_cfg = cfg.get("llm_backend") or {}
+    llm_backend = str(backend_cfg.get("name", "gemini"))
+    if llm_backend == "gemini":
+        ensure_google_key(bool(cfg.rag.ensure_google_key))
+    else:
+        print(f"ℹ️  LLM 백엔드: {llm_backend} (Gemini API를 호출하지 않습니다)")
+    registry_cfg = cfg.get("model_registry") or {}
+    configure_model_registry(registry_cfg.get("max_memory_mb"), warmup=bool(registry_cfg.get("warmup", True)))
+    cache_cfg = cfg.get("llm_cache") or {}
+    if cache_cfg.get("enable", False):
+        configure_llm_cache(
+            Path(str(cache_cfg.path)), max_mb=cache_cfg.get("max_mb"), bypass=bool(cache_cfg.get("bypass", False))
+        )
     
     # LLM 파라미터 추출
     temperature = float(cfg.rag.get("temperature", 0.0))
@@ -112,6 +141,21 @@ def main(cfg: DictConfig) -> None:
     top_k = cfg.rag.get("top_k")
     use_mmr = bool(cfg.rag.get("use_mmr", False))
     mmr_diversity = float(cfg.rag.get("mmr_diversity", 0.5))
+    mmr_fetch_k = cfg.rag.get("mmr_fetch_k")
+    metadata_filter = cfg.rag.get("metadata_filter")
+    if metadata_filter is not None:
+        metadata_filter = OmegaConf.to_container(metadata_filter, resolve=True)
+    query_cache_cfg = cfg.rag.get("query_cache") or {}
+    hybrid_cfg = cfg.rag.get("hybrid") or {}
+    rerank_cfg = cfg.rag.get("rerank") or {}
+    async_cfg = cfg.rag.get("async_retrieval") or {}
+    answer_cache_cfg = cfg.rag.get("answer_cache") or {}
+    expansion_cfg = cfg.rag.get("neighbor_expansion") or {}
+    packing_cfg = cfg.rag.get("context_packing") or {}
+    adaptive_cfg = cfg.rag.get("adaptive_k") or {}
+    coalescing_cfg = cfg.rag.get("request_coalescing") or {}
+    batching_cfg = cfg.rag.get("micro_batching") or {}
+    admission_cfg = cfg.server.get("admission") or {}
     
     app = create_app(
         index_dir, 
@@ -122,6 +166,48 @@ def main(cfg: DictConfig) -> None:
         top_k=top_k,
         use_mmr=use_mmr,
         mmr_diversity=mmr_diversity,
+        mmr_fetch_k=mmr_fetch_k,
+        metadata_filter=metadata_filter,
+        shard_workers=int(cfg.rag.get("shard_workers", 0)),
+        query_cache_size=int(query_cache_cfg.get("max_entries", 1024)),
+        query_cache_path=Path(query_cache_cfg.warm_path).resolve() if query_cache_cfg.get("warm_path") else None,
+        hybrid=bool(hybrid_cfg.get("enable", False)),
+        hybrid_candidate_k=int(hybrid_cfg.get("candidate_k", 20)),
+        rrf_k=int(hybrid_cfg.get("rrf_k", 60)),
+        rerank_model=rerank_cfg.get("model_name") if rerank_cfg.get("enable", False) else None,
+        rerank_candidate_k=int(rerank_cfg.get("candidate_k", 20)),
+        rerank_top_k=rerank_cfg.get("top_k"),
+        retrieval_workers=int(async_cfg.get("max_workers", 4)),
+        retrieval_concurrency=async_cfg.get("max_concurrency"),
+        federated_index_dirs=federated_dirs or None,
+        federated_candidate_k=int(federated_cfg.get("candidate_k", 20)),
+        federated_score_norm=str(federated_cfg.get("score_norm", "zscore")),
+        federated_dedup_overlap=float(federated_cfg.get("dedup_overlap", 0.5)),
+        answer_cache_size=int(answer_cache_cfg.get("max_entries", 0)) if answer_cache_cfg.get("enable", False) else 0,
+        answer_cache_threshold=float(answer_cache_cfg.get("threshold", 0.95)),
+        answer_cache_ttl=answer_cache_cfg.get("ttl_seconds"),
+        neighbor_expansion=bool(expansion_cfg.get("enable", False)),
+        expansion_window_chars=int(expansion_cfg.get("window_chars", 1200)),
+        expansion_context_chars=int(expansion_cfg.get("max_context_chars", 4000)),
+        context_token_budget=int(packing_cfg.get("token_budget", 2000)) if packing_cfg.get("enable", False) else None,
+        adaptive_k=bool(adaptive_cfg.get("enable", False)),
+        adaptive_min_k=int(adaptive_cfg.get("min_k", 1)),
+        adaptive_max_k=adaptive_cfg.get("max_k"),
+        adaptive_gap=adaptive_cfg.get("gap", 0.1),
+        adaptive_relative=adaptive_cfg.get("relative"),
+        llm_backend=llm_backend,
+        coalesce_requests=bool(coalescing_cfg.get("enable", True)),
+        micro_batching=bool(batching_cfg.get("enable", False)),
+        micro_batch_window_ms=float(batching_cfg.get("window_ms", 5.0)),
+        micro_batch_max_size=int(batching_cfg.get("max_batch", 32)),
+        max_concurrent_requests=int(admission_cfg.get("max_concurrency", 8)),
+        max_queued_requests=int(admission_cfg.get("max_queue", 32)),
+        queue_timeout=admission_cfg.get("queue_timeout", 5.0),
+        request_timeout=cfg.server.get("request_timeout", 60.0),
+        retry_after=admission_cfg.get("retry_after"),
+        local_llm_options=(
+            OmegaConf.to_container(backend_cfg.local, resolve=True) if backend_cfg.get("local") is not None else None
+        ),
     )
 
     uvicorn.run(
@@ -2,6 +2,9 @@
 
 from __future__ import annotations
 
+import json
+from typing import Iterator, Tuple
+
 import httpx
 
 
@@ -13,5 +16,25 @@ def ask(question: str, endpoint: str = "http://localhost:8000/query") -> str:
     return response.json()["answer"]
 
 
+def ask_stream(question: str, endpoint: str = "http://localhost:8000/query/stream") -> Iterator[Tuple[str, dict]]:
+    """/query/stream의 Server-Sent Events를 (이벤트 이름, 데이터) 순서대로 돌려준다."""
+
+    with httpx.stream("POST", endpoint, json={"question": question}, timeout=None) as response:
+        response.raise_for_status()
+        event = "message"
+        for line in response.iter_lines():
+            if line.startswith("event:"):
+                event = line[len("event:") :].strip()
+            elif line.startswith("data:"):
+                yield event, json.loads(line[len("data:") :])
+
+
 if __name__ == "__main__":
     print(ask("그랜드코리아레저의 코로나 대응 전략을 요약해줘."))
+    for event, data in ask_stream("그랜드코리아레저의 코로나 대응 전략을 요약해줘."):
+        if event == "retrieval":
+            print("참고 문서:", ", ".join(doc["doc_id"] for doc in data["documents"]))
+        elif event == "token":
+            print(data["text"], end="", flush=True)
+        elif event == "done":
+            print()